@@ -1,17 +1,70 @@
 import os
-import re
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
 
+from app.config import settings
+from app.resumidor import resumidor
+from app.texto import DocumentoTexto, AutomataPalabras
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
 class SmartNewsAnalyzer:
     def __init__(self):
         self.api_key = os.getenv('GOOGLE_AI_API_KEY')
+        # Misma política para el pipeline y el análisis bajo demanda: el LLM solo si se activa explícitamente
+        self.usar_llm = bool(self.api_key) and settings.ANALISIS_CON_LLM
+        # Palabras clave por categoría; para cambiarlas usar configurar_categorias (recompila el autómata)
+        self.categorias_keywords = {
+            'Política': {
+                'keywords': ['presidente', 'gobierno', 'congreso', 'ministro', 'elección', 'ley', 'política', 'estado', 'partido', 'votación'],
+                'weight': 2
+            },
+            'Deportes': {
+                'keywords': ['fútbol', 'partido', 'jugador', 'equipo', 'gol', 'liga', 'deporte', 'competencia', 'campeonato', 'atleta'],
+                'weight': 2
+            },
+            'Economía': {
+                'keywords': ['economía', 'dólar', 'mercado', 'empresa', 'precio', 'inflación', 'finanzas', 'negocio', 'comercio', 'bolsa'],
+                'weight': 2
+            },
+            'Tecnología': {
+                'keywords': ['tecnología', 'digital', 'internet', 'app', 'software', 'inteligencia artificial', 'redes', 'ciberseguridad', 'innovación', 'dispositivo'],
+                'weight': 2
+            },
+            'Salud': {
+                'keywords': ['salud', 'médico', 'hospital', 'enfermedad', 'virus', 'vacuna', 'paciente', 'medicina', 'tratamiento', 'cáncer'],
+                'weight': 2
+            },
+            'Entretenimiento': {
+                'keywords': ['película', 'música', 'actor', 'cantante', 'show', 'celebridad', 'serie', 'televisión', 'concierto', 'festival'],
+                'weight': 1.5
+            },
+            'Ciencia': {
+                'keywords': ['ciencia', 'investigación', 'estudio', 'descubrimiento', 'científico', 'espacio', 'tecnología', 'universidad', 'experimento'],
+                'weight': 1.5
+            },
+            'Internacional': {
+                'keywords': ['internacional', 'mundial', 'país', 'nación', 'global', 'ONU', 'relaciones', 'diplomacia', 'extranjero'],
+                'weight': 1.5
+            }
+        }
+        self._compilar_automata()
         logger.info("✅ Analizador Inteligente inicializado")
 
+    def configurar_categorias(self, categorias_keywords: Dict[str, Dict[str, Any]]) -> None:
+        """Reemplaza las palabras clave por categoría y recompila el autómata"""
+        self.categorias_keywords = categorias_keywords
+        self._compilar_automata()
+
+    def _compilar_automata(self) -> None:
+        self._automata_categorias = AutomataPalabras([
+            (keyword, categoria)
+            for categoria, data in self.categorias_keywords.items()
+            for keyword in data['keywords']
+        ])
+
     def analizar_noticia(self, titulo: str, contenido: str) -> Dict[str, Any]:
         """
         Analiza noticias usando un enfoque híbrido: análisis local + IA cuando esté disponible
@@ -20,8 +73,8 @@ class SmartNewsAnalyzer:
             # Primero intentar con análisis local inteligente
             analisis = self._analisis_local_inteligente(titulo, contenido)
             
-            # Si tenemos API key, intentar enriquecer con IA
-            if self.api_key and contenido and len(contenido) > 100:
+            # Si el LLM está activado, intentar enriquecer con IA
+            if self.usar_llm and contenido and len(contenido) > 100:
                 try:
                     analisis_ia = self._enriquecer_con_ia(titulo, contenido)
                     # Combinar ambos análisis (preferir IA pero mantener fallbacks)
@@ -37,25 +90,65 @@ class SmartNewsAnalyzer:
             logger.error(f"❌ Error en análisis: {e}")
             return self._analisis_basico(titulo)
 
-    def _analisis_local_inteligente(self, titulo: str, contenido: str) -> Dict[str, Any]:
+    def analizar_lote(self, noticias: List[Dict[str, Any]]) -> Dict[Any, Dict[str, Any]]:
+        """
+        Analiza varias noticias ({'id', 'titulo', 'contenido'}) de una vez.
+        El análisis local se hace por noticia; si el LLM está activado (ANALISIS_CON_LLM), el
+        enriquecimiento se pide en bloque (prompts empaquetados) y las que fallen conservan el análisis local.
+        """
+        resultados = {}
+        # Cada noticia se tokeniza una vez; los resúmenes del lote salen de una sola pasada vectorizada
+        documentos = [DocumentoTexto(n['titulo'], n['contenido']) for n in noticias]
+        resumenes = resumidor.resumir_documentos(documentos)
+        for noticia, documento, resumen in zip(noticias, documentos, resumenes):
+            try:
+                resultados[noticia['id']] = self._analisis_local_inteligente(
+                    noticia['titulo'], noticia['contenido'] or "", resumen, documento
+                )
+            except Exception as e:
+                logger.error(f"❌ Error en análisis de la noticia {noticia['id']}: {e}")
+                resultados[noticia['id']] = self._analisis_basico(noticia['titulo'])
+        
+        enriquecibles = [n for n in noticias if n['contenido'] and len(n['contenido']) > 100]
+        if self.usar_llm and enriquecibles:
+            try:
+                for noticia_id, analisis_ia in self._enriquecer_lote_con_ia(enriquecibles).items():
+                    resultados[noticia_id].update(analisis_ia)
+                logger.info(f"✅ Lote enriquecido con IA: {len(enriquecibles)} noticias")
+            except Exception as e:
+                logger.warning(f"⚠️ IA no disponible para el lote, usando análisis local: {e}")
+        
+        return resultados
+
+    def estimar_importancia(self, titulo: str, contenido: str, categoria: str) -> int:
+        """Importancia prevista (1-10) sin hacer el análisis completo; sirve para priorizar"""
+        return self._calcular_importancia(DocumentoTexto(titulo, contenido), categoria)
+
+    def _analisis_local_inteligente(
+        self, titulo: str, contenido: str, resumen: Optional[str] = None, documento: Optional[DocumentoTexto] = None
+    ) -> Dict[str, Any]:
         """Análisis local inteligente usando procesamiento de texto"""
+        # Tokenizar una sola vez; todas las características se calculan sobre el documento
+        documento = documento or DocumentoTexto(titulo, contenido)
+        
         # Categorización avanzada
-        categoria = self._determinar_categoria(titulo, contenido)
+        categoria = self._determinar_categoria(documento)
         
         # Análisis de sentimiento básico
-        sentimiento = self._analizar_sentimiento(titulo, contenido)
+        sentimiento = self._analizar_sentimiento(documento)
         
-        # Generar resumen inteligente
-        resumen = self._generar_resumen(titulo, contenido)
+        # Generar resumen inteligente (salvo que ya venga calculado para todo el lote)
+        if not resumen or not contenido or len(contenido.strip()) < 50:
+            resumen = self._generar_resumen(documento)
         
         # Extraer temas principales
-        temas = self._extraer_temas(titulo, contenido)
+        temas = self._extraer_temas(documento)
         
         # Calcular importancia
-        importancia = self._calcular_importancia(titulo, contenido, categoria)
+        importancia = self._calcular_importancia(documento, categoria)
         
         # Extraer palabras clave
-        palabras_clave = self._extraer_palabras_clave(titulo, contenido)
+        palabras_clave = self._extraer_palabras_clave(documento)
         
         return {
             "resumen": resumen,
@@ -66,55 +159,21 @@ class SmartNewsAnalyzer:
             "palabras_clave": palabras_clave
         }
 
-    def _determinar_categoria(self, titulo: str, contenido: str) -> str:
+    def _determinar_categoria(self, documento: DocumentoTexto) -> str:
         """Determina la categoría basada en palabras clave y contexto"""
-        categorias_keywords = {
-            'Política': {
-                'keywords': ['presidente', 'gobierno', 'congreso', 'ministro', 'elección', 'ley', 'política', 'estado', 'partido', 'votación'],
-                'weight': 2
-            },
-            'Deportes': {
-                'keywords': ['fútbol', 'partido', 'jugador', 'equipo', 'gol', 'liga', 'deporte', 'competencia', 'campeonato', 'atleta'],
-                'weight': 2
-            },
-            'Economía': {
-                'keywords': ['economía', 'dólar', 'mercado', 'empresa', 'precio', 'inflación', 'finanzas', 'negocio', 'comercio', 'bolsa'],
-                'weight': 2
-            },
-            'Tecnología': {
-                'keywords': ['tecnología', 'digital', 'internet', 'app', 'software', 'inteligencia artificial', 'redes', 'ciber', 'innovación', 'dispositivo'],
-                'weight': 2
-            },
-            'Salud': {
-                'keywords': ['salud', 'médico', 'hospital', 'enfermedad', 'virus', 'vacuna', 'paciente', 'medicina', 'tratamiento', 'cáncer'],
-                'weight': 2
-            },
-            'Entretenimiento': {
-                'keywords': ['película', 'música', 'actor', 'cantante', 'show', 'celebridad', 'serie', 'televisión', 'concierto', 'festival'],
-                'weight': 1.5
-            },
-            'Ciencia': {
-                'keywords': ['ciencia', 'investigación', 'estudio', 'descubrimiento', 'científico', 'espacio', 'tecnología', 'universidad', 'experimento'],
-                'weight': 1.5
-            },
-            'Internacional': {
-                'keywords': ['internacional', 'mundial', 'país', 'nación', 'global', 'ONU', 'relaciones', 'diplomacia', 'extranjero'],
-                'weight': 1.5
-            }
-        }
+        automata = self._automata_categorias
         
-        texto = f"{titulo} {contenido}".lower()
-        scores = {}
+        # Una pasada por el contenido y otra por el título (para el bonus)
+        en_titulo = automata.buscar(documento.tokens_titulo)
+        encontradas = en_titulo | automata.buscar(documento.tokens)
         
-        for categoria, data in categorias_keywords.items():
-            score = 0
-            for keyword in data['keywords']:
-                if keyword in texto:
-                    score += data['weight']
-                    # Bonus si la palabra está en el título
-                    if keyword in titulo.lower():
-                        score += 1
-            scores[categoria] = score
+        scores = {categoria: 0 for categoria in self.categorias_keywords}
+        for indice in encontradas:
+            categoria = automata.valores[indice]
+            scores[categoria] += self.categorias_keywords[categoria]['weight']
+            # Bonus si la palabra está en el título
+            if indice in en_titulo:
+                scores[categoria] += 1
         
         # Encontrar la categoría con mayor puntuación
         mejor_categoria = max(scores.items(), key=lambda x: x[1])
@@ -122,15 +181,13 @@ class SmartNewsAnalyzer:
         # Solo devolver la categoría si tiene un score significativo
         return mejor_categoria[0] if mejor_categoria[1] > 1 else 'General'
 
-    def _analizar_sentimiento(self, titulo: str, contenido: str) -> str:
+    def _analizar_sentimiento(self, documento: DocumentoTexto) -> str:
         """Análisis básico de sentimiento"""
-        texto = f"{titulo} {contenido}".lower()
-        
         palabras_positivas = ['éxito', 'ganar', 'victoria', 'mejor', 'bueno', 'positivo', 'avance', 'progreso', 'feliz', 'alegría']
         palabras_negativas = ['problema', 'muerte', 'accidente', 'tragedia', 'malo', 'negativo', 'conflicto', 'crisis', 'enfermedad', 'pérdida']
         
-        positivos = sum(1 for palabra in palabras_positivas if palabra in texto)
-        negativos = sum(1 for palabra in palabras_negativas if palabra in texto)
+        positivos = sum(1 for palabra in palabras_positivas if documento.contiene(palabra))
+        negativos = sum(1 for palabra in palabras_negativas if documento.contiene(palabra))
         
         if positivos > negativos + 2:
             return "positivo"
@@ -139,14 +196,20 @@ class SmartNewsAnalyzer:
         else:
             return "neutral"
 
-    def _generar_resumen(self, titulo: str, contenido: str) -> str:
+    def _generar_resumen(self, documento: DocumentoTexto) -> str:
         """Genera un resumen inteligente del contenido"""
-        if not contenido or len(contenido.strip()) < 50:
+        titulo = documento.titulo
+        if len(documento.contenido.strip()) < 50:
             return f"Noticia sobre: {titulo}"
         
-        # Tomar las primeras 2 oraciones o 200 caracteres
-        oraciones = re.split(r'[.!?]+', contenido)
-        oraciones_validas = [o.strip() for o in oraciones if len(o.strip()) > 20]
+        # Resumen extractivo por centroide TF-IDF (requiere NumPy/SciPy)
+        resumen = resumidor.resumir_documentos([documento])[0]
+        if resumen:
+            return resumen
+        
+        # Respaldo: tomar las primeras 2 oraciones o 200 caracteres
+        oraciones = (documento.texto_oracion(i).rstrip('.!? ') for i in range(len(documento.oraciones)))
+        oraciones_validas = [o for o in oraciones if len(o) > 20]
         
         if oraciones_validas:
             resumen = '. '.join(oraciones_validas[:2]) + '.'
@@ -156,10 +219,9 @@ class SmartNewsAnalyzer:
         else:
             return f"Resumen: {titulo}"
 
-    def _extraer_temas(self, titulo: str, contenido: str) -> List[str]:
+    def _extraer_temas(self, documento: DocumentoTexto) -> List[str]:
         """Extrae temas principales del contenido"""
         temas = []
-        texto = f"{titulo} {contenido}".lower()
         
         temas_posibles = [
             'deportes', 'política', 'economía', 'tecnología', 'salud', 
@@ -167,22 +229,22 @@ class SmartNewsAnalyzer:
         ]
         
         for tema in temas_posibles:
-            if tema in texto:
+            if documento.contiene(tema):
                 temas.append(tema.capitalize())
         
         return temas[:3] if temas else ['Actualidad']
 
-    def _calcular_importancia(self, titulo: str, contenido: str, categoria: str) -> int:
+    def _calcular_importancia(self, documento: DocumentoTexto, categoria: str) -> int:
         """Calcula la importancia de la noticia (1-10)"""
         importancia = 5  # Base
         
         # Factores que aumentan importancia
         factores = [
-            (len(titulo) > 80, 1),  # Títulos largos suelen ser más importantes
-            (len(contenido or '') > 500, 1),  # Contenido extenso
+            (len(documento.titulo) > 80, 1),  # Títulos largos suelen ser más importantes
+            (len(documento.contenido) > 500, 1),  # Contenido extenso
             (categoria in ['Política', 'Economía'], 1),  # Categorías importantes
-            (any(palabra in titulo.lower() for palabra in ['urgente', 'importante', 'crisis', 'emergencia']), 2),
-            (any(palabra in titulo.lower() for palabra in ['presidente', 'ministro', 'congreso']), 1),
+            (any(documento.en_titulo(palabra) for palabra in ['urgente', 'importante', 'crisis', 'emergencia']), 2),
+            (any(documento.en_titulo(palabra) for palabra in ['presidente', 'ministro', 'congreso']), 1),
         ]
         
         for condicion, puntos in factores:
@@ -191,32 +253,25 @@ class SmartNewsAnalyzer:
         
         return min(10, max(1, importancia))
 
-    def _extraer_palabras_clave(self, titulo: str, contenido: str) -> List[str]:
+    def _extraer_palabras_clave(self, documento: DocumentoTexto) -> List[str]:
         """Extrae palabras clave relevantes"""
-        palabras_excluidas = {
-            'de', 'la', 'el', 'en', 'y', 'a', 'que', 'se', 'con', 'por', 'para', 
-            'los', 'las', 'un', 'una', 'unos', 'unas', 'del', 'al', 'lo', 'su', 'sus'
-        }
-        
-        texto = f"{titulo} {contenido}"
-        palabras = re.findall(r'\b[a-zA-Záéíóúñ]{4,}\b', texto.lower())
-        
-        # Contar frecuencia y filtrar
-        from collections import Counter
-        contador = Counter(palabras)
-        
+        # Términos de 4+ letras sin stop words, ya contados al tokenizar
         palabras_clave = [
-            palabra for palabra, count in contador.most_common(10)
-            if palabra not in palabras_excluidas and count > 1
+            palabra for palabra, count in documento.terminos().most_common(10)
+            if count > 1
         ]
         
         return palabras_clave[:5] if palabras_clave else ['noticia', 'información']
 
     def _enriquecer_con_ia(self, titulo: str, contenido: str) -> Dict[str, Any]:
-        """Intenta enriquecer el análisis con IA (opcional)"""
-        # Por ahora devolvemos un análisis vacío para IA
-        # Esto se puede expandir más tarde con otras APIs
-        return {}
+        """Intenta enriquecer el análisis con IA; mismo camino que el lote, con una sola noticia"""
+        return self._enriquecer_lote_con_ia([{'id': 0, 'titulo': titulo, 'contenido': contenido}]).get(0, {})
+
+    def _enriquecer_lote_con_ia(self, noticias: List[Dict[str, Any]]) -> Dict[Any, Dict[str, Any]]:
+        """Análisis de Gemini por lotes; solo devuelve las noticias con respuesta válida"""
+        # Importación diferida: el cliente de Gemini solo se necesita si el LLM está activado
+        from app.ai_service import ai_analyzer as analizador_gemini
+        return analizador_gemini.analizar_lote(noticias, respaldo=False)
 
     def _analisis_basico(self, titulo: str) -> Dict[str, Any]:
         """Análisis básico de respaldo"""
@@ -1,63 +1,24 @@
 import os
-import requests
+import asyncio
+import hashlib
 from dotenv import load_dotenv
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 import json
 
+from app.cache import cache_llm
+from app.cliente_llm import crear_cliente, estimar_tokens
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
-class LegacyAIAnalyzer:
-    def __init__(self):
-        self.api_key = os.getenv('GOOGLE_AI_API_KEY')
-        if not self.api_key:
-            logger.error("GOOGLE_AI_API_KEY no encontrada")
-            raise ValueError("API key no configurada")
-        
-        # URL para la API legacy de Gemini
-        self.url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent?key={self.api_key}"
-        logger.info("✅ Analizador Legacy inicializado")
-
-    def analizar_noticia(self, titulo: str, contenido: str) -> Dict[str, Any]:
-        """
-        Analiza noticias usando la API legacy de Gemini
-        """
-        try:
-            # Preparar el prompt
-            prompt = self._crear_prompt(titulo, contenido)
-            
-            # Preparar los datos para la API
-            data = {
-                "contents": [{
-                    "parts": [{
-                        "text": prompt
-                    }]
-                }]
-            }
-            
-            # Hacer la petición a la API
-            response = requests.post(self.url, json=data, timeout=30)
-            response.raise_for_status()
-            
-            # Procesar la respuesta
-            result = response.json()
-            texto_respuesta = result['candidates'][0]['content']['parts'][0]['text']
-            
-            # Parsear la respuesta
-            return self._parsear_respuesta(texto_respuesta, titulo)
-            
-        except Exception as e:
-            logger.error(f"❌ Error en análisis Legacy: {e}")
-            return self._analisis_por_defecto(titulo)
-
-    def _crear_prompt(self, titulo: str, contenido: str) -> str:
-        """Crea el prompt para la IA"""
-        return f"""
+# Plantilla del prompt de análisis. Cualquier cambio produce otra VERSION_PROMPT
+# y con ello invalida las respuestas guardadas en la caché LLM.
+PLANTILLA_PROMPT = """
         Analiza esta noticia y devuelve SOLO un JSON válido:
 
         TÍTULO: {titulo}
-        CONTENIDO: {contenido[:2000] if contenido else "Sin contenido"}
+        CONTENIDO: {contenido}
 
         Estructura JSON requerida:
         {{
@@ -75,9 +36,138 @@ class LegacyAIAnalyzer:
         - Sentimiento basado en el tono
         - Solo responder con JSON válido
         """
+MAX_CONTENIDO_PROMPT = 2000
+VERSION_PROMPT = hashlib.sha256(f"{PLANTILLA_PROMPT}|{MAX_CONTENIDO_PROMPT}".encode('utf-8')).hexdigest()[:16]
+
+# Modo lote: las instrucciones van una sola vez y las noticias se numeran
+PLANTILLA_PROMPT_LOTE = """
+        Analiza cada una de estas noticias y devuelve SOLO un arreglo JSON válido,
+        con un objeto por noticia y el mismo "n" que la noticia:
 
-    def _parsear_respuesta(self, texto_respuesta: str, titulo: str) -> Dict[str, Any]:
-        """Parsea la respuesta de la IA"""
+        {noticias}
+
+        Estructura JSON requerida:
+        [
+            {{
+                "n": 1,
+                "resumen": "Resumen conciso de 2-3 líneas en español",
+                "categoria": "Política|Economía|Deportes|Tecnología|Salud|Entretenimiento|Ciencia|General",
+                "sentimiento": "positivo|negativo|neutral",
+                "temas_principales": ["tema1", "tema2", "tema3"],
+                "puntuacion_importancia": 5,
+                "palabras_clave": ["palabra1", "palabra2", "palabra3"]
+            }}
+        ]
+
+        Reglas:
+        - Un objeto por noticia, sin omitir ninguna
+        - Resumen objetivo y factual
+        - Categoría más apropiada
+        - Sentimiento basado en el tono
+        - Solo responder con JSON válido
+        """
+PLANTILLA_NOTICIA_LOTE = "NOTICIA {n}\nTÍTULO: {titulo}\nCONTENIDO: {contenido}\n"
+MAX_CONTENIDO_LOTE = 1200
+TOKENS_SALIDA_POR_NOTICIA = 200
+VERSION_PROMPT_LOTE = hashlib.sha256(
+    f"{PLANTILLA_PROMPT_LOTE}|{PLANTILLA_NOTICIA_LOTE}|{MAX_CONTENIDO_LOTE}".encode('utf-8')
+).hexdigest()[:16]
+
+CATEGORIAS_VALIDAS = {'Política', 'Economía', 'Deportes', 'Tecnología', 'Salud', 'Entretenimiento', 'Ciencia', 'General'}
+SENTIMIENTOS_VALIDOS = {'positivo', 'negativo', 'neutral'}
+
+def validar_analisis(datos: Any) -> Optional[Dict[str, Any]]:
+    """
+    Valida y normaliza un análisis devuelto por el LLM.
+    Devuelve None si le falta el resumen o no es un objeto.
+    """
+    if not isinstance(datos, dict):
+        return None
+    resumen = datos.get('resumen')
+    if not isinstance(resumen, str) or not resumen.strip():
+        return None
+
+    def lista_textos(valor) -> List[str]:
+        return [str(v) for v in valor if isinstance(v, (str, int, float))][:5] if isinstance(valor, list) else []
+
+    try:
+        importancia = int(datos.get('puntuacion_importancia', 5))
+    except (TypeError, ValueError):
+        importancia = 5
+
+    categoria = datos.get('categoria')
+    sentimiento = str(datos.get('sentimiento', '')).lower()
+    return {
+        "resumen": resumen.strip(),
+        "categoria": categoria if categoria in CATEGORIAS_VALIDAS else 'General',
+        "sentimiento": sentimiento if sentimiento in SENTIMIENTOS_VALIDOS else 'neutral',
+        "temas_principales": lista_textos(datos.get('temas_principales')),
+        "puntuacion_importancia": min(10, max(1, importancia)),
+        "palabras_clave": lista_textos(datos.get('palabras_clave'))
+    }
+
+class LegacyAIAnalyzer:
+    def __init__(self):
+        self.api_key = os.getenv('GOOGLE_AI_API_KEY')
+        if not self.api_key:
+            logger.error("GOOGLE_AI_API_KEY no encontrada")
+            raise ValueError("API key no configurada")
+        
+        # Cliente compartido: pool de conexiones, límite de concurrencia, RPM/TPM y reintentos
+        self.cliente = crear_cliente(self.api_key)
+        logger.info("✅ Analizador Legacy inicializado")
+
+    def analizar_noticia(self, titulo: str, contenido: str) -> Dict[str, Any]:
+        """
+        Analiza noticias usando la API legacy de Gemini (versión síncrona)
+        """
+        analisis = cache_llm.obtener(VERSION_PROMPT, titulo, contenido)
+        if analisis is not None:
+            return analisis
+        
+        try:
+            texto_respuesta = self.cliente.generar_sync(self._crear_prompt(titulo, contenido))
+        except Exception as e:
+            logger.error(f"❌ Error en análisis Legacy: {e}")
+            return self._analisis_por_defecto(titulo)
+        
+        return self._procesar_respuesta(texto_respuesta, titulo, contenido)
+
+    async def analizar_noticia_async(self, titulo: str, contenido: str) -> Dict[str, Any]:
+        """
+        Igual que analizar_noticia, sin ocupar un hilo mientras se espera al LLM
+        """
+        analisis = await asyncio.to_thread(cache_llm.obtener, VERSION_PROMPT, titulo, contenido)
+        if analisis is not None:
+            return analisis
+        
+        try:
+            texto_respuesta = await self.cliente.generar(self._crear_prompt(titulo, contenido))
+        except Exception as e:
+            logger.error(f"❌ Error en análisis Legacy: {e}")
+            return self._analisis_por_defecto(titulo)
+        
+        return await asyncio.to_thread(self._procesar_respuesta, texto_respuesta, titulo, contenido)
+
+    def _crear_prompt(self, titulo: str, contenido: str) -> str:
+        """Crea el prompt para la IA"""
+        return PLANTILLA_PROMPT.format(
+            titulo=titulo,
+            contenido=contenido[:MAX_CONTENIDO_PROMPT] if contenido else "Sin contenido"
+        )
+
+    def _procesar_respuesta(self, texto_respuesta: str, titulo: str, contenido: str) -> Dict[str, Any]:
+        """Parsea y valida la respuesta; solo las respuestas válidas se guardan en la caché"""
+        analisis = validar_analisis(self._parsear_respuesta(texto_respuesta))
+        if analisis is None:
+            logger.warning("⚠️ Respuesta del LLM sin el formato esperado, usando análisis básico")
+            return self._analisis_basico(titulo)
+        
+        cache_llm.guardar(VERSION_PROMPT, titulo, contenido, analisis)
+        return analisis
+
+    def _parsear_respuesta(self, texto_respuesta: str) -> Optional[Any]:
+        """Parsea la respuesta JSON de la IA, objeto o arreglo (None si no es JSON válido)"""
         try:
             # Limpiar la respuesta
             texto_limpio = texto_respuesta.strip()
@@ -93,7 +183,129 @@ class LegacyAIAnalyzer:
             
         except json.JSONDecodeError:
             logger.error("❌ Error parseando JSON, usando análisis básico")
-            return self._analisis_basico(titulo)
+            return None
+
+    def analizar_lote(
+        self,
+        noticias: List[Dict[str, Any]],
+        max_tokens: int = 6000,
+        max_noticias: int = 15,
+        max_intentos: int = 3,
+        respaldo: bool = True
+    ) -> Dict[Any, Dict[str, Any]]:
+        """
+        Analiza muchas noticias con pocas peticiones (versión síncrona de analizar_lote_async)
+        """
+        return self.cliente.ejecutar(
+            self.analizar_lote_async(noticias, max_tokens, max_noticias, max_intentos, respaldo)
+        )
+
+    async def analizar_lote_async(
+        self,
+        noticias: List[Dict[str, Any]],
+        max_tokens: int = 6000,
+        max_noticias: int = 15,
+        max_intentos: int = 3,
+        respaldo: bool = True
+    ) -> Dict[Any, Dict[str, Any]]:
+        """
+        Analiza noticias ({'id', 'titulo', 'contenido'}) empaquetando varias por prompt.
+
+        Los lotes se arman por presupuesto de tokens (entrada + salida estimada) y se
+        envían en paralelo; el cliente aplica la concurrencia y los límites RPM/TPM.
+        Cada elemento de la respuesta se valida por separado: solo los que faltan o no
+        son válidos se vuelven a encolar, en lotes más pequeños en cada intento. Los que
+        agotan los intentos reciben el análisis básico, o se omiten si respaldo=False.
+        Devuelve {id: análisis}.
+        """
+        resultados: Dict[Any, Dict[str, Any]] = {}
+
+        # Primero la caché: el texto repetido no se vuelve a enviar
+        en_cache = await asyncio.to_thread(
+            lambda: {n['id']: cache_llm.obtener(VERSION_PROMPT_LOTE, n['titulo'], n['contenido']) for n in noticias}
+        )
+        pendientes = [n for n in noticias if en_cache.get(n['id']) is None]
+        resultados.update({id_: a for id_, a in en_cache.items() if a is not None})
+
+        for intento in range(max_intentos):
+            if not pendientes:
+                break
+            # Reintentos en lotes cada vez más chicos para aislar las noticias problemáticas
+            limite = max(1, max_noticias // (2 ** intento))
+            lotes = self._empaquetar(pendientes, max_tokens, limite)
+            logger.info(f"📦 Análisis por lotes (intento {intento + 1}): {len(pendientes)} noticias en {len(lotes)} peticiones")
+
+            respuestas = await asyncio.gather(*[self._analizar_paquete(lote) for lote in lotes])
+
+            pendientes = []
+            for lote, validos in zip(lotes, respuestas):
+                for noticia in lote:
+                    analisis = validos.get(noticia['id'])
+                    if analisis is None:
+                        pendientes.append(noticia)
+                    else:
+                        resultados[noticia['id']] = analisis
+
+        if pendientes:
+            logger.warning(f"⚠️ {len(pendientes)} noticias sin análisis válido tras {max_intentos} intentos")
+            for noticia in (pendientes if respaldo else []):
+                resultados[noticia['id']] = self._analisis_basico(noticia['titulo'])
+
+        return resultados
+
+    def _empaquetar(self, noticias: List[Dict[str, Any]], max_tokens: int, max_noticias: int) -> List[List[Dict[str, Any]]]:
+        """Agrupa noticias en lotes que respetan el presupuesto de tokens y el máximo por lote"""
+        base = estimar_tokens(PLANTILLA_PROMPT_LOTE)
+        lotes, actual, tokens_actual = [], [], base
+        for noticia in noticias:
+            tokens = estimar_tokens(self._texto_noticia_lote(1, noticia)) + TOKENS_SALIDA_POR_NOTICIA
+            if actual and (tokens_actual + tokens > max_tokens or len(actual) >= max_noticias):
+                lotes.append(actual)
+                actual, tokens_actual = [], base
+            actual.append(noticia)
+            tokens_actual += tokens
+        if actual:
+            lotes.append(actual)
+        return lotes
+
+    def _texto_noticia_lote(self, n: int, noticia: Dict[str, Any]) -> str:
+        contenido = noticia.get('contenido')
+        return PLANTILLA_NOTICIA_LOTE.format(
+            n=n,
+            titulo=noticia['titulo'],
+            contenido=contenido[:MAX_CONTENIDO_LOTE] if contenido else "Sin contenido"
+        )
+
+    async def _analizar_paquete(self, lote: List[Dict[str, Any]]) -> Dict[Any, Dict[str, Any]]:
+        """Envía un lote y devuelve solo los análisis válidos, por id de noticia"""
+        prompt = PLANTILLA_PROMPT_LOTE.format(
+            noticias="\n".join(self._texto_noticia_lote(n, noticia) for n, noticia in enumerate(lote, start=1))
+        )
+        try:
+            texto_respuesta = await self.cliente.generar(prompt, tokens_salida=TOKENS_SALIDA_POR_NOTICIA * len(lote))
+        except Exception as e:
+            logger.error(f"❌ Error en lote de {len(lote)} noticias: {e}")
+            return {}
+
+        elementos = self._parsear_respuesta(texto_respuesta)
+        if not isinstance(elementos, list):
+            logger.warning(f"⚠️ Respuesta de lote ilegible ({len(lote)} noticias), se reencolan")
+            return {}
+
+        validos = {}
+        for elemento in elementos:
+            n = elemento.get('n') if isinstance(elemento, dict) else None
+            analisis = validar_analisis(elemento)
+            if isinstance(n, int) and 1 <= n <= len(lote) and analisis is not None:
+                validos[lote[n - 1]['id']] = analisis
+
+        # Guardar en caché los válidos sin bloquear el bucle
+        guardar = [(noticia, validos[noticia['id']]) for noticia in lote if noticia['id'] in validos]
+        await asyncio.to_thread(lambda: [
+            cache_llm.guardar(VERSION_PROMPT_LOTE, noticia['titulo'], noticia['contenido'], analisis)
+            for noticia, analisis in guardar
+        ])
+        return validos
 
     def _analisis_basico(self, titulo: str) -> Dict[str, Any]:
         """Análisis básico cuando falla la IA"""
@@ -148,6 +360,17 @@ except Exception as e:
     
     # Fallback extremo
     class BackupAnalyzer:
+        async def analizar_noticia_async(self, titulo: str, contenido: str) -> Dict[str, Any]:
+            return self.analizar_noticia(titulo, contenido)
+
+        def analizar_lote(self, noticias: List[Dict[str, Any]], respaldo: bool = True, **kwargs) -> Dict[Any, Dict[str, Any]]:
+            if not respaldo:
+                return {}
+            return {n['id']: self.analizar_noticia(n['titulo'], n['contenido']) for n in noticias}
+
+        async def analizar_lote_async(self, noticias: List[Dict[str, Any]], respaldo: bool = True, **kwargs) -> Dict[Any, Dict[str, Any]]:
+            return self.analizar_lote(noticias, respaldo=respaldo)
+
         def analizar_noticia(self, titulo: str, contenido: str) -> Dict[str, Any]:
             return {
                 "resumen": f"Resumen: {titulo}",
@@ -0,0 +1,130 @@
+import sys
+import time
+import logging
+import argparse
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Agregar el directorio padre al path para imports
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+from app import models
+from app.ai_analyzer import ai_analyzer
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+class PipelineAnalisis:
+    """
+    Etapa de análisis IA posterior a la ingesta.
+    Toma las noticias sin AnalisisIA, las ordena por importancia prevista, las analiza
+    por lotes e inserta los análisis en bloque. Así el endpoint de análisis suele
+    encontrar la fila ya creada y solo analiza bajo demanda como respaldo.
+    """
+
+    def __init__(self, tamano_lote: int = 50, session_factory: Callable = SessionLocal):
+        self.tamano_lote = tamano_lote
+        self.session_factory = session_factory
+
+    def procesar(self, ids: Optional[List[int]] = None, limite: Optional[int] = None) -> int:
+        """
+        Analiza las noticias indicadas (o todas las pendientes) y devuelve cuántos análisis guardó
+        """
+        inicio = time.time()
+        db = self.session_factory()
+        try:
+            noticias = self._pendientes(db, ids, limite)
+            if not noticias:
+                return 0
+
+            noticias = self._priorizar(noticias)
+            logger.info(f"🧠 Análisis IA anticipado de {len(noticias)} noticias")
+
+            guardados = 0
+            for i in range(0, len(noticias), self.tamano_lote):
+                lote = noticias[i:i + self.tamano_lote]
+                analisis = ai_analyzer.analizar_lote(lote)
+                guardados += self._guardar(db, analisis)
+
+            logger.info(f"✅ {guardados} análisis IA guardados en {time.time() - inicio:.1f}s")
+            return guardados
+        finally:
+            db.close()
+
+    def _pendientes(self, db, ids: Optional[List[int]], limite: Optional[int]) -> List[Dict[str, Any]]:
+        """Noticias sin análisis, solo con las columnas que necesita el analizador"""
+        query = db.query(
+            models.Noticia.id,
+            models.Noticia.titulo,
+            models.Noticia.contenido,
+            models.Noticia.categoria
+        ).outerjoin(
+            models.AnalisisIA, models.AnalisisIA.noticia_id == models.Noticia.id
+        ).filter(models.AnalisisIA.id.is_(None))
+
+        if ids is not None:
+            if not ids:
+                return []
+            query = query.filter(models.Noticia.id.in_(ids))
+        else:
+            query = query.order_by(models.Noticia.id.desc())
+        if limite:
+            query = query.limit(limite)
+
+        return [
+            {'id': fila.id, 'titulo': fila.titulo, 'contenido': fila.contenido or "", 'categoria': fila.categoria}
+            for fila in query.all()
+        ]
+
+    def _priorizar(self, noticias: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Las de mayor importancia prevista primero (las más recientes desempatan)"""
+        return sorted(
+            noticias,
+            key=lambda n: (ai_analyzer.estimar_importancia(n['titulo'], n['contenido'], n['categoria']), n['id']),
+            reverse=True
+        )
+
+    def _guardar(self, db, analisis: Dict[int, Dict[str, Any]]) -> int:
+        """Inserta los análisis en una sola sentencia; ignora los creados mientras tanto bajo demanda"""
+        if not analisis:
+            return 0
+
+        filas = [
+            {
+                'noticia_id': noticia_id,
+                'resumen': datos.get('resumen', 'Resumen no disponible'),
+                'categoria': datos.get('categoria', 'General'),
+                'sentimiento': datos.get('sentimiento', 'neutral'),
+                'temas_principales': datos.get('temas_principales', []),
+                'puntuacion_importancia': datos.get('puntuacion_importancia', 5),
+                'palabras_clave': datos.get('palabras_clave', [])
+            }
+            for noticia_id, datos in analisis.items()
+        ]
+
+        try:
+            stmt = mysql_insert(models.AnalisisIA).values(filas)
+            # Si ya existe el análisis de esa noticia (unique noticia_id), se conserva el existente
+            db.execute(stmt.on_duplicate_key_update(noticia_id=stmt.inserted.noticia_id))
+            db.commit()
+            # rowcount de ODKU cuenta 2 por fila actualizada en MySQL: se devuelven las filas enviadas
+            return len(filas)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Error guardando lote de {len(filas)} análisis IA: {e}")
+            return 0
+
+# Instancia global
+pipeline_analisis = PipelineAnalisis()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Analiza con IA las noticias que aún no tienen análisis")
+    parser.add_argument("--limite", type=int, default=None, help="Máximo de noticias a analizar (las más recientes)")
+    parser.add_argument("--lote", type=int, default=50, help="Noticias por lote de análisis")
+    args = parser.parse_args()
+    PipelineAnalisis(tamano_lote=args.lote).procesar(limite=args.limite)
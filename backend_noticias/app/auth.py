@@ -60,4 +60,12 @@ def verificar_plan_plus(usuario: schemas_auth.UsuarioResponse = Depends(obtener_
             status_code=status.HTTP_402_PAYMENT_REQUIRED,
             detail="Esta funcionalidad requiere plan Plus"
         )
-    return usuario
\ No newline at end of file
+    return usuario
+
+def verificar_plan_plus_o_admin(usuario: schemas_auth.UsuarioResponse = Depends(obtener_usuario_actual)):
+    if usuario.plan != "plus" and usuario.rol != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_402_PAYMENT_REQUIRED,
+            detail="Esta funcionalidad requiere plan Plus"
+        )
+    return usuario
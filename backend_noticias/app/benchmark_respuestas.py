@@ -0,0 +1,96 @@
+import gzip
+import json
+import time
+import random
+import argparse
+from datetime import date, datetime, timedelta
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CATEGORIAS = ['Política', 'Economía', 'Deportes', 'Tecnología', 'Salud', 'Cultura', 'Internacional', 'General']
+FUENTES = ['RPP', 'Trome', 'El Comercio', 'Diario Sin Fronteras', 'Reddit']
+PALABRAS = (
+    'gobierno presidente congreso economía dólar mercado fútbol equipo partido salud hospital '
+    'tecnología internet inteligencia artificial ministro elecciones inflación empresa vacuna '
+    'investigación universidad mundial acuerdo comercio exportación jugador campeonato'
+).split()
+
+def generar_noticias(cantidad: int, semilla: int = 42) -> list:
+    """Genera noticias sintéticas con la misma forma que schemas.Noticia"""
+    rnd = random.Random(semilla)
+    ahora = datetime(2025, 1, 1, 12, 0, 0)
+    noticias = []
+    for i in range(1, cantidad + 1):
+        titulo = ' '.join(rnd.choice(PALABRAS) for _ in range(rnd.randint(6, 14))).capitalize()
+        contenido = ' '.join(rnd.choice(PALABRAS) for _ in range(rnd.randint(120, 220)))[:1500]
+        noticias.append({
+            'id': i,
+            'titulo': titulo,
+            'enlace': f"https://noticias.example.pe/{rnd.choice(CATEGORIAS).lower()}/{i}-{titulo[:30].replace(' ', '-')}",
+            'fecha': date(2025, 1, 1) - timedelta(days=rnd.randint(0, 30)),
+            'categoria': rnd.choice(CATEGORIAS),
+            'contenido': contenido,
+            'imagen_url': f"https://img.example.pe/{i}.jpg",
+            'fuente': rnd.choice(FUENTES),
+            'fecha_creacion': ahora - timedelta(minutes=rnd.randint(0, 60 * 24 * 30)),
+        })
+    return noticias
+
+def serializar_estandar(noticias: list) -> bytes:
+    """Como JSONResponse por defecto: codificar a tipos JSON y luego json.dumps"""
+    compatibles = [
+        {k: (v.isoformat() if isinstance(v, (date, datetime)) else v) for k, v in noticia.items()}
+        for noticia in noticias
+    ]
+    return json.dumps(compatibles, ensure_ascii=False, allow_nan=False, indent=None, separators=(',', ':')).encode('utf-8')
+
+def serializar_orjson(noticias: list) -> bytes:
+    return orjson.dumps(noticias)
+
+def medir(funcion, repeticiones: int):
+    """Devuelve (resultado, milisegundos promedio)"""
+    resultado = funcion()
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion()
+    return resultado, (time.perf_counter() - inicio) / repeticiones * 1000
+
+def ejecutar_benchmark(cantidad: int, repeticiones: int):
+    noticias = generar_noticias(cantidad)
+    print(f"📰 {cantidad} noticias sintéticas (semilla 42), {repeticiones} repeticiones por caso\n")
+    print(f"{'caso':<34}{'bytes':>12}{'ms':>10}")
+    print('-' * 56)
+
+    cuerpo_estandar, ms_estandar = medir(lambda: serializar_estandar(noticias), repeticiones)
+    print(f"{'json estándar (antes)':<34}{len(cuerpo_estandar):>12,}{ms_estandar:>10.2f}")
+
+    if orjson is None:
+        print("⚠️ orjson no está instalado; se omiten los casos con orjson")
+        return
+
+    cuerpo, ms_serializar = medir(lambda: serializar_orjson(noticias), repeticiones)
+    print(f"{'orjson':<34}{len(cuerpo):>12,}{ms_serializar:>10.2f}")
+
+    comprimido, ms = medir(lambda: gzip.compress(serializar_orjson(noticias), compresslevel=5), repeticiones)
+    print(f"{'orjson + gzip (nivel 5)':<34}{len(comprimido):>12,}{ms:>10.2f}")
+
+    if brotli is not None:
+        comprimido, ms = medir(lambda: brotli.compress(serializar_orjson(noticias), quality=4), repeticiones)
+        print(f"{'orjson + brotli (calidad 4)':<34}{len(comprimido):>12,}{ms:>10.2f}")
+    else:
+        print("ℹ️ brotli no está instalado; se omite el caso br")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bytes y latencia de serialización/compresión de listados")
+    parser.add_argument("--noticias", type=int, default=1000)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+    ejecutar_benchmark(args.noticias, args.repeticiones)
@@ -0,0 +1,403 @@
+import re
+import json
+import time
+import hashlib
+import unicodedata
+import pickle
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+from app.crud_estadisticas import ID_ESTADISTICAS
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Marcador para distinguir "no está en caché" de un valor None guardado
+FALTA = object()
+
+class CacheLRU:
+    """LRU en memoria con TTL por entrada, seguro entre hilos"""
+
+    def __init__(self, max_entradas: int = 512, ttl: float = 300):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: str) -> Any:
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return FALTA
+            expira, valor = entrada
+            if expira < time.monotonic():
+                del self._datos[clave]
+                return FALTA
+            self._datos.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave: str, valor: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + (ttl or self.ttl), valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def borrar(self, clave: str) -> None:
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+class BackendMemoria:
+    """
+    Backend compartido en memoria del proceso.
+    Sirve como sustituto local de Redis (por ejemplo en pruebas): misma interfaz get/set.
+    """
+
+    def __init__(self):
+        self._datos: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, clave: str) -> Optional[bytes]:
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None or entrada[0] < time.monotonic():
+                self._datos.pop(clave, None)
+                return None
+            return entrada[1]
+
+    def set(self, clave: str, valor: bytes, ttl: float) -> None:
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + ttl, valor)
+
+class BackendRedis:
+    """Backend compartido entre procesos/réplicas usando Redis (dependencia opcional)"""
+
+    def __init__(self, url: str):
+        import redis  # Opcional: solo se necesita si se configura CACHE_REDIS_URL
+        self._cliente = redis.Redis.from_url(url)
+
+    def get(self, clave: str) -> Optional[bytes]:
+        return self._cliente.get(clave)
+
+    def set(self, clave: str, valor: bytes, ttl: float) -> None:
+        self._cliente.setex(clave, int(ttl), valor)
+
+class VersionDatos:
+    """
+    Versión de los datos de noticias, leída de estadisticas_agregadas por clave primaria.
+    La ingesta la incrementa en la misma transacción que inserta la noticia, así que
+    cualquier proceso (API o worker) invalida la caché de todos los demás.
+    """
+
+    def __init__(self, ttl: float = 1.0):
+        self.ttl = ttl
+        self._valor = 0
+        self._leida_en = 0.0
+        self._lock = threading.Lock()
+
+    def obtener(self, db: Session) -> int:
+        with self._lock:
+            if time.monotonic() - self._leida_en < self.ttl:
+                return self._valor
+        version = db.query(models.EstadisticasAgregadas.version).filter(
+            models.EstadisticasAgregadas.id == ID_ESTADISTICAS
+        ).scalar() or 0
+        with self._lock:
+            self._valor = version
+            self._leida_en = time.monotonic()
+        return version
+
+class CacheRespuestas:
+    """Caché de respuestas de endpoints de lectura con claves por ruta, parámetros y versión"""
+
+    def __init__(self, local: CacheLRU, backend=None):
+        self.local = local
+        self.backend = backend
+        self._aciertos: Dict[str, int] = {}
+        self._fallos: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def clave(self, ruta: str, version: int, params: Dict[str, Any]) -> str:
+        """Construye la clave a partir de la ruta, los parámetros (ordenados) y la versión"""
+        parametros = json.dumps(params, sort_keys=True, default=str)
+        return f"respuesta:v{version}:{ruta}:{parametros}"
+
+    def obtener(self, ruta: str, version: int, params: Dict[str, Any]) -> Any:
+        clave = self.clave(ruta, version, params)
+        valor = self.local.obtener(clave)
+
+        if valor is FALTA and self.backend is not None:
+            try:
+                serializado = self.backend.get(clave)
+                if serializado is not None:
+                    valor = pickle.loads(serializado)
+                    self.local.guardar(clave, valor)
+            except Exception as e:
+                logger.warning(f"⚠️ Backend de caché no disponible: {e}")
+
+        self._contar(ruta, valor is not FALTA)
+        return valor
+
+    def guardar(self, ruta: str, version: int, params: Dict[str, Any], valor: Any) -> None:
+        clave = self.clave(ruta, version, params)
+        self.local.guardar(clave, valor)
+
+        if self.backend is not None:
+            try:
+                self.backend.set(clave, pickle.dumps(valor), self.local.ttl)
+            except Exception as e:
+                logger.warning(f"⚠️ Backend de caché no disponible: {e}")
+
+    def metricas(self) -> Dict[str, Any]:
+        """Aciertos, fallos y ratio de aciertos global y por ruta"""
+        with self._lock:
+            rutas = set(self._aciertos) | set(self._fallos)
+            por_ruta = {
+                ruta: self._resumen(self._aciertos.get(ruta, 0), self._fallos.get(ruta, 0))
+                for ruta in sorted(rutas)
+            }
+            total = self._resumen(sum(self._aciertos.values()), sum(self._fallos.values()))
+
+        return {
+            **total,
+            'entradas_locales': len(self.local),
+            'backend_compartido': type(self.backend).__name__ if self.backend else None,
+            'por_ruta': por_ruta
+        }
+
+    def _contar(self, ruta: str, acierto: bool) -> None:
+        with self._lock:
+            contadores = self._aciertos if acierto else self._fallos
+            contadores[ruta] = contadores.get(ruta, 0) + 1
+
+    @staticmethod
+    def _resumen(aciertos: int, fallos: int) -> Dict[str, Any]:
+        total = aciertos + fallos
+        return {
+            'aciertos': aciertos,
+            'fallos': fallos,
+            'ratio_aciertos': round(aciertos / total, 4) if total else 0.0
+        }
+
+class FragmentosJSON:
+    """
+    JSON ya serializado de cada noticia, por id y vista ('completa' o 'resumen').
+    Permite armar un listado uniendo bytes sin volver a validar ni serializar modelos.
+    Las noticias no se modifican después de insertarse, así que no hace falta invalidar
+    fragmentos: qué noticias salen en cada listado lo decide la versión de los datos, y
+    ante cambios manuales en la BD las entradas expiran por TTL.
+    """
+
+    # Cambiar si cambia el formato de los schemas serializados
+    VERSION_FORMATO = 1
+
+    def __init__(self, local: CacheLRU):
+        self.local = local
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _clave(self, noticia_id: int, vista: str) -> str:
+        return f"v{self.VERSION_FORMATO}:{vista}:{noticia_id}"
+
+    def obtener_varios(self, ids: Iterable[int], vista: str) -> Dict[int, bytes]:
+        """Devuelve los fragmentos disponibles para los ids pedidos"""
+        encontrados = {}
+        for noticia_id in ids:
+            fragmento = self.local.obtener(self._clave(noticia_id, vista))
+            if fragmento is FALTA:
+                self.fallos += 1
+            else:
+                self.aciertos += 1
+                encontrados[noticia_id] = fragmento
+        return encontrados
+
+    def guardar(self, noticia_id: int, vista: str, fragmento: bytes) -> None:
+        self.local.guardar(self._clave(noticia_id, vista), fragmento)
+
+    @staticmethod
+    def unir(fragmentos: List[bytes]) -> bytes:
+        """Arma un arreglo JSON a partir de los fragmentos ya serializados"""
+        return b"[" + b",".join(fragmentos) + b"]"
+
+    def metricas(self) -> Dict[str, Any]:
+        return {
+            **CacheRespuestas._resumen(self.aciertos, self.fallos),
+            'entradas_locales': len(self.local)
+        }
+
+class CacheLLM:
+    """
+    Respuestas del LLM persistidas en la tabla cache_llm, compartidas entre procesos.
+    La clave es un hash del texto normalizado (título + contenido truncado) y de la
+    versión del prompt, así que cambiar la plantilla deja de acertar con las entradas
+    viejas, que luego salen por desalojo. Se conservan como máximo `max_entradas`,
+    descartando las de uso menos reciente.
+    """
+
+    # Cada cuántas escrituras se comprueba el tamaño de la tabla
+    PODA_CADA = 100
+
+    def __init__(self, max_entradas: int = 50000, session_factory: Callable = SessionLocal):
+        self.max_entradas = max_entradas
+        self.session_factory = session_factory
+        self.aciertos = 0
+        self.fallos = 0
+        self._escrituras = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalizar(texto: Optional[str]) -> str:
+        """Normaliza Unicode, espacios y mayúsculas para que variantes triviales compartan clave"""
+        texto = unicodedata.normalize('NFKC', texto or '')
+        return re.sub(r'\s+', ' ', texto).strip().casefold()
+
+    def clave(self, version_prompt: str, titulo: str, contenido: Optional[str], max_contenido: int = 2000) -> str:
+        partes = [version_prompt, self.normalizar(titulo), self.normalizar((contenido or '')[:max_contenido])]
+        return hashlib.sha256('\x1f'.join(partes).encode('utf-8')).hexdigest()
+
+    def obtener(self, version_prompt: str, titulo: str, contenido: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Devuelve el resultado guardado o None (y cuenta el acierto o fallo)"""
+        clave = self.clave(version_prompt, titulo, contenido)
+        db = self.session_factory()
+        try:
+            entrada = db.get(models.CacheRespuestaLLM, clave)
+            if entrada is None:
+                self._contar(False)
+                return None
+
+            entrada.ultimo_uso = datetime.now()
+            entrada.aciertos = (entrada.aciertos or 0) + 1
+            resultado = entrada.resultado
+            db.commit()
+            self._contar(True)
+            return resultado
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"⚠️ Caché LLM no disponible: {e}")
+            return None
+        finally:
+            db.close()
+
+    def guardar(self, version_prompt: str, titulo: str, contenido: Optional[str], resultado: Dict[str, Any]) -> None:
+        """Guarda (o reemplaza) el resultado de una llamada exitosa"""
+        ahora = datetime.now()
+        db = self.session_factory()
+        try:
+            stmt = mysql_insert(models.CacheRespuestaLLM).values(
+                clave=self.clave(version_prompt, titulo, contenido),
+                version_prompt=version_prompt,
+                resultado=resultado,
+                creado_en=ahora,
+                ultimo_uso=ahora,
+                aciertos=0
+            )
+            db.execute(stmt.on_duplicate_key_update(resultado=stmt.inserted.resultado, ultimo_uso=ahora))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"⚠️ No se pudo guardar en la caché LLM: {e}")
+            return
+        finally:
+            db.close()
+
+        with self._lock:
+            self._escrituras += 1
+            podar = self._escrituras % self.PODA_CADA == 0
+        if podar:
+            self.podar()
+
+    def podar(self) -> int:
+        """Elimina las entradas de uso menos reciente por encima de max_entradas"""
+        db = self.session_factory()
+        try:
+            total = db.query(func.count(models.CacheRespuestaLLM.clave)).scalar() or 0
+            sobrantes = total - self.max_entradas
+            if sobrantes <= 0:
+                return 0
+
+            # Fecha de uso de la última entrada que sobra: se borra todo lo anterior o igual
+            corte = db.query(models.CacheRespuestaLLM.ultimo_uso).order_by(
+                models.CacheRespuestaLLM.ultimo_uso
+            ).offset(sobrantes - 1).limit(1).scalar()
+
+            eliminadas = db.query(models.CacheRespuestaLLM).filter(
+                models.CacheRespuestaLLM.ultimo_uso <= corte
+            ).delete(synchronize_session=False)
+            db.commit()
+            logger.info(f"🧹 Caché LLM: {eliminadas} entradas desalojadas")
+            return eliminadas
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"⚠️ Error podando la caché LLM: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def _contar(self, acierto: bool) -> None:
+        with self._lock:
+            if acierto:
+                self.aciertos += 1
+            else:
+                self.fallos += 1
+
+    def metricas(self) -> Dict[str, Any]:
+        return {
+            **CacheRespuestas._resumen(self.aciertos, self.fallos),
+            'max_entradas': self.max_entradas
+        }
+
+def calcular_etag(version: int, ruta: str, params: Dict[str, Any]) -> str:
+    """ETag fuerte a partir de la versión de datos y la consulta (ruta + parámetros)"""
+    consulta = f"{ruta}:{json.dumps(params, sort_keys=True, default=str)}"
+    huella = hashlib.sha1(consulta.encode('utf-8')).hexdigest()[:16]
+    return f'"v{version}-{huella}"'
+
+def etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    """Indica si la cabecera If-None-Match incluye el ETag actual"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidatos = [candidato.strip().removeprefix('W/') for candidato in if_none_match.split(',')]
+    # CompresionMiddleware añade la codificación al ETag de las respuestas comprimidas
+    return any(
+        candidato == etag or candidato in (f'{etag[:-1]}-br"', f'{etag[:-1]}-gzip"')
+        for candidato in candidatos
+    )
+
+def _crear_backend():
+    """Crea el backend compartido si está configurado"""
+    if not settings.CACHE_REDIS_URL:
+        return None
+    try:
+        return BackendRedis(settings.CACHE_REDIS_URL)
+    except Exception as e:
+        logger.error(f"❌ No se pudo inicializar Redis para la caché, se usa solo caché local: {e}")
+        return None
+
+# Instancias globales
+version_datos = VersionDatos(ttl=settings.CACHE_VERSION_TTL)
+cache_respuestas = CacheRespuestas(
+    CacheLRU(max_entradas=settings.CACHE_MAX_ENTRADAS, ttl=settings.CACHE_TTL_SEGUNDOS),
+    backend=_crear_backend()
+)
+fragmentos_noticias = FragmentosJSON(
+    CacheLRU(max_entradas=settings.FRAGMENTOS_MAX_ENTRADAS, ttl=settings.FRAGMENTOS_TTL_SEGUNDOS)
+)
+cache_llm = CacheLLM(max_entradas=settings.LLM_CACHE_MAX_ENTRADAS)
@@ -0,0 +1,385 @@
+import os
+import sys
+import json
+import time
+import zlib
+import logging
+import argparse
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Agregar el directorio padre al path para imports
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from app.config import settings
+from app.texto import DocumentoTexto, PATRON_PALABRA, STOP_WORDS
+
+# NumPy/SciPy son opcionales: sin ellos solo se usa el clasificador por palabras clave
+try:
+    import numpy as np
+    from scipy import sparse
+    VECTORIZADO_DISPONIBLE = True
+except ImportError:
+    np = None
+    sparse = None
+    VECTORIZADO_DISPONIBLE = False
+
+logger = logging.getLogger(__name__)
+
+VERSION_ARTEFACTO = 1
+
+# Partes de la URL que no aportan a la categoría
+TOKENS_URL_IGNORADOS = {'http', 'https', 'www', 'com', 'pe', 'html', 'php', 'amp', 'noticia', 'noticias'}
+
+def ruta_artefacto(ruta: str) -> str:
+    """Ruta real del modelo: np.savez_compressed añade '.npz' si falta, así que se normaliza aquí"""
+    return ruta if ruta.endswith('.npz') else f"{ruta}.npz"
+
+def extraer_caracteristicas(documento: DocumentoTexto, url: str = "") -> Counter:
+    """
+    Características de una noticia: palabras y bigramas del texto, palabras del título
+    (con prefijo propio para darles más peso) y palabras de la URL
+    """
+    caracteristicas = Counter()
+    for termino, cantidad in documento.conteos.items():
+        if any(palabra in STOP_WORDS or len(palabra) < 3 for palabra in termino.split(' ')):
+            continue
+        caracteristicas[termino] += cantidad
+    for token in documento.tokens_titulo:
+        if token not in STOP_WORDS:
+            caracteristicas[f"t:{token}"] += 1
+    for token in PATRON_PALABRA.findall((url or "").lower()):
+        if token not in TOKENS_URL_IGNORADOS and not token.isdigit():
+            caracteristicas[f"u:{token}"] += 1
+    return caracteristicas
+
+class VectorizadorHashing:
+    """
+    Convierte noticias en una matriz dispersa (noticias x 2^bits) sin guardar vocabulario:
+    cada característica va a la columna crc32(característica) mod 2^bits. crc32 es estable
+    entre procesos (a diferencia de hash()), así que el modelo guardado sigue siendo válido.
+    """
+
+    def __init__(self, bits: int = 18):
+        self.bits = bits
+        self.n_caracteristicas = 1 << bits
+
+    def transformar(self, noticias: Sequence[Tuple[DocumentoTexto, str]]):
+        mascara = self.n_caracteristicas - 1
+        indptr = [0]
+        indices: List[int] = []
+        datos: List[float] = []
+        for documento, url in noticias:
+            for caracteristica, cantidad in extraer_caracteristicas(documento, url).items():
+                indices.append(zlib.crc32(caracteristica.encode('utf-8')) & mascara)
+                datos.append(cantidad)
+            indptr.append(len(indices))
+
+        matriz = sparse.csr_matrix(
+            (np.asarray(datos, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+            shape=(len(noticias), self.n_caracteristicas)
+        )
+        # Colisiones del hash dentro de una misma noticia: sumar y después TF sublineal
+        matriz.sum_duplicates()
+        matriz.data = np.log1p(matriz.data)
+        return matriz
+
+class ClasificadorML:
+    """
+    Naive Bayes multinomial sobre características con hashing.
+    El entrenamiento son dos productos de matrices dispersas (conteos por clase) y la
+    predicción de un lote entero es un único producto matriz dispersa x pesos densos.
+
+    Naive Bayes suma como independientes características que no lo son, así que sus
+    probabilidades salen casi siempre ~0.9999. Por eso los puntajes se dividen por una
+    temperatura ajustada con noticias reservadas (metadatos['temperatura']) antes del softmax.
+    """
+
+    def __init__(self, clases: List[str], log_prior, pesos, bits: int, metadatos: Optional[Dict[str, Any]] = None):
+        self.clases = clases
+        self.log_prior = log_prior  # (clases,)
+        self.pesos = pesos          # (2^bits, clases): log P(característica | clase)
+        self.vectorizador = VectorizadorHashing(bits)
+        self.metadatos = metadatos or {}
+
+    @property
+    def temperatura(self) -> float:
+        return float(self.metadatos.get('temperatura', 1.0))
+
+    @classmethod
+    def entrenar(
+        cls, noticias: Sequence[Tuple[DocumentoTexto, str]], etiquetas: Sequence[str], bits: int = 18, alpha: float = 0.1
+    ) -> 'ClasificadorML':
+        vectorizador = VectorizadorHashing(bits)
+        X = vectorizador.transformar(noticias)
+        clases = sorted(set(etiquetas))
+        indice_clase = {clase: i for i, clase in enumerate(clases)}
+        y = np.fromiter((indice_clase[e] for e in etiquetas), dtype=np.int64, count=len(etiquetas))
+
+        # Matriz de pertenencia (clases x noticias): conteos por clase en un solo producto
+        Y = sparse.csr_matrix((np.ones(len(y), dtype=np.float32), (y, np.arange(len(y)))), shape=(len(clases), len(y)))
+        conteos = np.asarray((Y @ X).todense(), dtype=np.float64) + alpha
+        log_probs = np.log(conteos) - np.log(conteos.sum(axis=1, keepdims=True))
+        log_prior = np.log(np.bincount(y, minlength=len(clases)) / len(y))
+
+        return cls(
+            clases,
+            log_prior.astype(np.float32),
+            np.ascontiguousarray(log_probs.T, dtype=np.float32),
+            bits,
+            {'ejemplos': len(y), 'alpha': alpha, 'entrenado_en': time.strftime('%Y-%m-%d %H:%M:%S')}
+        )
+
+    def calibrar(self, noticias: Sequence[Tuple[DocumentoTexto, str]], etiquetas: Sequence[str]) -> float:
+        """
+        Elige la temperatura que minimiza la log-verosimilitud negativa en noticias que el
+        modelo no vio al entrenar; no cambia la categoría predicha, solo la confianza
+        """
+        indice_clase = {clase: i for i, clase in enumerate(self.clases)}
+        conocidas = [i for i, etiqueta in enumerate(etiquetas) if etiqueta in indice_clase]
+        if not conocidas:
+            return self.temperatura
+        puntajes = self._puntajes([noticias[i] for i in conocidas])
+        y = np.asarray([indice_clase[etiquetas[i]] for i in conocidas])
+
+        mejor, mejor_nll = 1.0, np.inf
+        for temperatura in np.logspace(0, 3, 61):
+            log_probs = self._log_softmax(puntajes / temperatura)
+            nll = -log_probs[np.arange(len(y)), y].mean()
+            if nll < mejor_nll:
+                mejor, mejor_nll = float(temperatura), nll
+        self.metadatos['temperatura'] = mejor
+        return mejor
+
+    def _puntajes(self, noticias: Sequence[Tuple[DocumentoTexto, str]]):
+        return np.asarray(self.vectorizador.transformar(noticias) @ self.pesos, dtype=np.float64) + self.log_prior
+
+    @staticmethod
+    def _log_softmax(puntajes):
+        puntajes = puntajes - puntajes.max(axis=1, keepdims=True)
+        return puntajes - np.log(np.exp(puntajes).sum(axis=1, keepdims=True))
+
+    def predecir_lote(self, noticias: Sequence[Tuple[DocumentoTexto, str]]) -> List[Tuple[str, float]]:
+        """(categoría, probabilidad calibrada) de cada noticia, calculadas con un solo producto de matrices"""
+        if not noticias:
+            return []
+        probabilidades = np.exp(self._log_softmax(self._puntajes(noticias) / self.temperatura))
+        mejores = probabilidades.argmax(axis=1)
+        return [
+            (self.clases[clase], float(probabilidades[i, clase]))
+            for i, clase in enumerate(mejores)
+        ]
+
+    def guardar(self, ruta: str) -> str:
+        """Guarda el modelo y devuelve la ruta escrita (con extensión .npz)"""
+        ruta = ruta_artefacto(ruta)
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        np.savez_compressed(
+            ruta,
+            version=np.int32(VERSION_ARTEFACTO),
+            bits=np.int32(self.vectorizador.bits),
+            clases=np.asarray(self.clases),
+            log_prior=self.log_prior,
+            pesos=self.pesos,
+            metadatos=np.asarray(json.dumps(self.metadatos, ensure_ascii=False))
+        )
+        return ruta
+
+    @classmethod
+    def cargar(cls, ruta: str) -> 'ClasificadorML':
+        with np.load(ruta_artefacto(ruta), allow_pickle=False) as artefacto:
+            if int(artefacto['version']) != VERSION_ARTEFACTO:
+                raise ValueError(f"Versión de modelo no soportada: {int(artefacto['version'])}")
+            return cls(
+                [str(clase) for clase in artefacto['clases']],
+                artefacto['log_prior'],
+                artefacto['pesos'],
+                int(artefacto['bits']),
+                json.loads(str(artefacto['metadatos']))
+            )
+
+_modelo: Optional[ClasificadorML] = None
+_modelo_cargado = False
+_lock_modelo = threading.Lock()
+
+def obtener_modelo() -> Optional[ClasificadorML]:
+    """Modelo entrenado de settings.CLASIFICADOR_MODELO_RUTA (se carga una vez), o None si no hay"""
+    global _modelo, _modelo_cargado
+    if _modelo_cargado:
+        return _modelo
+    with _lock_modelo:
+        if not _modelo_cargado:
+            ruta = ruta_artefacto(settings.CLASIFICADOR_MODELO_RUTA)
+            if VECTORIZADO_DISPONIBLE and os.path.exists(ruta):
+                try:
+                    _modelo = ClasificadorML.cargar(ruta)
+                    logger.info(f"✅ Clasificador entrenado cargado ({len(_modelo.clases)} categorías, {ruta})")
+                except Exception as e:
+                    logger.error(f"❌ No se pudo cargar el clasificador entrenado {ruta}: {e}")
+            _modelo_cargado = True
+    return _modelo
+
+# ==================== ENTRENAMIENTO Y EVALUACIÓN ====================
+
+def en_prueba(noticia_id: int, fraccion: float) -> bool:
+    """División determinista entrenamiento/prueba por ID (estable entre ejecuciones)"""
+    return zlib.crc32(str(noticia_id).encode()) % 10000 < fraccion * 10000
+
+def cargar_ejemplos(limite: Optional[int] = None) -> List[Tuple[int, DocumentoTexto, str, str]]:
+    """(id, documento, enlace, categoría) de las noticias etiquetadas, las más recientes primero"""
+    from app import models
+    from app.classification import SUBREDDIT_CATEGORIAS
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        query = db.query(
+            models.Noticia.id, models.Noticia.titulo, models.Noticia.contenido, models.Noticia.enlace,
+            models.Noticia.categoria, models.Noticia.subreddit
+        ).filter(models.Noticia.categoria.isnot(None)).order_by(models.Noticia.id.desc())
+        if limite:
+            query = query.limit(limite)
+
+        ejemplos = []
+        for fila in query.yield_per(1000):
+            # Los posts de Reddit se etiquetan por su subreddit cuando está mapeado
+            categoria = SUBREDDIT_CATEGORIAS.get(fila.subreddit, fila.categoria)
+            ejemplos.append((fila.id, DocumentoTexto(fila.titulo, fila.contenido), fila.enlace or "", categoria))
+        return ejemplos
+    finally:
+        db.close()
+
+def informe(nombre: str, reales: List[str], predichas: List[str], segundos: float) -> Dict[str, Any]:
+    """Exactitud, precisión/recall por categoría y velocidad; lo imprime y lo devuelve"""
+    aciertos = sum(1 for r, p in zip(reales, predichas) if r == p)
+    exactitud = aciertos / len(reales) if reales else 0.0
+    print(f"\n📊 {nombre}: exactitud {exactitud:.3f} ({aciertos}/{len(reales)}), "
+          f"{len(reales) / segundos if segundos else 0:.0f} noticias/s")
+    print(f"   {'categoría':<16}{'precisión':>10}{'recall':>8}{'soporte':>9}")
+    por_categoria = {}
+    for categoria in sorted(set(reales) | set(predichas)):
+        vp = sum(1 for r, p in zip(reales, predichas) if r == categoria and p == categoria)
+        predichos = sum(1 for p in predichas if p == categoria)
+        soporte = sum(1 for r in reales if r == categoria)
+        precision = vp / predichos if predichos else 0.0
+        recall = vp / soporte if soporte else 0.0
+        por_categoria[categoria] = {'precision': precision, 'recall': recall, 'soporte': soporte}
+        print(f"   {categoria:<16}{precision:>10.3f}{recall:>8.3f}{soporte:>9}")
+    return {'exactitud': exactitud, 'noticias_por_segundo': len(reales) / segundos if segundos else 0.0,
+            'por_categoria': por_categoria}
+
+def evaluar(modelo: ClasificadorML, ejemplos: List[Tuple[int, DocumentoTexto, str, str]], lote: int = 1000) -> None:
+    """Compara el modelo con el clasificador por palabras clave sobre los mismos ejemplos"""
+    from app.classification import clasificador
+
+    reales = [categoria for _, _, _, categoria in ejemplos]
+
+    inicio = time.perf_counter()
+    predicciones = []
+    for i in range(0, len(ejemplos), lote):
+        bloque = ejemplos[i:i + lote]
+        predicciones.extend(modelo.predecir_lote([(doc, url) for _, doc, url, _ in bloque]))
+    predichas = [c for c, _ in predicciones]
+    informe("Modelo entrenado", reales, predichas, time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    por_palabras = [clasificador.clasificar_por_palabras(doc, url) for _, doc, url, _ in ejemplos]
+    informe("Palabras clave (respaldo)", reales, por_palabras, time.perf_counter() - inicio)
+
+    informe_umbrales(reales, predicciones, por_palabras)
+
+def informe_umbrales(
+    reales: List[str], predicciones: List[Tuple[str, float]], por_palabras: List[str],
+    umbrales: Sequence[float] = (0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+) -> Dict[float, Dict[str, float]]:
+    """
+    Para cada umbral de confianza: qué fracción decide el modelo, su exactitud en esa
+    fracción y la exactitud combinada con el respaldo; sirve para elegir CLASIFICADOR_UMBRAL_CONFIANZA
+    """
+    print(f"\n🎚️ Umbral de confianza (actual: {settings.CLASIFICADOR_UMBRAL_CONFIANZA})")
+    print(f"   {'umbral':<8}{'cobertura':>10}{'exactitud modelo':>18}{'exactitud total':>17}")
+    resultado = {}
+    for umbral in umbrales:
+        decididas = [i for i, (_, confianza) in enumerate(predicciones) if confianza >= umbral]
+        aciertos_modelo = sum(1 for i in decididas if predicciones[i][0] == reales[i])
+        combinadas = [
+            categoria if confianza >= umbral else respaldo
+            for (categoria, confianza), respaldo in zip(predicciones, por_palabras)
+        ]
+        cobertura = len(decididas) / len(reales) if reales else 0.0
+        exactitud_modelo = aciertos_modelo / len(decididas) if decididas else 0.0
+        exactitud_total = sum(1 for r, c in zip(reales, combinadas) if r == c) / len(reales) if reales else 0.0
+        resultado[umbral] = {'cobertura': cobertura, 'exactitud_modelo': exactitud_modelo, 'exactitud_total': exactitud_total}
+        print(f"   {umbral:<8}{cobertura:>10.3f}{exactitud_modelo:>18.3f}{exactitud_total:>17.3f}")
+    return resultado
+
+def comando_entrenar(args) -> None:
+    ejemplos = cargar_ejemplos(args.limite)
+    if not ejemplos:
+        sys.exit("No hay noticias etiquetadas para entrenar")
+    entrenamiento = [e for e in ejemplos if not en_prueba(e[0], args.prueba)]
+    prueba = [e for e in ejemplos if en_prueba(e[0], args.prueba)]
+    print(f"🧠 Entrenando con {len(entrenamiento)} noticias ({len(prueba)} reservadas para prueba)")
+
+    inicio = time.perf_counter()
+    modelo = ClasificadorML.entrenar(
+        [(doc, url) for _, doc, url, _ in entrenamiento],
+        [categoria for _, _, _, categoria in entrenamiento],
+        bits=args.bits,
+        alpha=args.alpha
+    )
+    modelo.metadatos['fraccion_prueba'] = args.prueba
+    print(f"⏱️ Entrenamiento: {time.perf_counter() - inicio:.2f}s, categorías: {', '.join(modelo.clases)}")
+
+    if prueba:
+        temperatura = modelo.calibrar(
+            [(doc, url) for _, doc, url, _ in prueba], [categoria for _, _, _, categoria in prueba]
+        )
+        print(f"🌡️ Temperatura de calibración: {temperatura:.1f}")
+        evaluar(modelo, prueba)
+    else:
+        print("⚠️ Sin noticias reservadas no se calibra la confianza: el umbral casi nunca recurrirá a las palabras clave")
+
+    ruta = modelo.guardar(args.salida)
+    print(f"\n💾 Modelo guardado en {ruta} ({os.path.getsize(ruta) / 1024:.0f} KB)")
+
+def comando_evaluar(args) -> None:
+    modelo = ClasificadorML.cargar(args.modelo)
+    fraccion = modelo.metadatos.get('fraccion_prueba', 0)
+    ejemplos = cargar_ejemplos(args.limite)
+    if fraccion:
+        # Solo las noticias que el modelo no vio al entrenar
+        ejemplos = [e for e in ejemplos if en_prueba(e[0], fraccion)]
+    else:
+        print("⚠️ El modelo se entrenó con todos los datos: la exactitud será optimista")
+    if not ejemplos:
+        sys.exit("No hay noticias para evaluar")
+    evaluar(modelo, ejemplos)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if not VECTORIZADO_DISPONIBLE:
+        sys.exit("NumPy y SciPy son necesarios para el clasificador entrenado (pip install numpy scipy)")
+
+    parser = argparse.ArgumentParser(description="Entrena y evalúa el clasificador de categorías de noticias")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    entrenar = subparsers.add_parser("entrenar", help="Entrena con noticias.categoria y guarda el modelo")
+    entrenar.add_argument("--salida", default=settings.CLASIFICADOR_MODELO_RUTA)
+    entrenar.add_argument("--bits", type=int, default=18, help="Columnas del hashing = 2^bits")
+    entrenar.add_argument("--alpha", type=float, default=0.1, help="Suavizado de Laplace")
+    entrenar.add_argument("--prueba", type=float, default=0.2, help="Fracción reservada para evaluar (0 = usar todo)")
+    entrenar.add_argument("--limite", type=int, default=None, help="Máximo de noticias (las más recientes)")
+    entrenar.set_defaults(funcion=comando_entrenar)
+
+    evaluar_parser = subparsers.add_parser("evaluar", help="Evalúa un modelo guardado frente a las palabras clave")
+    evaluar_parser.add_argument("--modelo", default=settings.CLASIFICADOR_MODELO_RUTA)
+    evaluar_parser.add_argument("--limite", type=int, default=None, help="Máximo de noticias (las más recientes)")
+    evaluar_parser.set_defaults(funcion=comando_evaluar)
+
+    args = parser.parse_args()
+    args.funcion(args)
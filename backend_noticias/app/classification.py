@@ -1,5 +1,22 @@
-import re
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.clasificador_ml import obtener_modelo
+from app.texto import DocumentoTexto, AutomataPalabras, PATRON_PALABRA, pares_por_categoria
+
+# Mapeo directo de subreddits a categorías; también sirve de etiqueta para entrenar app.clasificador_ml
+SUBREDDIT_CATEGORIAS: Dict[str, str] = {
+    'worldnews': 'Internacional',
+    'news': 'General',
+    'technology': 'Tecnología',
+    'science': 'Tecnología',
+    'politics': 'Política',
+    'economics': 'Economía',
+    'sports': 'Deportes',
+    'health': 'Salud',
+    'programming': 'Tecnología',
+    'MachineLearning': 'Tecnología'
+}
 
 class ClasificadorNoticias:
     def __init__(self):
@@ -41,23 +58,9 @@ class ClasificadorNoticias:
                 'embajada', 'consulado', 'migración', 'refugiado', 'global', 'geopolítica'
             ]
         }
-    
-    def clasificar_noticia(self, titulo: str, contenido: str, url: str) -> str:
-        """
-        Clasifica una noticia basándose en palabras clave en título, contenido y URL
-        """
-        texto_completo = f"{titulo.lower()} {contenido.lower()} {url.lower()}"
         
-        puntuaciones = {categoria: 0 for categoria in self.palabras_clave.keys()}
-        
-        # Contar ocurrencias de palabras clave
-        for categoria, palabras in self.palabras_clave.items():
-            for palabra in palabras:
-                if palabra.lower() in texto_completo:
-                    puntuaciones[categoria] += 1
-        
-        # Buscar patrones específicos en URL
-        patrones_url = {
+        # Patrones específicos en URL
+        self.patrones_url: Dict[str, List[str]] = {
             'Política': ['politica', 'gobierno', 'congreso'],
             'Economía': ['economia', 'finanzas', 'negocios'],
             'Deportes': ['deportes', 'futbol', 'deporte'],
@@ -66,11 +69,70 @@ class ClasificadorNoticias:
             'Cultura': ['cultura', 'entretenimiento', 'espectaculos'],
             'Internacional': ['internacional', 'mundo', 'exterior']
         }
+        self._compilar_automatas()
+    
+    def configurar(
+        self, palabras_clave: Optional[Dict[str, List[str]]] = None, patrones_url: Optional[Dict[str, List[str]]] = None
+    ) -> None:
+        """Cambia las palabras clave o los patrones de URL y recompila los autómatas"""
+        if palabras_clave is not None:
+            self.palabras_clave = palabras_clave
+        if patrones_url is not None:
+            self.patrones_url = patrones_url
+        self._compilar_automatas()
+    
+    def _compilar_automatas(self) -> None:
+        """Los autómatas se compilan una vez; modificar los diccionarios sin configurar() no los actualiza"""
+        self._automata_palabras = AutomataPalabras(pares_por_categoria(self.palabras_clave))
+        self._automata_url = AutomataPalabras(pares_por_categoria(self.patrones_url))
+    
+    def clasificar_noticia(
+        self, titulo: str, contenido: str, url: str, documento: Optional[DocumentoTexto] = None
+    ) -> str:
+        """
+        Clasifica una noticia con el modelo entrenado si existe y está seguro;
+        si no, por palabras clave en título, contenido y URL
+        """
+        return self.clasificar_lote([(titulo, contenido, url)], [documento] if documento else None)[0]
+    
+    def clasificar_lote(
+        self, noticias: List[Tuple[str, str, str]], documentos: Optional[List[DocumentoTexto]] = None
+    ) -> List[str]:
+        """Clasifica varias (titulo, contenido, url); el modelo predice todo el lote en un solo producto de matrices"""
+        documentos = documentos or [DocumentoTexto(titulo, contenido) for titulo, contenido, _ in noticias]
+        urls = [url or "" for _, _, url in noticias]
+        
+        modelo = obtener_modelo()
+        predicciones = modelo.predecir_lote(list(zip(documentos, urls))) if modelo else [(None, 0.0)] * len(noticias)
+        
+        return [
+            categoria if categoria and confianza >= settings.CLASIFICADOR_UMBRAL_CONFIANZA
+            else self.clasificar_por_palabras(documento, url)
+            for (categoria, confianza), documento, url in zip(predicciones, documentos, urls)
+        ]
+    
+    def clasificar_por_palabras(self, documento: DocumentoTexto, url: str) -> str:
+        """
+        Clasifica una noticia basándose en palabras clave en título, contenido y URL
+        """
+        # Título y contenido vienen tokenizados; la URL aparte porque es corta
+        tokens_url = PATRON_PALABRA.findall(url.lower())
+        automata_palabras, automata_url = self._automata_palabras, self._automata_url
+        
+        puntuaciones = {categoria: 0 for categoria in self.palabras_clave.keys()}
+        
+        # Palabras clave presentes en título, contenido o URL: una pasada por texto
+        encontradas = (
+            automata_palabras.buscar(documento.tokens_titulo)
+            | automata_palabras.buscar(documento.tokens)
+            | automata_palabras.buscar(tokens_url)
+        )
+        for indice in encontradas:
+            puntuaciones[automata_palabras.valores[indice]] += 1
         
-        for categoria, patrones in patrones_url.items():
-            for patron in patrones:
-                if patron in url.lower():
-                    puntuaciones[categoria] += 2
+        # Patrones específicos en URL
+        for indice in automata_url.buscar(tokens_url):
+            puntuaciones[automata_url.valores[indice]] += 2
         
         # Encontrar categoría con mayor puntuación
         categoria_max = max(puntuaciones.items(), key=lambda x: x[1])
@@ -0,0 +1,248 @@
+import time
+import random
+import asyncio
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 solo si está instalado el paquete h2
+try:
+    import h2  # noqa: F401
+    HTTP2_DISPONIBLE = True
+except ImportError:
+    HTTP2_DISPONIBLE = False
+
+# Respuestas que se reintentan (además de los errores de red)
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+class ErrorLLM(Exception):
+    """Fallo definitivo de una llamada al LLM (sin más reintentos)"""
+
+def estimar_tokens(texto: str) -> int:
+    """Estimación aproximada de tokens (~4 caracteres por token)"""
+    return max(1, len(texto) // 4)
+
+class LimitadorTasa:
+    """
+    Cubetas de peticiones por minuto (RPM) y tokens por minuto (TPM).
+    Cada llamada espera hasta que haya cupo en ambas; se usa desde un solo bucle asyncio.
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._peticiones = float(rpm)
+        self._tokens = float(tpm)
+        self._ultima_recarga = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _recargar(self) -> None:
+        ahora = time.monotonic()
+        transcurrido = ahora - self._ultima_recarga
+        self._ultima_recarga = ahora
+        self._peticiones = min(self.rpm, self._peticiones + transcurrido * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + transcurrido * self.tpm / 60)
+
+    async def esperar(self, tokens: int) -> None:
+        """Reserva una petición y `tokens` tokens, esperando lo necesario"""
+        tokens = min(tokens, self.tpm)
+        async with self._lock:
+            while True:
+                self._recargar()
+                if self._peticiones >= 1 and self._tokens >= tokens:
+                    self._peticiones -= 1
+                    self._tokens -= tokens
+                    return
+                espera = max(
+                    (1 - self._peticiones) * 60 / self.rpm,
+                    (tokens - self._tokens) * 60 / self.tpm,
+                    0.01
+                )
+                await asyncio.sleep(espera)
+
+    def ajustar(self, estimados: int, reales: int) -> None:
+        """Corrige la reserva con los tokens que informó la API"""
+        self._tokens = min(self.tpm, self._tokens - (reales - estimados))
+
+class BucleFondo:
+    """Bucle asyncio en un hilo propio para usar el cliente desde código síncrono"""
+
+    def __init__(self):
+        self._bucle: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def obtener(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._bucle is None:
+                self._bucle = asyncio.new_event_loop()
+                threading.Thread(target=self._bucle.run_forever, name='bucle-llm', daemon=True).start()
+            return self._bucle
+
+    def ejecutar(self, corrutina, timeout: Optional[float] = None) -> Any:
+        """Ejecuta la corrutina en el bucle de fondo y espera su resultado"""
+        return asyncio.run_coroutine_threadsafe(corrutina, self.obtener()).result(timeout)
+
+class ClienteLLM:
+    """
+    Cliente asíncrono para generateContent de Gemini.
+
+    - Un solo httpx.AsyncClient con pool de conexiones (HTTP/2 si h2 está instalado).
+    - Semáforo que limita las peticiones simultáneas.
+    - Limitador RPM/TPM antes de cada intento.
+    - Reintentos con backoff exponencial y jitter ante 429/5xx y errores de red,
+      respetando Retry-After cuando la API lo envía.
+
+    Todas las llamadas se ejecutan en un bucle asyncio propio (hilo de fondo), así el
+    pool y los límites se comparten entre handlers async, síncronos y workers.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        url_base: str = 'https://generativelanguage.googleapis.com',
+        modelo: str = 'gemini-pro',
+        max_concurrencia: int = 4,
+        rpm: int = 60,
+        tpm: int = 32000,
+        max_reintentos: int = 5,
+        timeout: float = 30.0,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0
+    ):
+        self.api_key = api_key
+        self.url = f"{url_base.rstrip('/')}/v1beta/models/{modelo}:generateContent"
+        self.max_concurrencia = max_concurrencia
+        self.max_reintentos = max_reintentos
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._rpm = rpm
+        self._tpm = tpm
+        self._cliente: Optional[httpx.AsyncClient] = None
+        self._semaforo: Optional[asyncio.Semaphore] = None
+        self._limitador: Optional[LimitadorTasa] = None
+        self._bucle_fondo = BucleFondo()
+        self._metricas = {'peticiones': 0, 'reintentos': 0, 'errores': 0, 'tokens': 0}
+
+    def _preparar(self) -> None:
+        # Se crean dentro del bucle que los va a usar
+        if self._cliente is None:
+            self._cliente = httpx.AsyncClient(
+                http2=HTTP2_DISPONIBLE,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrencia,
+                    max_keepalive_connections=self.max_concurrencia
+                ),
+                headers={'x-goog-api-key': self.api_key}
+            )
+            self._semaforo = asyncio.Semaphore(self.max_concurrencia)
+            self._limitador = LimitadorTasa(self._rpm, self._tpm)
+
+    async def generar(self, prompt: str, tokens_salida: int = 512) -> str:
+        """Envía el prompt y devuelve el texto de la primera respuesta candidata"""
+        bucle = self._bucle_fondo.obtener()
+        if asyncio.get_running_loop() is bucle:
+            return await self._generar(prompt, tokens_salida)
+        futuro = asyncio.run_coroutine_threadsafe(self._generar(prompt, tokens_salida), bucle)
+        return await asyncio.wrap_future(futuro)
+
+    def generar_sync(self, prompt: str, tokens_salida: int = 512) -> str:
+        """Versión síncrona de generar() para código que no corre en un bucle asyncio"""
+        return self._bucle_fondo.ejecutar(self._generar(prompt, tokens_salida))
+
+    def ejecutar(self, corrutina) -> Any:
+        """Ejecuta una corrutina que usa el cliente en su bucle de fondo y espera el resultado"""
+        return self._bucle_fondo.ejecutar(corrutina)
+
+    async def _generar(self, prompt: str, tokens_salida: int) -> str:
+        self._preparar()
+        datos = {"contents": [{"parts": [{"text": prompt}]}]}
+        estimados = estimar_tokens(prompt) + tokens_salida
+
+        async with self._semaforo:
+            for intento in range(self.max_reintentos + 1):
+                await self._limitador.esperar(estimados)
+                self._metricas['peticiones'] += 1
+                try:
+                    respuesta = await self._cliente.post(self.url, json=datos)
+                except httpx.TransportError as e:
+                    espera = self._backoff(intento)
+                    motivo = f"error de red: {e}"
+                else:
+                    if respuesta.status_code < 400:
+                        return self._extraer_texto(respuesta.json(), estimados)
+                    if respuesta.status_code not in ESTADOS_REINTENTABLES:
+                        self._metricas['errores'] += 1
+                        raise ErrorLLM(f"HTTP {respuesta.status_code}: {respuesta.text[:200]}")
+                    espera = self._retry_after(respuesta) or self._backoff(intento)
+                    motivo = f"HTTP {respuesta.status_code}"
+
+                if intento == self.max_reintentos:
+                    break
+                self._metricas['reintentos'] += 1
+                logger.warning(f"⚠️ LLM {motivo}, reintento {intento + 1}/{self.max_reintentos} en {espera:.1f}s")
+                await asyncio.sleep(espera)
+
+        self._metricas['errores'] += 1
+        raise ErrorLLM(f"Sin respuesta del LLM tras {self.max_reintentos} reintentos ({motivo})")
+
+    def _extraer_texto(self, resultado: Dict[str, Any], estimados: int) -> str:
+        uso = resultado.get('usageMetadata', {}).get('totalTokenCount')
+        if uso:
+            self._limitador.ajustar(estimados, uso)
+            self._metricas['tokens'] += uso
+        try:
+            return resultado['candidates'][0]['content']['parts'][0]['text']
+        except (KeyError, IndexError, TypeError):
+            self._metricas['errores'] += 1
+            raise ErrorLLM(f"Respuesta sin candidatos: {str(resultado)[:200]}")
+
+    def _backoff(self, intento: int) -> float:
+        """Backoff exponencial con jitter completo"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** intento))
+
+    def _retry_after(self, respuesta: httpx.Response) -> Optional[float]:
+        """Segundos indicados por Retry-After (número o fecha HTTP), si los hay"""
+        valor = respuesta.headers.get('retry-after')
+        if not valor:
+            return None
+        try:
+            return min(self.backoff_max, max(0.0, float(valor)))
+        except ValueError:
+            pass
+        try:
+            fecha = parsedate_to_datetime(valor)
+            return min(self.backoff_max, max(0.0, (fecha - datetime.now(timezone.utc)).total_seconds()))
+        except (TypeError, ValueError):
+            return None
+
+    def metricas(self) -> Dict[str, Any]:
+        return {**self._metricas, 'http2': HTTP2_DISPONIBLE, 'max_concurrencia': self.max_concurrencia}
+
+    def cerrar(self) -> None:
+        """Cierra el pool de conexiones"""
+        if self._cliente is not None:
+            self._bucle_fondo.ejecutar(self._cliente.aclose())
+            self._cliente = None
+
+def crear_cliente(api_key: str) -> ClienteLLM:
+    """Cliente configurado según settings"""
+    return ClienteLLM(
+        api_key=api_key,
+        url_base=settings.LLM_URL_BASE,
+        modelo=settings.LLM_MODELO,
+        max_concurrencia=settings.LLM_MAX_CONCURRENCIA,
+        rpm=settings.LLM_RPM,
+        tpm=settings.LLM_TPM,
+        max_reintentos=settings.LLM_MAX_REINTENTOS,
+        timeout=settings.LLM_TIMEOUT_SEGUNDOS
+    )
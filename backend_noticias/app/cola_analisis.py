@@ -0,0 +1,247 @@
+import time
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+from app.crud_ai import crud_analisis_ia
+from app.database import SessionLocal
+from app.leases import generar_titular
+
+logger = logging.getLogger(__name__)
+
+# Menor número = se atiende antes
+PRIORIDAD_INTERACTIVA = 0
+PRIORIDAD_LOTE = 5  # Análisis por lote: detrás de los clics individuales, delante del pipeline
+PRIORIDAD_FONDO = 10
+NOMBRES_PRIORIDAD = {PRIORIDAD_INTERACTIVA: 'interactiva', PRIORIDAD_LOTE: 'lote', PRIORIDAD_FONDO: 'fondo'}
+
+ESTADOS_ACTIVOS = ('en_cola', 'en_progreso')
+ESTADOS_TERMINADOS = ('completado', 'fallido')
+
+def trabajo_a_dict(trabajo: models.TrabajoAnalisisIA) -> Dict[str, Any]:
+    return {
+        'noticia_id': trabajo.noticia_id,
+        'estado': trabajo.estado,
+        'prioridad': NOMBRES_PRIORIDAD.get(trabajo.prioridad, 'fondo'),
+        'error': trabajo.error,
+        'creado_en': trabajo.creado_en,
+        'iniciado_en': trabajo.iniciado_en,
+        'finalizado_en': trabajo.finalizado_en
+    }
+
+class ColaAnalisis:
+    """
+    Cola de análisis IA bajo demanda guardada en trabajos_analisis_ia, así que todos los
+    procesos de la API ven el mismo estado.
+
+    - Las peticiones interactivas se atienden antes que las de fondo; si una noticia
+      ya está en cola con menor prioridad y llega una interactiva, sube de prioridad.
+    - Hay una sola fila por noticia (single-flight): quien pide una noticia que ya está
+      en cola o en progreso espera ese mismo trabajo, lo haya encolado el proceso que sea.
+    - Cada proceso ejecuta `hilos` hilos que reclaman trabajos con SKIP LOCKED; encolar
+      en el mismo proceso los despierta y los de otros procesos se ven en el siguiente sondeo.
+    - Un trabajo en progreso durante más de `timeout` segundos (proceso caído) vuelve a la cola.
+    """
+
+    def __init__(
+        self,
+        hilos: int = 2,
+        intervalo: float = 1.0,
+        timeout: int = 300,
+        sondeo_espera: float = 0.5,
+        session_factory: Callable = SessionLocal
+    ):
+        self.hilos = hilos
+        self.intervalo = intervalo
+        self.timeout = timeout
+        self.sondeo_espera = sondeo_espera
+        self.session_factory = session_factory
+        self._hay_trabajo = threading.Event()
+        self._lock = threading.Lock()
+        self._iniciada = False
+
+    def encolar(self, noticia_id: int, prioridad: int = PRIORIDAD_FONDO) -> Dict[str, Any]:
+        """Encola el análisis de la noticia o devuelve el trabajo que ya está activo"""
+        return self.encolar_varios([noticia_id], prioridad)[noticia_id]
+
+    def encolar_varios(self, noticia_ids: List[int], prioridad: int = PRIORIDAD_FONDO) -> Dict[int, Dict[str, Any]]:
+        """Encola varias noticias en una transacción; devuelve el estado del trabajo de cada una"""
+        self.iniciar()
+        noticia_ids = list(dict.fromkeys(noticia_ids))
+        if not noticia_ids:
+            return {}
+
+        for _ in range(3):
+            db = self.session_factory()
+            try:
+                trabajos = {
+                    trabajo.noticia_id: trabajo for trabajo in db.query(models.TrabajoAnalisisIA).filter(
+                        models.TrabajoAnalisisIA.noticia_id.in_(noticia_ids)
+                    ).with_for_update().all()
+                }
+                ahora = datetime.now()
+                for noticia_id in noticia_ids:
+                    trabajo = trabajos.get(noticia_id)
+                    if trabajo is None:
+                        trabajo = models.TrabajoAnalisisIA(
+                            noticia_id=noticia_id, estado='en_cola', prioridad=prioridad, creado_en=ahora
+                        )
+                        db.add(trabajo)
+                        trabajos[noticia_id] = trabajo
+                    elif trabajo.estado in ESTADOS_TERMINADOS:
+                        # Nuevo intento (p. ej. tras un fallo o si se borró el análisis)
+                        trabajo.estado = 'en_cola'
+                        trabajo.prioridad = prioridad
+                        trabajo.error = None
+                        trabajo.worker = None
+                        trabajo.creado_en = ahora
+                        trabajo.iniciado_en = None
+                        trabajo.finalizado_en = None
+                    elif trabajo.estado == 'en_cola' and prioridad < trabajo.prioridad:
+                        trabajo.prioridad = prioridad
+                db.flush()
+                estados = {noticia_id: trabajo_a_dict(trabajo) for noticia_id, trabajo in trabajos.items()}
+                db.commit()
+            except IntegrityError:
+                # Otro proceso creó la fila de alguna noticia a la vez: releer y reintentar
+                db.rollback()
+                continue
+            finally:
+                db.close()
+
+            self._hay_trabajo.set()
+            return estados
+
+        raise RuntimeError(f"No se pudieron encolar los análisis de {noticia_ids}")
+
+    def estados(self, noticia_ids: List[int], db: Optional[Session] = None) -> Dict[int, Dict[str, Any]]:
+        """Estado actual de los trabajos de esas noticias (las que no tienen trabajo no aparecen)"""
+        propia = db is None
+        db = db or self.session_factory()
+        try:
+            trabajos = db.query(models.TrabajoAnalisisIA).filter(
+                models.TrabajoAnalisisIA.noticia_id.in_(noticia_ids)
+            ).all()
+            resultado = {trabajo.noticia_id: trabajo_a_dict(trabajo) for trabajo in trabajos}
+            if propia:
+                db.commit()
+            return resultado
+        finally:
+            if propia:
+                db.close()
+
+    async def esperar(self, noticia_ids: List[int], timeout: float) -> Dict[int, Dict[str, Any]]:
+        """
+        Sondea la BD hasta que todos los trabajos terminen o venza el plazo.
+        Es una corrutina: mientras espera no ocupa ningún hilo del threadpool.
+        """
+        limite = time.monotonic() + timeout
+        while True:
+            estados = await run_in_threadpool(self.estados, noticia_ids)
+            restante = limite - time.monotonic()
+            if restante <= 0 or all(e['estado'] in ESTADOS_TERMINADOS for e in estados.values()):
+                return estados
+            await asyncio.sleep(min(self.sondeo_espera, restante))
+
+    def metricas(self) -> Dict[str, Any]:
+        db = self.session_factory()
+        try:
+            estados = dict(db.query(
+                models.TrabajoAnalisisIA.estado, func.count(models.TrabajoAnalisisIA.noticia_id)
+            ).group_by(models.TrabajoAnalisisIA.estado).all())
+        finally:
+            db.close()
+        return {'trabajos': estados, 'hilos_por_proceso': self.hilos}
+
+    def iniciar(self) -> None:
+        """Arranca los hilos de este proceso (una sola vez)"""
+        with self._lock:
+            if self._iniciada:
+                return
+            self._iniciada = True
+        for i in range(self.hilos):
+            threading.Thread(target=self._bucle, name=f'cola-analisis-{i}', daemon=True).start()
+
+    def _bucle(self) -> None:
+        while True:
+            try:
+                reclamado = self._reclamar()
+            except Exception as e:
+                logger.error(f"❌ Error reclamando análisis de la cola: {e}")
+                reclamado = None
+            if reclamado is None:
+                self._hay_trabajo.wait(self.intervalo)
+                self._hay_trabajo.clear()
+                continue
+            self._ejecutar(*reclamado)
+
+    def _reclamar(self) -> Optional[Tuple[int, str]]:
+        """
+        Toma el trabajo en cola más prioritario (SKIP LOCKED evita que dos hilos tomen el mismo)
+        y devuelve (noticia_id, titular). El titular es nuevo en cada reclamo: si el trabajo
+        vence y lo retoma otro hilo, aunque sea del mismo proceso, el primero ya no es su dueño.
+        """
+        db = self.session_factory()
+        try:
+            # Trabajos de procesos que murieron a mitad del análisis
+            limite = datetime.now() - timedelta(seconds=self.timeout)
+            db.query(models.TrabajoAnalisisIA).filter(
+                models.TrabajoAnalisisIA.estado == 'en_progreso',
+                models.TrabajoAnalisisIA.iniciado_en < limite
+            ).update({'estado': 'en_cola', 'worker': None}, synchronize_session=False)
+            db.commit()
+
+            trabajo = db.query(models.TrabajoAnalisisIA).filter(
+                models.TrabajoAnalisisIA.estado == 'en_cola'
+            ).order_by(
+                models.TrabajoAnalisisIA.prioridad, models.TrabajoAnalisisIA.creado_en
+            ).with_for_update(skip_locked=True).first()
+            if trabajo is None:
+                db.rollback()
+                return None
+
+            titular = f"{generar_titular()}:{threading.current_thread().name}"
+            trabajo.estado = 'en_progreso'
+            trabajo.worker = titular
+            trabajo.iniciado_en = datetime.now()
+            noticia_id = trabajo.noticia_id
+            db.commit()
+            return noticia_id, titular
+        finally:
+            db.close()
+
+    def _ejecutar(self, noticia_id: int, titular: str) -> None:
+        db = self.session_factory()
+        try:
+            try:
+                analisis = crud_analisis_ia.crear_analisis(db, noticia_id)
+                estado, error = ('completado', None) if analisis else ('fallido', "No se pudo analizar la noticia")
+            except Exception as e:
+                logger.error(f"❌ Error en la cola de análisis para la noticia {noticia_id}: {e}")
+                db.rollback()
+                estado, error = 'fallido', str(e)
+
+            # Solo si el reclamo sigue siendo nuestro (no se reencoló por timeout ni lo retomó otro hilo)
+            db.query(models.TrabajoAnalisisIA).filter(
+                models.TrabajoAnalisisIA.noticia_id == noticia_id,
+                models.TrabajoAnalisisIA.worker == titular,
+                models.TrabajoAnalisisIA.estado == 'en_progreso'
+            ).update({'estado': estado, 'error': error, 'finalizado_en': datetime.now()}, synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Error guardando el estado del análisis de la noticia {noticia_id}: {e}")
+        finally:
+            db.close()
+
+# Instancia global
+cola_analisis = ColaAnalisis(hilos=settings.ANALISIS_HILOS)
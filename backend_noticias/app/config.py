@@ -52,6 +52,50 @@ class Settings:
     REDDIT_LIMIT: int = 15      # Posts por subreddit
     REDDIT_WEB_DELAY: float = 0.5  # Delay entre requests a Reddit
     
+    # Caché de respuestas de lectura
+    CACHE_MAX_ENTRADAS: int = 512          # Entradas en el LRU local de cada proceso
+    CACHE_TTL_SEGUNDOS: int = 300          # Vida máxima de una entrada
+    CACHE_VERSION_TTL: float = 1.0         # Cada cuánto se relee la versión de datos de la BD
+    CACHE_REDIS_URL: str = os.getenv('CACHE_REDIS_URL', '')  # Backend compartido opcional
+    FRAGMENTOS_MAX_ENTRADAS: int = 5000    # Noticias serializadas a JSON guardadas por proceso
+    FRAGMENTOS_TTL_SEGUNDOS: int = 3600
+    
+    # Compresión de respuestas (gzip/brotli) a partir de este tamaño
+    COMPRESION_MINIMO_BYTES: int = 1024
+    
+    # Snapshots de métricas avanzadas del panel de administración
+    METRICAS_INTERVALO_SEGUNDOS: int = 300  # Cada cuánto se recalcula en segundo plano
+    METRICAS_SNAPSHOTS_CONSERVADOS: int = 20  # Snapshots históricos que se mantienen
+    
+    # Trabajos de scraping (ejecutados por app.worker_scraping, fuera de los workers de la API)
+    SCRAPING_HILOS: int = 5                  # Fuentes que un worker scrapea en paralelo
+    SCRAPING_INTERVALO_SONDEO: float = 5.0   # Segundos entre consultas de trabajos pendientes
+    SCRAPING_LEASE_SEGUNDOS: int = 60        # Vencimiento del lease por fuente si el titular deja de renovarlo
+    SCRAPING_WORKER_EMBEBIDO: bool = os.getenv('SCRAPING_WORKER_EMBEBIDO', '1') == '1'  # Lanzar un worker al iniciar la API
+    
+    # Cliente LLM (Gemini); LLM_URL_BASE permite apuntar a un servidor stub local
+    LLM_URL_BASE: str = os.getenv('LLM_URL_BASE', 'https://generativelanguage.googleapis.com')
+    LLM_MODELO: str = os.getenv('LLM_MODELO', 'gemini-pro')
+    LLM_MAX_CONCURRENCIA: int = 4        # Peticiones simultáneas por proceso
+    LLM_RPM: int = 60                    # Peticiones por minuto permitidas
+    LLM_TPM: int = 32000                 # Tokens por minuto permitidos
+    LLM_MAX_REINTENTOS: int = 5          # Reintentos ante 429/5xx o errores de red
+    LLM_TIMEOUT_SEGUNDOS: float = 30.0
+    LLM_CACHE_MAX_ENTRADAS: int = 50000  # Respuestas del LLM guardadas en cache_llm
+    # Enriquecer con el LLM los análisis (pipeline tras la ingesta y bajo demanda); por defecto solo análisis local
+    ANALISIS_CON_LLM: bool = os.getenv('ANALISIS_CON_LLM', '0') == '1'
+    
+    # Cola de análisis IA bajo demanda
+    ANALISIS_HILOS: int = 2                # Análisis simultáneos por proceso
+    ANALISIS_ESPERA_SEGUNDOS: float = 5.0  # Espera antes de responder 202 y dejar que el cliente consulte el estado
+    
+    # Clasificador de categorías entrenado (app.clasificador_ml); sin modelo se usan palabras clave
+    CLASIFICADOR_MODELO_RUTA: str = os.getenv(
+        'CLASIFICADOR_MODELO_RUTA',
+        os.path.join(os.path.dirname(os.path.dirname(__file__)), 'modelos', 'clasificador_noticias.npz')
+    )
+    CLASIFICADOR_UMBRAL_CONFIANZA: float = 0.6  # Confianza calibrada; por debajo se recurre a las palabras clave (ajustar con el informe de evaluar)
+    
     @property
     def DATABASE_URL(self) -> str:
         return f"mysql+pymysql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
@@ -1,13 +1,19 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, load_only
 from sqlalchemy import func, desc, and_, or_
 from typing import List, Optional, Dict, Any
 from datetime import date, datetime, timedelta
 import logging
 
 from app import models, schemas
+from app.crud_estadisticas import crud_estadisticas
+from app.cache import CacheLRU, FALTA
 
 logger = logging.getLogger(__name__)
 
+# Estadísticas de reportes cacheadas; el TTL cubre cambios hechos desde otros procesos
+CLAVE_ESTADISTICAS_REPORTES = 'estadisticas_reportes'
+_cache_estadisticas_reportes = CacheLRU(max_entradas=1, ttl=60)
+
 class CRUDReportes:
     def crear_reporte(self, db: Session, reporte_data: dict) -> Optional[models.ReporteNoticia]:
         """Crea un nuevo reporte de noticia"""
@@ -27,6 +33,7 @@ class CRUDReportes:
             db.add(db_reporte)
             db.commit()
             db.refresh(db_reporte)
+            self._invalidar_estadisticas()
             
             logger.info(f"Reporte creado para noticia {reporte_data['noticia_id']}")
             return db_reporte
@@ -49,6 +56,36 @@ class CRUDReportes:
         
         return query.order_by(desc(models.ReporteNoticia.fecha_reporte)).offset(skip).limit(limit).all()
     
+    def _query_reportes_con_noticia(self, db: Session):
+        """Reporte + título/fuente/enlace de su noticia en una sola consulta con JOIN"""
+        return db.query(
+            models.ReporteNoticia.id,
+            models.ReporteNoticia.noticia_id,
+            models.ReporteNoticia.motivo,
+            models.ReporteNoticia.estado,
+            models.ReporteNoticia.fecha_reporte,
+            models.ReporteNoticia.fecha_revision,
+            models.ReporteNoticia.notas_admin,
+            models.Noticia.titulo.label('titulo_noticia'),
+            models.Noticia.fuente.label('fuente_noticia'),
+            models.Noticia.enlace.label('enlace_noticia')
+        ).join(models.Noticia, models.Noticia.id == models.ReporteNoticia.noticia_id)
+    
+    def listar_reportes_con_noticia(self, db: Session, skip: int = 0, limit: int = 100, estado: Optional[str] = None) -> List[dict]:
+        """Obtiene reportes ya enriquecidos con los datos de la noticia (sin una consulta por reporte)"""
+        query = self._query_reportes_con_noticia(db)
+        
+        if estado:
+            query = query.filter(models.ReporteNoticia.estado == estado)
+        
+        filas = query.order_by(desc(models.ReporteNoticia.fecha_reporte)).offset(skip).limit(limit).all()
+        return [dict(fila._mapping) for fila in filas]
+    
+    def obtener_reporte_con_noticia(self, db: Session, reporte_id: int) -> Optional[dict]:
+        """Obtiene un reporte enriquecido con los datos de la noticia"""
+        fila = self._query_reportes_con_noticia(db).filter(models.ReporteNoticia.id == reporte_id).first()
+        return dict(fila._mapping) if fila else None
+    
     def actualizar_reporte(self, db: Session, reporte_id: int, reporte_data: dict) -> Optional[models.ReporteNoticia]:
         """Actualiza el estado de un reporte"""
         try:
@@ -65,6 +102,7 @@ class CRUDReportes:
             
             db.commit()
             db.refresh(db_reporte)
+            self._invalidar_estadisticas()
             
             logger.info(f"Reporte {reporte_id} actualizado a estado: {reporte_data.get('estado')}")
             return db_reporte
@@ -83,6 +121,7 @@ class CRUDReportes:
             
             db.delete(db_reporte)
             db.commit()
+            self._invalidar_estadisticas()
             
             logger.info(f"Reporte {reporte_id} eliminado")
             return True
@@ -93,35 +132,43 @@ class CRUDReportes:
             return False
     
     def obtener_estadisticas_reportes(self, db: Session) -> Dict[str, Any]:
-        """Obtiene estadísticas de los reportes"""
-        # Total de reportes
-        total_reportes = db.query(models.ReporteNoticia).count()
+        """Obtiene estadísticas de los reportes (cacheadas hasta que cambie algún reporte)"""
+        estadisticas = _cache_estadisticas_reportes.obtener(CLAVE_ESTADISTICAS_REPORTES)
+        if estadisticas is not FALTA:
+            return estadisticas
         
-        # Reportes por estado
-        reportes_por_estado = db.query(
+        # Una sola pasada agrupada por estado; total, pendientes y revisados salen de ella
+        reportes_por_estado = dict(db.query(
             models.ReporteNoticia.estado,
             func.count(models.ReporteNoticia.id)
-        ).group_by(models.ReporteNoticia.estado).all()
+        ).group_by(models.ReporteNoticia.estado).all())
+        
+        # Noticias más reportadas: agrupar primero los reportes y unir solo el top N
+        top_reportes = db.query(
+            models.ReporteNoticia.noticia_id.label('noticia_id'),
+            func.count(models.ReporteNoticia.id).label('cantidad_reportes')
+        ).group_by(
+            models.ReporteNoticia.noticia_id
+        ).order_by(
+            desc('cantidad_reportes')
+        ).limit(10).subquery()
         
-        # Noticias más reportadas
         noticias_mas_reportadas = db.query(
             models.Noticia.id,
             models.Noticia.titulo,
             models.Noticia.fuente,
-            func.count(models.ReporteNoticia.id).label('cantidad_reportes')
+            top_reportes.c.cantidad_reportes
         ).join(
-            models.ReporteNoticia, models.Noticia.id == models.ReporteNoticia.noticia_id
-        ).group_by(
-            models.Noticia.id
+            top_reportes, models.Noticia.id == top_reportes.c.noticia_id
         ).order_by(
-            desc('cantidad_reportes')
-        ).limit(10).all()
+            desc(top_reportes.c.cantidad_reportes)
+        ).all()
         
-        return {
-            'total_reportes': total_reportes,
-            'reportes_pendientes': db.query(models.ReporteNoticia).filter(models.ReporteNoticia.estado == 'pendiente').count(),
-            'reportes_revisados': db.query(models.ReporteNoticia).filter(models.ReporteNoticia.estado == 'revisado').count(),
-            'reportes_por_estado': dict(reportes_por_estado),
+        estadisticas = {
+            'total_reportes': sum(reportes_por_estado.values()),
+            'reportes_pendientes': reportes_por_estado.get('pendiente', 0),
+            'reportes_revisados': reportes_por_estado.get('revisado', 0),
+            'reportes_por_estado': reportes_por_estado,
             'noticias_mas_reportadas': [
                 {
                     'id': noticia.id,
@@ -132,11 +179,38 @@ class CRUDReportes:
                 for noticia in noticias_mas_reportadas
             ]
         }
+        
+        _cache_estadisticas_reportes.guardar(CLAVE_ESTADISTICAS_REPORTES, estadisticas)
+        return estadisticas
+    
+    def _invalidar_estadisticas(self) -> None:
+        """Descarta las estadísticas cacheadas tras crear, actualizar o eliminar un reporte"""
+        _cache_estadisticas_reportes.borrar(CLAVE_ESTADISTICAS_REPORTES)
 
 # Instancia global del CRUD para reportes
 crud_reportes = CRUDReportes()
 
+# Columnas que usa la vista de resumen de los listados (sin contenido)
+COLUMNAS_RESUMEN = (
+    models.Noticia.id,
+    models.Noticia.titulo,
+    models.Noticia.enlace,
+    models.Noticia.fecha,
+    models.Noticia.categoria,
+    models.Noticia.imagen_url,
+    models.Noticia.fuente,
+    models.Noticia.fecha_creacion,
+)
+
 class CRUDNoticias:
+    def _query_noticias(self, db: Session, vista: str = 'completa'):
+        """Query base de noticias; en la vista 'resumen' solo se cargan las columnas del listado"""
+        query = db.query(models.Noticia)
+        if vista == 'resumen':
+            # raiseload evita que un acceso a contenido dispare una consulta por fila
+            query = query.options(load_only(*COLUMNAS_RESUMEN, raiseload=True))
+        return query
+    
     def crear_noticia(self, db: Session, noticia_data: dict) -> Optional[models.Noticia]:
         """Crea una nueva noticia en la base de datos"""
         try:
@@ -157,10 +231,15 @@ class CRUDNoticias:
                 categoria=noticia_data['categoria'],
                 contenido=noticia_data.get('contenido', ''),
                 imagen_url=noticia_data.get('imagen_url', ''),
-                fuente=noticia_data['fuente']
+                fuente=noticia_data['fuente'],
+                fecha_creacion=datetime.now()
             )
             
             db.add(db_noticia)
+            # Actualizar contadores, frecuencias de términos y actividad horaria en la misma transacción
+            crud_estadisticas.registrar_noticia(db, db_noticia)
+            crud_estadisticas.registrar_terminos(db, db_noticia)
+            crud_estadisticas.registrar_actividad(db, db_noticia)
             db.commit()
             db.refresh(db_noticia)
             
@@ -176,52 +255,55 @@ class CRUDNoticias:
         """Obtiene una noticia por su ID"""
         return db.query(models.Noticia).filter(models.Noticia.id == noticia_id).first()
     
-    def obtener_todas_noticias(self, db: Session, skip: int = 0, limit: int = 100) -> List[models.Noticia]:
+    def obtener_todas_noticias(self, db: Session, skip: int = 0, limit: int = 100, vista: str = 'completa') -> List[models.Noticia]:
         """Obtiene todas las noticias con paginación"""
-        return db.query(models.Noticia).order_by(models.Noticia.fecha.desc()).offset(skip).limit(limit).all()
+        return self._query_noticias(db, vista).order_by(models.Noticia.fecha.desc()).offset(skip).limit(limit).all()
     
-    def obtener_noticias_por_categoria(self, db: Session, categoria: str, skip: int = 0, limit: int = 100) -> List[models.Noticia]:
+    def obtener_ids_noticias(
+        self,
+        db: Session,
+        categoria: Optional[str] = None,
+        fuente: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[int]:
+        """Obtiene solo los IDs de una página de noticias (sin cargar filas completas)"""
+        query = db.query(models.Noticia.id)
+        if categoria:
+            query = query.filter(models.Noticia.categoria == categoria)
+        if fuente:
+            query = query.filter(models.Noticia.fuente == fuente)
+        return [noticia_id for (noticia_id,) in query.order_by(models.Noticia.fecha.desc()).offset(skip).limit(limit).all()]
+    
+    def obtener_noticias_por_ids(self, db: Session, ids: List[int], vista: str = 'completa') -> List[models.Noticia]:
+        """Obtiene varias noticias con una sola consulta WHERE id IN (...), sin orden garantizado"""
+        if not ids:
+            return []
+        return self._query_noticias(db, vista).filter(models.Noticia.id.in_(ids)).all()
+    
+    def obtener_noticias_por_categoria(self, db: Session, categoria: str, skip: int = 0, limit: int = 100, vista: str = 'completa') -> List[models.Noticia]:
         """Obtiene noticias filtradas por categoría"""
-        return db.query(models.Noticia).filter(
+        return self._query_noticias(db, vista).filter(
             models.Noticia.categoria == categoria
         ).order_by(models.Noticia.fecha.desc()).offset(skip).limit(limit).all()
     
-    def obtener_noticias_por_fuente(self, db: Session, fuente: str, skip: int = 0, limit: int = 100) -> List[models.Noticia]:
+    def obtener_noticias_por_fuente(self, db: Session, fuente: str, skip: int = 0, limit: int = 100, vista: str = 'completa') -> List[models.Noticia]:
         """Obtiene noticias filtradas por fuente"""
-        return db.query(models.Noticia).filter(
+        return self._query_noticias(db, vista).filter(
             models.Noticia.fuente == fuente
         ).order_by(models.Noticia.fecha.desc()).offset(skip).limit(limit).all()
     
     def obtener_estadisticas(self, db: Session) -> dict:
-        """Obtiene estadísticas de las noticias en la base de datos"""
+        """Obtiene estadísticas de las noticias desde la tabla de contadores agregados"""
         try:
-            # Total de noticias
-            total_noticias = db.query(models.Noticia).count()
-            
-            # Contar por categoría - CORREGIDO
-            categorias_count_result = db.query(
-                models.Noticia.categoria, 
-                func.count(models.Noticia.id)
-            ).group_by(models.Noticia.categoria).all()
-            
-            categorias_count = {categoria: count for categoria, count in categorias_count_result}
-            
-            # Contar por fuente - CORREGIDO
-            fuentes_count_result = db.query(
-                models.Noticia.fuente, 
-                func.count(models.Noticia.id)
-            ).group_by(models.Noticia.fuente).all()
-            
-            fuentes_count = {fuente: count for fuente, count in fuentes_count_result}
-            
-            # Noticia más reciente
-            noticia_reciente = db.query(models.Noticia).order_by(models.Noticia.fecha_creacion.desc()).first()
+            # Lectura por clave primaria: no depende del tamaño de la tabla de noticias
+            fila = crud_estadisticas.obtener_fila(db)
             
             return {
-                'total_noticias': total_noticias,
-                'categorias': categorias_count,
-                'fuentes': fuentes_count,
-                'ultima_actualizacion': noticia_reciente.fecha_creacion if noticia_reciente else None
+                'total_noticias': fila.total_noticias,
+                'categorias': dict(fila.categorias or {}),
+                'fuentes': dict(fila.fuentes or {}),
+                'ultima_actualizacion': fila.ultima_actualizacion
             }
             
         except Exception as e:
@@ -234,9 +316,9 @@ class CRUDNoticias:
                 'ultima_actualizacion': None
             }
     
-    def buscar_noticias(self, db: Session, query: str, skip: int = 0, limit: int = 100) -> List[models.Noticia]:
+    def buscar_noticias(self, db: Session, query: str, skip: int = 0, limit: int = 100, vista: str = 'completa') -> List[models.Noticia]:
         """Busca noticias por texto en título o contenido"""
-        return db.query(models.Noticia).filter(
+        return self._query_noticias(db, vista).filter(
             or_(
                 models.Noticia.titulo.ilike(f'%{query}%'),
                 models.Noticia.contenido.ilike(f'%{query}%')
@@ -364,81 +446,21 @@ class CRUDNoticias:
         except Exception as e:
             logger.error(f"Error obteniendo categorías populares: {e}")
             return []
-    def obtener_palabras_mas_frecuentes(self, db: Session, limite: int = 100) -> List[dict]:
+    def obtener_palabras_mas_frecuentes(
+        self,
+        db: Session,
+        limite: int = 100,
+        desde: Optional[date] = None,
+        hasta: Optional[date] = None,
+        categoria: Optional[str] = None,
+        fuente: Optional[str] = None
+    ) -> List[dict]:
         """Obtiene las palabras más frecuentes en títulos y contenido de noticias"""
         try:
-            import re
-            from collections import Counter
-            
-            # Obtener todas las noticias
-            noticias = db.query(models.Noticia).all()
-            
-            if not noticias:
-                return []
-            
-            # Palabras comunes a excluir (stop words en español)
-            stop_words = {
-                'de', 'la', 'que', 'el', 'en', 'y', 'a', 'los', 'del', 'se', 'las', 'por', 'un', 'para', 'tras', 'https',
-                'con', 'no', 'una', 'su', 'al', 'lo', 'como', 'más', 'pero', 'sus', 'le', 'ya', 'o', 'este', 'segun','mientras',
-                'sí', 'porque', 'esta', 'entre', 'cuando', 'muy', 'sin', 'sobre', 'también', 'me', 'hasta', 
-                'hay', 'donde', 'quien', 'desde', 'todo', 'nos', 'durante', 'todos', 'uno', 'les', 'ni', 
-                'contra', 'otros', 'ese', 'eso', 'ante', 'ellos', 'e', 'esto', 'mí', 'antes', 'algunos', 
-                'qué', 'unos', 'yo', 'otro', 'otras', 'otra', 'él', 'tanto', 'esa', 'estos', 'mucho', 
-                'quienes', 'nada', 'muchos', 'cual', 'poco', 'ella', 'estar', 'estas', 'algunas', 'algo', 
-                'nosotros', 'mi', 'mis', 'tú', 'te', 'ti', 'tu', 'tus', 'ellas', 'nosotras', 'vosotros', 
-                'vosotras', 'os', 'mío', 'mía', 'míos', 'mías', 'tuyo', 'tuya', 'tuyos', 'tuyas', 'suyo', 
-                'suya', 'suyos', 'suyas', 'nuestro', 'nuestra', 'nuestros', 'nuestras', 'vuestro', 'vuestra', 
-                'vuestros', 'vuestras', 'esos', 'esas', 'estoy', 'estás', 'está', 'estamos', 'estáis', 
-                'están', 'esté', 'estés', 'estemos', 'estéis', 'estén', 'estaré', 'estarás', 'estará', 
-                'estaremos', 'estaréis', 'estarán', 'estaría', 'estarías', 'estaríamos', 'estaríais', 
-                'estarían', 'estaba', 'estabas', 'estábamos', 'estabais', 'estaban', 'estuve', 'estuviste', 
-                'estuvo', 'estuvimos', 'estuvisteis', 'estuvieron', 'estuviera', 'estuvieras', 'estuviéramos', 
-                'estuvierais', 'estuvieran', 'estuviese', 'estuvieses', 'estuviésemos', 'estuvieseis', 
-                'estuviesen', 'estando', 'estado', 'estada', 'estados', 'estadas', 'estad', 'he', 'has', 
-                'ha', 'hemos', 'habéis', 'han', 'haya', 'hayas', 'hayamos', 'hayáis', 'hayan', 'habré', 
-                'habrás', 'habrá', 'habremos', 'habréis', 'habrán', 'habría', 'habrías', 'habríamos', 
-                'habríais', 'habrían', 'había', 'habías', 'habíamos', 'habíais', 'habían', 'hube', 'hubiste', 
-                'hubo', 'hubimos', 'hubisteis', 'hubieron', 'hubiera', 'hubieras', 'hubiéramos', 'hubierais', 
-                'hubieran', 'hubiese', 'hubieses', 'hubiésemos', 'hubieseis', 'hubiesen', 'habiendo', 
-                'habido', 'habida', 'habidos', 'habidas', 'soy', 'eres', 'es', 'somos', 'sois', 'son', 
-                'sea', 'seas', 'seamos', 'seáis', 'sean', 'seré', 'serás', 'será', 'seremos', 'seréis', 
-                'serán', 'sería', 'serías', 'seríamos', 'seríais', 'serían', 'era', 'eras', 'éramos', 
-                'erais', 'eran', 'fui', 'fuiste', 'fue', 'fuimos', 'fuisteis', 'fueron', 'fuera', 'fueras', 
-                'fuéramos', 'fuerais', 'fueran', 'fuese', 'fueses', 'fuésemos', 'fueseis', 'fuesen', 
-                'sintiendo', 'sentido', 'sentida', 'sentidos', 'sentidas', 'siente', 'sentid', 'tengo', 
-                'tienes', 'tiene', 'tenemos', 'tenéis', 'tienen', 'tenga', 'tengas', 'tengamos', 'tengáis', 
-                'tengan', 'tendré', 'tendrás', 'tendrá', 'tendremos', 'tendréis', 'tendrán', 'tendría', 
-                'tendrías', 'tendríamos', 'tendríais', 'tendrían', 'tenía', 'tenías', 'teníamos', 'teníais', 
-                'tenían', 'tuve', 'tuviste', 'tuvo', 'tuvimos', 'tuvisteis', 'tuvieron', 'tuviera', 
-                'tuvieras', 'tuviéramos', 'tuvierais', 'tuvieran', 'tuviese', 'tuvieses', 'tuviésemos', 
-                'tuvieseis', 'tuviesen', 'teniendo', 'tenido', 'tenida', 'tenidos', 'tenidas', 'tened'
-            }
-            
-            # Unir todos los títulos y contenidos
-            texto_completo = ""
-            for noticia in noticias:
-                if noticia.titulo:
-                    texto_completo += " " + noticia.titulo.lower()
-                if noticia.contenido:
-                    texto_completo += " " + noticia.contenido.lower()
-            
-            # Extraer palabras usando regex (solo palabras con letras)
-            palabras = re.findall(r'\b[a-záéíóúñ]{4,}\b', texto_completo)
-            
-            # Filtrar stop words y contar frecuencia
-            palabras_filtradas = [palabra for palabra in palabras if palabra not in stop_words]
-            contador = Counter(palabras_filtradas)
-            
-            # Obtener las más comunes
-            palabras_comunes = contador.most_common(limite)
-            
-            return [
-                {
-                    'palabra': palabra,
-                    'cantidad': cantidad
-                }
-                for palabra, cantidad in palabras_comunes
-            ]
+            # Agregación sobre la tabla de frecuencias por día (llenada al ingerir)
+            return crud_estadisticas.obtener_terminos_mas_frecuentes(
+                db, limite=limite, desde=desde, hasta=hasta, categoria=categoria, fuente=fuente
+            )
             
         except Exception as e:
             logger.error(f"Error obteniendo palabras más frecuentes: {e}")
@@ -459,42 +481,16 @@ class CRUDNoticias:
     def obtener_tendencias_temporales(self, db: Session) -> dict:
             """Obtiene tendencias temporales de noticias"""
             try:
-                # Última semana - CORREGIDO para MySQL
-                fecha_inicio_semana = datetime.now() - timedelta(days=7)
-                
-                noticias_semana = db.query(
-                    func.date(models.Noticia.fecha_creacion).label('fecha'),
-                    func.count(models.Noticia.id).label('cantidad')
-                ).filter(
-                    models.Noticia.fecha_creacion >= fecha_inicio_semana
-                ).group_by(
-                    func.date(models.Noticia.fecha_creacion)
-                ).order_by(
-                    func.date(models.Noticia.fecha_creacion)
-                ).all()
-                
-                # Último mes - SIMPLIFICADO para evitar problemas con GROUP BY
-                fecha_inicio_mes = datetime.now() - timedelta(days=30)
-                
-                # Contar noticias por semana de forma más simple
-                noticias_mes_count = db.query(models.Noticia).filter(
-                    models.Noticia.fecha_creacion >= fecha_inicio_mes
-                ).count()
-                
-                # Dividir en 4 semanas aproximadas
-                noticias_por_semana = noticias_mes_count // 4 if noticias_mes_count > 0 else 0
+                ahora = datetime.now()
                 
+                # Ambas series salen del acumulado horario, sin recorrer la tabla de noticias
                 return {
-                    'ultima_semana': [
-                        {'fecha': str(noticia.fecha), 'cantidad': noticia.cantidad}
-                        for noticia in noticias_semana
-                    ],
-                    'ultimo_mes': [
-                        {'fecha': 'Semana 1', 'cantidad': noticias_por_semana},
-                        {'fecha': 'Semana 2', 'cantidad': noticias_por_semana},
-                        {'fecha': 'Semana 3', 'cantidad': noticias_por_semana},
-                        {'fecha': 'Semana 4', 'cantidad': noticias_por_semana}
-                    ]
+                    'ultima_semana': crud_estadisticas.obtener_tendencias(
+                        db, granularidad='dia', desde=ahora - timedelta(days=7), hasta=ahora
+                    ),
+                    'ultimo_mes': crud_estadisticas.obtener_tendencias(
+                        db, granularidad='semana', desde=ahora - timedelta(days=30), hasta=ahora
+                    )
                 }
                 
             except Exception as e:
@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
-from typing import Optional, List
+from sqlalchemy.exc import IntegrityError
+from typing import Optional, List, Dict, Set
 import logging
 from app import models, schemas
 from app.ai_analyzer import ai_analyzer  # Nueva importación
@@ -13,6 +14,25 @@ class CRUDAnalisisIA:
             models.AnalisisIA.noticia_id == noticia_id
         ).first()
     
+    def obtener_analisis_por_noticia_ids(self, db: Session, noticia_ids: List[int]) -> Dict[int, models.AnalisisIA]:
+        """Obtiene en una sola consulta los análisis IA existentes de varias noticias"""
+        if not noticia_ids:
+            return {}
+        analisis = db.query(models.AnalisisIA).filter(
+            models.AnalisisIA.noticia_id.in_(noticia_ids)
+        ).all()
+        return {a.noticia_id: a for a in analisis}
+    
+    def obtener_ids_analizados(self, db: Session, noticia_ids: List[int]) -> Set[int]:
+        """IDs de las noticias que ya tienen análisis IA (sin cargar los análisis)"""
+        if not noticia_ids:
+            return set()
+        return {
+            noticia_id for (noticia_id,) in db.query(models.AnalisisIA.noticia_id).filter(
+                models.AnalisisIA.noticia_id.in_(noticia_ids)
+            ).all()
+        }
+    
     def crear_analisis(self, db: Session, noticia_id: int) -> Optional[models.AnalisisIA]:
         """Crea un nuevo análisis IA para una noticia"""
         try:
@@ -50,6 +70,11 @@ class CRUDAnalisisIA:
             logger.info(f"✅ Análisis creado exitosamente para noticia {noticia_id}")
             return db_analisis
             
+        except IntegrityError:
+            # Otro proceso guardó el análisis de esta noticia a la vez (noticia_id es único)
+            db.rollback()
+            logger.info(f"Análisis IA de la noticia {noticia_id} creado en paralelo, se usa el existente")
+            return self.obtener_analisis_por_noticia_id(db, noticia_id)
         except Exception as e:
             db.rollback()
             logger.error(f"❌ Error creando análisis para noticia {noticia_id}: {e}")
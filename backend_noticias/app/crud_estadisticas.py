@@ -0,0 +1,266 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, desc
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from typing import List, Optional, Dict, Tuple
+from datetime import date, datetime, timedelta
+import logging
+
+from app import models
+from app.texto import contar_terminos
+
+logger = logging.getLogger(__name__)
+
+# Las estadísticas se guardan en una sola fila con este ID
+ID_ESTADISTICAS = 1
+
+def truncar_hora(momento: datetime) -> datetime:
+    """Trunca una fecha-hora al inicio de su hora"""
+    return momento.replace(minute=0, second=0, microsecond=0)
+
+def _etiqueta_semana(momento: datetime) -> str:
+    anio, semana, _ = momento.isocalendar()
+    return f"{anio}-W{semana:02d}"
+
+# Función que convierte una hora en la etiqueta de su periodo
+GRANULARIDADES = {
+    'hora': lambda momento: momento.strftime('%Y-%m-%d %H:00'),
+    'dia': lambda momento: momento.date().isoformat(),
+    'semana': _etiqueta_semana,
+    'mes': lambda momento: momento.strftime('%Y-%m'),
+}
+
+# Rango máximo de obtener_tendencias por granularidad (en días); limita la serie que se arma
+MAX_DIAS_TENDENCIAS = {'hora': 31, 'dia': 366, 'semana': 3 * 366, 'mes': 10 * 366}
+
+class CRUDEstadisticas:
+    def obtener_fila(self, db: Session) -> models.EstadisticasAgregadas:
+        """Obtiene la fila de estadísticas por clave primaria (la crea si no existe)"""
+        fila = db.get(models.EstadisticasAgregadas, ID_ESTADISTICAS)
+        if fila is None:
+            fila = self.recalcular(db)
+        return fila
+
+    def recalcular(self, db: Session) -> models.EstadisticasAgregadas:
+        """Reconstruye las estadísticas agregadas a partir de la tabla de noticias"""
+        try:
+            fila = db.query(models.EstadisticasAgregadas).filter(
+                models.EstadisticasAgregadas.id == ID_ESTADISTICAS
+            ).with_for_update().first()
+
+            if fila is None:
+                fila = models.EstadisticasAgregadas(id=ID_ESTADISTICAS, version=0)
+                db.add(fila)
+
+            self._rellenar_desde_noticias(db, fila)
+            fila.version = (fila.version or 0) + 1
+
+            db.commit()
+            db.refresh(fila)
+
+            logger.info(f"Estadísticas agregadas recalculadas: {fila.total_noticias} noticias")
+            return fila
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error recalculando estadísticas agregadas: {e}")
+            raise
+
+    def registrar_noticia(self, db: Session, noticia: models.Noticia) -> None:
+        """
+        Suma una noticia nueva a los contadores.
+        No hace commit: debe llamarse dentro de la transacción que inserta la noticia.
+        """
+        # Bloquear la fila para que las ingestas concurrentes no pierdan incrementos
+        fila = db.query(models.EstadisticasAgregadas).filter(
+            models.EstadisticasAgregadas.id == ID_ESTADISTICAS
+        ).with_for_update().first()
+
+        if fila is None:
+            # Primera ingesta: partir del estado actual de la tabla (sin la noticia pendiente)
+            fila = models.EstadisticasAgregadas(id=ID_ESTADISTICAS, version=0)
+            self._rellenar_desde_noticias(db, fila)
+            db.add(fila)
+
+        categorias = dict(fila.categorias or {})
+        categorias[noticia.categoria] = categorias.get(noticia.categoria, 0) + 1
+
+        fuentes = dict(fila.fuentes or {})
+        fuentes[noticia.fuente] = fuentes.get(noticia.fuente, 0) + 1
+
+        # Reasignar los diccionarios para que SQLAlchemy detecte el cambio en las columnas JSON
+        fila.total_noticias = (fila.total_noticias or 0) + 1
+        fila.categorias = categorias
+        fila.fuentes = fuentes
+        fila.version = (fila.version or 0) + 1
+
+        fecha_noticia = noticia.fecha_creacion or datetime.now()
+        if fila.ultima_actualizacion is None or fecha_noticia > fila.ultima_actualizacion:
+            fila.ultima_actualizacion = fecha_noticia
+
+    def registrar_terminos(self, db: Session, noticia: models.Noticia) -> None:
+        """
+        Suma los términos de una noticia a la tabla de frecuencias por día.
+        No hace commit: debe llamarse dentro de la transacción que inserta la noticia.
+        """
+        contador = contar_terminos(noticia.titulo, noticia.contenido)
+        if not contador:
+            return
+        
+        self.sumar_terminos(db, {
+            (noticia.fecha, noticia.categoria, noticia.fuente, termino): cantidad
+            for termino, cantidad in contador.items()
+        })
+
+    def sumar_terminos(self, db: Session, conteos: Dict[Tuple[date, str, str, str], int]) -> None:
+        """Incrementa en bloque los conteos (dia, categoria, fuente, termino) con un upsert"""
+        if not conteos:
+            return
+        
+        filas = [
+            {'dia': dia, 'categoria': categoria, 'fuente': fuente, 'termino': termino, 'cantidad': cantidad}
+            for (dia, categoria, fuente, termino), cantidad in conteos.items()
+        ]
+        
+        stmt = mysql_insert(models.FrecuenciaTermino).values(filas)
+        stmt = stmt.on_duplicate_key_update(
+            cantidad=models.FrecuenciaTermino.cantidad + stmt.inserted.cantidad
+        )
+        db.execute(stmt)
+
+    def obtener_terminos_mas_frecuentes(
+        self,
+        db: Session,
+        limite: int = 100,
+        desde: Optional[date] = None,
+        hasta: Optional[date] = None,
+        categoria: Optional[str] = None,
+        fuente: Optional[str] = None
+    ) -> List[dict]:
+        """Suma las frecuencias por término en el rango y filtros indicados"""
+        total = func.sum(models.FrecuenciaTermino.cantidad).label('cantidad')
+        query = db.query(models.FrecuenciaTermino.termino, total)
+        
+        if desde:
+            query = query.filter(models.FrecuenciaTermino.dia >= desde)
+        if hasta:
+            query = query.filter(models.FrecuenciaTermino.dia <= hasta)
+        if categoria:
+            query = query.filter(models.FrecuenciaTermino.categoria == categoria)
+        if fuente:
+            query = query.filter(models.FrecuenciaTermino.fuente == fuente)
+        
+        resultados = query.group_by(
+            models.FrecuenciaTermino.termino
+        ).order_by(desc('cantidad')).limit(limite).all()
+        
+        return [
+            {'palabra': termino, 'cantidad': int(cantidad)}
+            for termino, cantidad in resultados
+        ]
+
+    def registrar_actividad(self, db: Session, noticia: models.Noticia) -> None:
+        """
+        Suma una noticia al acumulado horario por fuente y categoría.
+        No hace commit: debe llamarse dentro de la transacción que inserta la noticia.
+        """
+        fecha_creacion = noticia.fecha_creacion or datetime.now()
+        self.sumar_actividad(db, {
+            (truncar_hora(fecha_creacion), noticia.fuente, noticia.categoria): 1
+        })
+
+    def sumar_actividad(self, db: Session, conteos: Dict[Tuple[datetime, str, str], int]) -> None:
+        """Incrementa en bloque los conteos (hora, fuente, categoria) con un upsert"""
+        if not conteos:
+            return
+        
+        filas = [
+            {'hora': hora, 'fuente': fuente, 'categoria': categoria, 'cantidad': cantidad}
+            for (hora, fuente, categoria), cantidad in conteos.items()
+        ]
+        
+        stmt = mysql_insert(models.ActividadHoraria).values(filas)
+        stmt = stmt.on_duplicate_key_update(
+            cantidad=models.ActividadHoraria.cantidad + stmt.inserted.cantidad
+        )
+        db.execute(stmt)
+
+    def obtener_tendencias(
+        self,
+        db: Session,
+        granularidad: str = 'dia',
+        desde: Optional[datetime] = None,
+        hasta: Optional[datetime] = None,
+        fuente: Optional[str] = None,
+        categoria: Optional[str] = None
+    ) -> List[dict]:
+        """
+        Agrupa el acumulado horario en la granularidad pedida (hora, dia, semana ISO o mes).
+        Solo lee filas de actividad_horaria dentro del rango; los periodos sin noticias van en 0.
+        Lanza ValueError si el rango está invertido o supera MAX_DIAS_TENDENCIAS.
+        """
+        if granularidad not in GRANULARIDADES:
+            raise ValueError(f"Granularidad no soportada: {granularidad}")
+        
+        hasta = hasta or datetime.now()
+        desde = desde or hasta - timedelta(days=7)
+        if desde > hasta:
+            raise ValueError("'desde' debe ser anterior a 'hasta'")
+        if hasta - desde > timedelta(days=MAX_DIAS_TENDENCIAS[granularidad]):
+            raise ValueError(
+                f"El rango máximo con granularidad '{granularidad}' es de {MAX_DIAS_TENDENCIAS[granularidad]} días"
+            )
+        
+        query = db.query(
+            models.ActividadHoraria.hora,
+            func.sum(models.ActividadHoraria.cantidad)
+        ).filter(
+            models.ActividadHoraria.hora >= truncar_hora(desde),
+            models.ActividadHoraria.hora <= hasta
+        )
+        if fuente:
+            query = query.filter(models.ActividadHoraria.fuente == fuente)
+        if categoria:
+            query = query.filter(models.ActividadHoraria.categoria == categoria)
+        
+        filas = query.group_by(models.ActividadHoraria.hora).all()
+        
+        # Inicializar todos los periodos del rango para que la serie no tenga huecos;
+        # salvo por hora basta recorrer día a día (todo periodo contiene el inicio de algún día)
+        etiquetar = GRANULARIDADES[granularidad]
+        serie: Dict[str, int] = {}
+        if granularidad == 'hora':
+            momento, paso = truncar_hora(desde), timedelta(hours=1)
+        else:
+            momento, paso = datetime.combine(desde.date(), datetime.min.time()), timedelta(days=1)
+        while momento <= hasta:
+            serie.setdefault(etiquetar(momento), 0)
+            momento += paso
+        
+        for hora, cantidad in filas:
+            etiqueta = etiquetar(hora)
+            serie[etiqueta] = serie.get(etiqueta, 0) + int(cantidad)
+        
+        return [{'fecha': etiqueta, 'cantidad': cantidad} for etiqueta, cantidad in serie.items()]
+
+    def _rellenar_desde_noticias(self, db: Session, fila: models.EstadisticasAgregadas) -> None:
+        """Calcula los contadores completos con consultas agregadas sobre noticias"""
+        fila.total_noticias = db.query(func.count(models.Noticia.id)).scalar() or 0
+
+        fila.categorias = {
+            categoria: count for categoria, count in db.query(
+                models.Noticia.categoria,
+                func.count(models.Noticia.id)
+            ).group_by(models.Noticia.categoria).all()
+        }
+
+        fila.fuentes = {
+            fuente: count for fuente, count in db.query(
+                models.Noticia.fuente,
+                func.count(models.Noticia.id)
+            ).group_by(models.Noticia.fuente).all()
+        }
+
+        fila.ultima_actualizacion = db.query(func.max(models.Noticia.fecha_creacion)).scalar()
+
+# Instancia global
+crud_estadisticas = CRUDEstadisticas()
@@ -0,0 +1,173 @@
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+import logging
+
+from app import models
+from app.leases import gestor_leases
+
+logger = logging.getLogger(__name__)
+
+ESTADOS_ACTIVOS = ('pendiente', 'en_progreso')
+CAMPOS_CONTEO = ('noticias_obtenidas', 'noticias_guardadas', 'duplicados', 'errores')
+
+def recurso_trabajo(trabajo_id: int) -> str:
+    """Nombre del lease que mantiene vivo un trabajo mientras un worker lo ejecuta"""
+    return f"trabajo_scraping:{trabajo_id}"
+
+def recurso_fuente(fuente: str) -> str:
+    """Nombre del lease que garantiza un solo scraper activo por fuente en el clúster"""
+    return f"fuente:{fuente}"
+
+def progreso_inicial(fuente_estado: str = 'pendiente') -> Dict[str, Any]:
+    """Progreso vacío de una fuente"""
+    return {'estado': fuente_estado, **{campo: 0 for campo in CAMPOS_CONTEO}, 'error': None}
+
+class CRUDTrabajosScraping:
+    def crear_trabajo(
+        self, db: Session, fuentes: List[str]
+    ) -> Tuple[Optional[models.TrabajoScraping], Optional[models.TrabajoScraping]]:
+        """
+        Crea un trabajo para las fuentes indicadas.
+        Devuelve (nuevo, None) o, si alguna fuente ya tiene un trabajo activo, (None, activo).
+        """
+        try:
+            # Bloquear los trabajos activos para que dos peticiones simultáneas no creen duplicados
+            activos = db.query(models.TrabajoScraping).filter(
+                models.TrabajoScraping.estado.in_(ESTADOS_ACTIVOS)
+            ).with_for_update().all()
+
+            for activo in activos:
+                if set(activo.fuentes) & set(fuentes):
+                    db.rollback()
+                    return None, activo
+
+            trabajo = models.TrabajoScraping(
+                estado='pendiente',
+                fuentes=fuentes,
+                progreso={fuente: progreso_inicial() for fuente in fuentes},
+                creado_en=datetime.now()
+            )
+            db.add(trabajo)
+            db.commit()
+            db.refresh(trabajo)
+
+            logger.info(f"Trabajo de scraping {trabajo.id} creado para: {', '.join(fuentes)}")
+            return trabajo, None
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error creando trabajo de scraping: {e}")
+            raise
+
+    def obtener_trabajo(self, db: Session, trabajo_id: int) -> Optional[models.TrabajoScraping]:
+        """Obtiene un trabajo por ID"""
+        return db.get(models.TrabajoScraping, trabajo_id)
+
+    def reclamar_siguiente(self, db: Session, worker: str) -> Optional[models.TrabajoScraping]:
+        """
+        Toma el trabajo pendiente más antiguo y lo marca en progreso.
+        SKIP LOCKED permite que varios workers consulten a la vez sin bloquearse ni tomar el mismo.
+        """
+        try:
+            trabajo = db.query(models.TrabajoScraping).filter(
+                models.TrabajoScraping.estado == 'pendiente'
+            ).order_by(
+                models.TrabajoScraping.id
+            ).with_for_update(skip_locked=True).first()
+
+            if trabajo is None:
+                db.rollback()
+                return None
+
+            trabajo.estado = 'en_progreso'
+            trabajo.worker = worker
+            trabajo.iniciado_en = datetime.now()
+            db.commit()
+            db.refresh(trabajo)
+            return trabajo
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error reclamando trabajo de scraping: {e}")
+            return None
+
+    def recuperar_abandonados(self, db: Session, segundos_lease: int) -> List[int]:
+        """
+        Devuelve a 'pendiente' los trabajos en progreso cuyo worker dejó de renovar su lease,
+        para que otro nodo los retome (solo se repiten las fuentes no completadas).
+        """
+        try:
+            limite = datetime.now() - timedelta(seconds=segundos_lease)
+            candidatos = db.query(models.TrabajoScraping).filter(
+                models.TrabajoScraping.estado == 'en_progreso',
+                models.TrabajoScraping.iniciado_en < limite
+            ).with_for_update(skip_locked=True).all()
+
+            recuperados = []
+            for trabajo in candidatos:
+                if gestor_leases.esta_vigente(db, recurso_trabajo(trabajo.id)):
+                    continue
+                logger.warning(f"♻️ Trabajo de scraping {trabajo.id} abandonado por {trabajo.worker}, se vuelve a encolar")
+                trabajo.estado = 'pendiente'
+                trabajo.worker = None
+                recuperados.append(trabajo.id)
+
+            db.commit()
+            return recuperados
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error recuperando trabajos de scraping abandonados: {e}")
+            return []
+
+    def actualizar_fuente(self, db: Session, trabajo_id: int, fuente: str, **datos) -> None:
+        """Actualiza el progreso de una fuente y recalcula los totales del trabajo"""
+        try:
+            # Varias fuentes del mismo trabajo se actualizan desde hilos distintos
+            trabajo = db.query(models.TrabajoScraping).filter(
+                models.TrabajoScraping.id == trabajo_id
+            ).with_for_update().one()
+
+            progreso = dict(trabajo.progreso or {})
+            progreso[fuente] = {**progreso.get(fuente, progreso_inicial()), **datos}
+
+            # Reasignar para que SQLAlchemy detecte el cambio en la columna JSON
+            trabajo.progreso = progreso
+            for campo in CAMPOS_CONTEO:
+                setattr(trabajo, campo, sum(p.get(campo, 0) for p in progreso.values()))
+
+            db.commit()
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error actualizando progreso del trabajo {trabajo_id} ({fuente}): {e}")
+
+    def finalizar_trabajo(self, db: Session, trabajo_id: int, error: Optional[str] = None) -> None:
+        """Marca el trabajo como completado, o fallido si todas sus fuentes fallaron"""
+        try:
+            trabajo = db.query(models.TrabajoScraping).filter(
+                models.TrabajoScraping.id == trabajo_id
+            ).with_for_update().one()
+
+            fuentes_fallidas = [
+                fuente for fuente, p in (trabajo.progreso or {}).items() if p.get('estado') == 'fallido'
+            ]
+            fallo_total = error is not None or len(fuentes_fallidas) == len(trabajo.fuentes)
+
+            trabajo.estado = 'fallido' if fallo_total else 'completado'
+            trabajo.error = error
+            trabajo.finalizado_en = datetime.now()
+            db.commit()
+
+            logger.info(
+                f"Trabajo de scraping {trabajo_id} {trabajo.estado}: {trabajo.noticias_guardadas} nuevas, "
+                f"{trabajo.duplicados} duplicados, {trabajo.errores} errores"
+            )
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error finalizando trabajo de scraping {trabajo_id}: {e}")
+
+# Instancia global
+crud_trabajos_scraping = CRUDTrabajosScraping()
@@ -1,4 +1,4 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from . import models
 from fastapi import HTTPException, status
 
@@ -47,8 +47,32 @@ def obtener_solicitudes_upgrade(db: Session, skip: int = 0, limit: int = 100, es
     
     return query.offset(skip).limit(limit).all()
 
+def listar_solicitudes_con_usuario(db: Session, skip: int = 0, limit: int = 100, estado: str = None):
+    """Solicitudes con nombre y email del usuario en una sola consulta con JOIN, como dicts de respuesta"""
+    query = db.query(
+        models.SolicitudUpgrade.id,
+        models.SolicitudUpgrade.usuario_id,
+        models.SolicitudUpgrade.plan_solicitado,
+        models.SolicitudUpgrade.codigo_yape,
+        models.SolicitudUpgrade.monto,
+        models.SolicitudUpgrade.estado,
+        models.SolicitudUpgrade.fecha_solicitud,
+        models.SolicitudUpgrade.fecha_revision,
+        models.SolicitudUpgrade.notas_admin,
+        models.Usuario.nombre.label('usuario_nombre'),
+        models.Usuario.email.label('usuario_email')
+    ).join(models.Usuario, models.Usuario.id == models.SolicitudUpgrade.usuario_id)
+    
+    if estado:
+        query = query.filter(models.SolicitudUpgrade.estado == estado)
+    
+    return [dict(fila._mapping) for fila in query.offset(skip).limit(limit).all()]
+
 def obtener_solicitud_upgrade_por_id(db: Session, solicitud_id: int):
-    return db.query(models.SolicitudUpgrade).filter(models.SolicitudUpgrade.id == solicitud_id).first()
+    # El usuario se carga en la misma consulta porque las respuestas siempre lo usan
+    return db.query(models.SolicitudUpgrade).options(
+        joinedload(models.SolicitudUpgrade.usuario)
+    ).filter(models.SolicitudUpgrade.id == solicitud_id).first()
 
 def actualizar_solicitud_upgrade(db: Session, solicitud_id: int, solicitud_data: dict):
     db_solicitud = obtener_solicitud_upgrade_por_id(db, solicitud_id)
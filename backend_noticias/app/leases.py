@@ -0,0 +1,162 @@
+import os
+import uuid
+import socket
+import logging
+import threading
+from typing import Callable, Optional
+
+from sqlalchemy import func, literal_column
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+def generar_titular() -> str:
+    """Identificador único del proceso que toma leases (host:pid:aleatorio)"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+def _vencimiento(segundos: int):
+    # Se usa la hora del servidor MySQL para que los relojes de los nodos no influyan
+    return func.timestampadd(literal_column('SECOND'), segundos, func.now())
+
+class GestorLeases:
+    """
+    Leases en la tabla `leases`: un solo titular por recurso en todo el clúster.
+    Si el titular muere y deja de renovar, el lease vence y otro nodo puede tomarlo.
+    """
+
+    def adquirir(self, db: Session, recurso: str, titular: str, segundos: int) -> bool:
+        """Intenta tomar el lease; devuelve True si ahora pertenece a `titular`"""
+        try:
+            # Tomar un lease vencido (o renovar uno propio) con un UPDATE condicional atómico
+            actualizadas = db.query(models.Lease).filter(
+                models.Lease.recurso == recurso,
+                (models.Lease.expira_en < func.now()) | (models.Lease.titular == titular)
+            ).update({
+                models.Lease.titular: titular,
+                models.Lease.adquirido_en: func.now(),
+                models.Lease.expira_en: _vencimiento(segundos)
+            }, synchronize_session=False)
+            db.commit()
+            if actualizadas:
+                return True
+
+            # No existe o pertenece a otro titular vigente: intentar crearlo
+            db.add(models.Lease(
+                recurso=recurso,
+                titular=titular,
+                adquirido_en=func.now(),
+                expira_en=_vencimiento(segundos)
+            ))
+            db.commit()
+            return True
+
+        except IntegrityError:
+            # Otro titular lo tiene vigente
+            db.rollback()
+            return False
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error adquiriendo lease {recurso}: {e}")
+            return False
+
+    def renovar(self, db: Session, recurso: str, titular: str, segundos: int) -> bool:
+        """Extiende el lease; devuelve False si ya no pertenece a `titular`"""
+        try:
+            actualizadas = db.query(models.Lease).filter(
+                models.Lease.recurso == recurso,
+                models.Lease.titular == titular
+            ).update({models.Lease.expira_en: _vencimiento(segundos)}, synchronize_session=False)
+            db.commit()
+            return actualizadas == 1
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error renovando lease {recurso}: {e}")
+            return False
+
+    def liberar(self, db: Session, recurso: str, titular: str) -> None:
+        """Suelta el lease si todavía pertenece a `titular`"""
+        try:
+            db.query(models.Lease).filter(
+                models.Lease.recurso == recurso,
+                models.Lease.titular == titular
+            ).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error liberando lease {recurso}: {e}")
+
+    def esta_vigente(self, db: Session, recurso: str) -> bool:
+        """Indica si algún titular tiene el lease sin vencer"""
+        return db.query(models.Lease.recurso).filter(
+            models.Lease.recurso == recurso,
+            models.Lease.expira_en >= func.now()
+        ).first() is not None
+
+class LeaseConLatido:
+    """
+    Toma un lease y lo renueva desde un hilo mientras dure el bloque `with`.
+    Si una renovación falla (el lease venció y otro nodo lo tomó), `perdido` queda
+    activo y quien lo usa debe dejar de trabajar sobre el recurso.
+
+        with LeaseConLatido('fuente:rpp', titular, 60) as lease:
+            if lease.adquirido:
+                ...
+    """
+
+    def __init__(
+        self,
+        recurso: str,
+        titular: str,
+        segundos: int = 60,
+        session_factory: Callable = SessionLocal
+    ):
+        self.recurso = recurso
+        self.titular = titular
+        self.segundos = segundos
+        self.session_factory = session_factory
+        self.adquirido = False
+        self.perdido = threading.Event()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "LeaseConLatido":
+        db = self.session_factory()
+        try:
+            self.adquirido = gestor_leases.adquirir(db, self.recurso, self.titular, self.segundos)
+        finally:
+            db.close()
+
+        if self.adquirido:
+            self._hilo = threading.Thread(target=self._latir, name=f"lease-{self.recurso}", daemon=True)
+            self._hilo.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if not self.adquirido:
+            return
+        self._detener.set()
+        self._hilo.join()
+        db = self.session_factory()
+        try:
+            gestor_leases.liberar(db, self.recurso, self.titular)
+        finally:
+            db.close()
+
+    def _latir(self) -> None:
+        # Renovar con margen: tres latidos por periodo de vencimiento
+        while not self._detener.wait(self.segundos / 3):
+            db = self.session_factory()
+            try:
+                if not gestor_leases.renovar(db, self.recurso, self.titular, self.segundos):
+                    logger.warning(f"⚠️ Lease {self.recurso} perdido por {self.titular}")
+                    self.perdido.set()
+                    return
+            finally:
+                db.close()
+
+# Instancia global
+gestor_leases = GestorLeases()
@@ -1,5 +1,6 @@
 import sys
 import os
+import subprocess
 from pathlib import Path
 
 # Agregar el directorio padre al path para imports
@@ -15,25 +16,39 @@ from app.schemas_upgrade import (
 from app.crud import crud_reportes
 from app.crud_auth import crear_usuario_admin_inicial, autenticar_usuario, crear_usuario
 from app.crud_upgrade import (
-    crear_solicitud_upgrade, obtener_solicitudes_upgrade, 
+    crear_solicitud_upgrade, listar_solicitudes_con_usuario,
     actualizar_solicitud_upgrade, obtener_solicitudes_por_usuario
 )
-from app.auth import crear_access_token, obtener_usuario_actual, verificar_rol_admin, verificar_plan_plus
+from app.auth import (
+    crear_access_token, obtener_usuario_actual, verificar_rol_admin, verificar_plan_plus, verificar_plan_plus_o_admin
+)
 
-from fastapi import FastAPI, Depends, HTTPException, Query, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException, Query, BackgroundTasks, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Union
 import logging
 import asyncio
-from datetime import timedelta
-# En la sección de importaciones, agrega:
-from app.crud_auth import obtener_estadisticas_usuarios
+from datetime import date, datetime, timedelta
 # Importaciones locales
 from app import models, schemas, crud, scraper, database
 from app.database import get_db, create_tables
 from app.crud_ai import crud_analisis_ia
-from app.schemas import AnalisisIARequest, AnalisisIAResponse
+from app.cola_analisis import cola_analisis, PRIORIDAD_INTERACTIVA, PRIORIDAD_LOTE, ESTADOS_ACTIVOS
+from app.crud_estadisticas import crud_estadisticas
+from app.crud_scraping import crud_trabajos_scraping
+from app.scraper import FUENTES_SCRAPING
+from app.metricas import snapshots_metricas, serializar_snapshot
+from app.respuestas import RespuestaJSON, CompresionMiddleware
+from app.config import settings
+from app.cache import (
+    cache_respuestas, fragmentos_noticias, cache_llm, version_datos, calcular_etag, etag_coincide,
+    FragmentosJSON, FALTA
+)
+from app.schemas import (
+    AnalisisIARequest, AnalisisIAResponse, EstadoAnalisisIA, AnalisisIALoteRequest, AnalisisIALoteResponse
+)
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -42,7 +57,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="News Aggregator API",
     description="API para scraping y gestión de noticias peruanas",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=RespuestaJSON
 )
 
 # Configurar CORS
@@ -54,6 +70,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Comprimir respuestas grandes (brotli si está disponible, si no gzip)
+app.add_middleware(CompresionMiddleware, minimo_bytes=settings.COMPRESION_MINIMO_BYTES)
+
+# Proceso del worker de scraping lanzado por la API (si SCRAPING_WORKER_EMBEBIDO)
+_proceso_worker_scraping = None
+
 # Evento de inicio: crear tablas y admin inicial
 @app.on_event("startup")
 def startup_event():
@@ -65,10 +87,83 @@ def startup_event():
         logger.info("✅ Usuario admin creado/verificado: admin@newsperu.com / 123456")
     except Exception as e:
         logger.error(f"Error creando usuario admin: {e}")
+    try:
+        # Asegurar que exista la fila de estadísticas agregadas
+        crud_estadisticas.obtener_fila(db)
+    except Exception as e:
+        logger.error(f"Error inicializando estadísticas agregadas: {e}")
     finally:
         db.close()
+    # Renovar en segundo plano el snapshot de métricas avanzadas
+    snapshots_metricas.iniciar()
+    # Hilos de la cola de análisis IA de este proceso
+    cola_analisis.iniciar()
+    # Worker de scraping en un proceso aparte (desactivar si se despliega por separado)
+    if settings.SCRAPING_WORKER_EMBEBIDO:
+        global _proceso_worker_scraping
+        _proceso_worker_scraping = subprocess.Popen([sys.executable, "-m", "app.worker_scraping"], cwd=str(parent_dir))
+        logger.info(f"👷 Worker de scraping embebido iniciado (pid {_proceso_worker_scraping.pid})")
     logger.info("Tablas de la base de datos verificadas/creadas")
 
+@app.on_event("shutdown")
+def shutdown_event():
+    snapshots_metricas.detener()
+    if _proceso_worker_scraping is not None:
+        _proceso_worker_scraping.terminate()
+
+def _verificar_etag(request: Request, response: Response, version: int, ruta: str, params: dict) -> Optional[Response]:
+    """
+    Calcula el ETag de la consulta y, si el cliente ya lo tiene (If-None-Match),
+    devuelve un 304 sin ejecutar la consulta ni serializar nada.
+    """
+    etag = calcular_etag(version, ruta, params)
+    if etag_coincide(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return None
+
+# Vista de los listados: 'completa' (con contenido) o 'resumen' (sin contenido)
+VISTA_QUERY = Query("completa", regex="^(completa|resumen)$", description="completa | resumen")
+
+def _serializar_noticias(noticias: List[models.Noticia], vista: str) -> list:
+    """Convierte las filas al schema de la vista pedida (el resumen nunca toca contenido)"""
+    modelo = schemas.NoticiaResumen if vista == "resumen" else schemas.Noticia
+    return [modelo.model_validate(noticia) for noticia in noticias]
+
+def _json_noticias(db: Session, ids: List[int], vista: str) -> bytes:
+    """
+    Arma el arreglo JSON de las noticias en el orden de `ids` usando fragmentos ya serializados.
+    Solo las noticias que faltan en la caché se leen (una consulta IN) y se serializan.
+    """
+    fragmentos = fragmentos_noticias.obtener_varios(ids, vista)
+    faltantes = [noticia_id for noticia_id in ids if noticia_id not in fragmentos]
+    
+    if faltantes:
+        modelo = schemas.NoticiaResumen if vista == "resumen" else schemas.Noticia
+        for noticia in crud.crud_noticias.obtener_noticias_por_ids(db, faltantes, vista=vista):
+            fragmento = modelo.model_validate(noticia).model_dump_json().encode("utf-8")
+            fragmentos_noticias.guardar(noticia.id, vista, fragmento)
+            fragmentos[noticia.id] = fragmento
+    
+    return FragmentosJSON.unir([fragmentos[noticia_id] for noticia_id in ids if noticia_id in fragmentos])
+
+def _respuesta_json(contenido: bytes, response: Response) -> Response:
+    """Respuesta JSON cruda con las cabeceras de caché ya calculadas para la petición"""
+    cabeceras = {
+        nombre: valor for nombre, valor in response.headers.items()
+        if nombre in ("etag", "cache-control")
+    }
+    return Response(content=contenido, media_type="application/json", headers=cabeceras)
+
+def _respuesta_cacheada(version: int, ruta: str, params: dict, calcular):
+    """Devuelve la respuesta desde la caché o la calcula y la guarda para la versión de los datos"""
+    respuesta = cache_respuestas.obtener(ruta, version, params)
+    if respuesta is FALTA:
+        respuesta = calcular()
+        cache_respuestas.guardar(ruta, version, params, respuesta)
+    return respuesta
+
 # Endpoints principales
 @app.get("/")
 def read_root():
@@ -83,108 +178,170 @@ def read_root():
         }
     }
 
-@app.get("/noticias", response_model=List[schemas.Noticia])
+@app.get("/noticias", response_model=List[Union[schemas.NoticiaResumen, schemas.Noticia]])
 def listar_noticias(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     fuente: Optional[str] = None,
+    vista: str = VISTA_QUERY,
     db: Session = Depends(get_db)
 ):
     """
     Obtiene todas las noticias con paginación.
-    Opcionalmente filtra por fuente.
+    Opcionalmente filtra por fuente. Con vista=resumen no se incluye el contenido.
     """
-    if fuente:
-        noticias = crud.crud_noticias.obtener_noticias_por_fuente(db, fuente=fuente, skip=skip, limit=limit)
-    else:
-        noticias = crud.crud_noticias.obtener_todas_noticias(db, skip=skip, limit=limit)
+    params = {"skip": skip, "limit": limit, "fuente": fuente, "vista": vista}
+    version = version_datos.obtener(db)
+    no_modificado = _verificar_etag(request, response, version, "/noticias", params)
+    if no_modificado:
+        return no_modificado
+    
+    def calcular():
+        ids = crud.crud_noticias.obtener_ids_noticias(db, fuente=fuente, skip=skip, limit=limit)
+        return _json_noticias(db, ids, vista)
+    
+    return _respuesta_json(_respuesta_cacheada(version, "/noticias", params, calcular), response)
+
+@app.post("/noticias/lote", response_model=schemas.NoticiasLoteResponse)
+def obtener_noticias_lote(lote: schemas.NoticiasLoteRequest, db: Session = Depends(get_db)):
+    """
+    Obtiene varias noticias por ID con una sola consulta.
+    Respeta el orden pedido e informa los IDs que no existen.
+    """
+    # Quitar repetidos manteniendo el orden de la petición
+    ids = list(dict.fromkeys(lote.ids))
     
-    return noticias
+    noticias_por_id = {
+        noticia.id: noticia for noticia in crud.crud_noticias.obtener_noticias_por_ids(db, ids)
+    }
+    
+    return {
+        "noticias": [noticias_por_id[noticia_id] for noticia_id in ids if noticia_id in noticias_por_id],
+        "no_encontradas": [noticia_id for noticia_id in ids if noticia_id not in noticias_por_id]
+    }
 
 @app.get("/noticias/{noticia_id}", response_model=schemas.Noticia)
-def obtener_noticia(noticia_id: int, db: Session = Depends(get_db)):
+def obtener_noticia(noticia_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     Obtiene una noticia específica por su ID.
     """
+    version = version_datos.obtener(db)
+    no_modificado = _verificar_etag(request, response, version, "/noticias/{id}", {"id": noticia_id})
+    if no_modificado:
+        return no_modificado
+    
     noticia = crud.crud_noticias.obtener_noticia_por_id(db, noticia_id=noticia_id)
     if noticia is None:
         raise HTTPException(status_code=404, detail="Noticia no encontrada")
     return noticia
 
-@app.get("/noticias/categoria/{categoria}", response_model=List[schemas.Noticia])
+@app.get("/noticias/categoria/{categoria}", response_model=List[Union[schemas.NoticiaResumen, schemas.Noticia]])
 def listar_noticias_por_categoria(
     categoria: str,
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    vista: str = VISTA_QUERY,
     db: Session = Depends(get_db)
 ):
     """
     Obtiene noticias filtradas por categoría.
     """
-    noticias = crud.crud_noticias.obtener_noticias_por_categoria(db, categoria=categoria, skip=skip, limit=limit)
-    return noticias
+    params = {"categoria": categoria, "skip": skip, "limit": limit, "vista": vista}
+    version = version_datos.obtener(db)
+    no_modificado = _verificar_etag(request, response, version, "/noticias/categoria", params)
+    if no_modificado:
+        return no_modificado
+    
+    def calcular():
+        ids = crud.crud_noticias.obtener_ids_noticias(db, categoria=categoria, skip=skip, limit=limit)
+        return _json_noticias(db, ids, vista)
+    
+    return _respuesta_json(_respuesta_cacheada(version, "/noticias/categoria", params, calcular), response)
 
-@app.get("/buscar", response_model=List[schemas.Noticia])
+@app.get("/buscar", response_model=List[Union[schemas.NoticiaResumen, schemas.Noticia]])
 def buscar_noticias(
+    request: Request,
+    response: Response,
     q: str = Query(..., min_length=2, description="Término de búsqueda"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    vista: str = VISTA_QUERY,
     db: Session = Depends(get_db)
 ):
     """
     Busca noticias por texto en título o contenido.
     """
-    noticias = crud.crud_noticias.buscar_noticias(db, query=q, skip=skip, limit=limit)
-    return noticias
+    version = version_datos.obtener(db)
+    params = {"q": q, "skip": skip, "limit": limit, "vista": vista}
+    no_modificado = _verificar_etag(request, response, version, "/buscar", params)
+    if no_modificado:
+        return no_modificado
+    
+    noticias = crud.crud_noticias.buscar_noticias(db, query=q, skip=skip, limit=limit, vista=vista)
+    return _serializar_noticias(noticias, vista)
 
 @app.get("/estadisticas", response_model=schemas.EstadisticasResponse)
-def obtener_estadisticas(db: Session = Depends(get_db)):
+def obtener_estadisticas(request: Request, response: Response, db: Session = Depends(get_db)):
     """
     Obtiene estadísticas de las noticias en la base de datos.
     """
-    return crud.crud_noticias.obtener_estadisticas(db)
-
-@app.post("/scrape", response_model=schemas.ScrapingResponse)
-def ejecutar_scraping(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    """
-    Ejecuta el scraping de todas las fuentes de noticias y guarda los resultados.
-    """
-    def _procesar_scraping():
-        try:
-            # Ejecutar scraping
-            noticias_obtenidas = scraper.scraper.ejecutar_scraping_completo()
-            
-            # Guardar en base de datos
-            noticias_guardadas = 0
-            duplicados = 0
-            errores = 0
-            
-            for noticia_data in noticias_obtenidas:
-                resultado = crud.crud_noticias.crear_noticia(db, noticia_data)
-                if resultado:
-                    noticias_guardadas += 1
-                else:
-                    if db.query(models.Noticia).filter(models.Noticia.enlace == noticia_data['enlace']).first():
-                        duplicados += 1
-                    else:
-                        errores += 1
-            
-            logger.info(f"Scraping completado: {noticias_guardadas} nuevas, {duplicados} duplicados, {errores} errores")
-            
-        except Exception as e:
-            logger.error(f"Error en proceso de scraping: {e}")
+    version = version_datos.obtener(db)
+    no_modificado = _verificar_etag(request, response, version, "/estadisticas", {})
+    if no_modificado:
+        return no_modificado
+    
+    return _respuesta_cacheada(version, "/estadisticas", {}, lambda: crud.crud_noticias.obtener_estadisticas(db))
+
+@app.post("/scrape", response_model=schemas.ScrapingResponse, status_code=202)
+def ejecutar_scraping(
+    fuentes: Optional[List[str]] = Query(None, description="Fuentes a scrapear (por defecto todas)"),
+    db: Session = Depends(get_db)
+):
+    """
+    Encola un trabajo de scraping y devuelve su ID.
+    Lo ejecuta app.worker_scraping; el avance se consulta en GET /scrape/{trabajo_id}.
+    Si alguna de las fuentes ya tiene un trabajo activo, se devuelve ese trabajo.
+    """
+    fuentes = fuentes or list(settings.NEWS_SOURCES.keys())
+    no_soportadas = [fuente for fuente in fuentes if fuente not in FUENTES_SCRAPING]
+    if no_soportadas:
+        raise HTTPException(status_code=400, detail=f"Fuentes no soportadas: {', '.join(no_soportadas)}")
     
-    # Ejecutar en segundo plano
-    background_tasks.add_task(_procesar_scraping)
+    try:
+        trabajo, activo = crud_trabajos_scraping.crear_trabajo(db, list(dict.fromkeys(fuentes)))
+    except Exception:
+        raise HTTPException(status_code=500, detail="Error creando el trabajo de scraping")
+    
+    if activo is not None:
+        mensaje = f"Ya hay un scraping activo para estas fuentes (trabajo {activo.id})"
+        trabajo = activo
+    else:
+        mensaje = "Scraping encolado"
     
     return {
-        "mensaje": "Scraping iniciado en segundo plano",
-        "noticias_obtenidas": 0,  # Se actualizará cuando termine
-        "noticias_guardadas": 0,
-        "duplicados": 0,
-        "errores": 0
+        "mensaje": mensaje,
+        "noticias_obtenidas": trabajo.noticias_obtenidas,
+        "noticias_guardadas": trabajo.noticias_guardadas,
+        "duplicados": trabajo.duplicados,
+        "errores": trabajo.errores,
+        "trabajo_id": trabajo.id,
+        "estado": trabajo.estado
     }
 
+@app.get("/scrape/{trabajo_id}", response_model=schemas.TrabajoScraping)
+def obtener_trabajo_scraping(trabajo_id: int, db: Session = Depends(get_db)):
+    """
+    Estado de un trabajo de scraping: progreso por fuente y conteos totales
+    """
+    trabajo = crud_trabajos_scraping.obtener_trabajo(db, trabajo_id)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail="Trabajo de scraping no encontrado")
+    return trabajo
+
 @app.get("/fuentes")
 def listar_fuentes():
     """
@@ -238,39 +395,37 @@ def listar_reportes(
     Obtiene todos los reportes con información de la noticia
     """
     try:
-        reportes = crud_reportes.obtener_todos_reportes(db, skip=skip, limit=limit, estado=estado)
-        
-        # Enriquecer con información de la noticia
-        reportes_con_noticia = []
-        for reporte in reportes:
-            reporte_dict = {**reporte.__dict__}
-            reporte_dict['titulo_noticia'] = reporte.noticia.titulo
-            reporte_dict['fuente_noticia'] = reporte.noticia.fuente
-            reporte_dict['enlace_noticia'] = reporte.noticia.enlace
-            reportes_con_noticia.append(reporte_dict)
-        
-        return reportes_con_noticia
+        # Reportes ya enriquecidos con la noticia en una sola consulta
+        return crud_reportes.listar_reportes_con_noticia(db, skip=skip, limit=limit, estado=estado)
         
     except Exception as e:
         logger.error(f"Error obteniendo reportes: {e}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
+# Debe ir antes de /reportes/{reporte_id} para que 'estadisticas' no se tome como ID
+@app.get("/reportes/estadisticas", response_model=EstadisticasReportes)
+def obtener_estadisticas_reportes(db: Session = Depends(get_db)):
+    """
+    Obtiene estadísticas de los reportes
+    """
+    try:
+        estadisticas = crud_reportes.obtener_estadisticas_reportes(db)
+        return estadisticas
+        
+    except Exception as e:
+        logger.error(f"Error obteniendo estadísticas de reportes: {e}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
+
 @app.get("/reportes/{reporte_id}", response_model=ReporteConNoticia)
 def obtener_reporte(reporte_id: int, db: Session = Depends(get_db)):
     """
     Obtiene un reporte específico por ID
     """
-    reporte = crud_reportes.obtener_reporte_por_id(db, reporte_id)
+    reporte = crud_reportes.obtener_reporte_con_noticia(db, reporte_id)
     if not reporte:
         raise HTTPException(status_code=404, detail="Reporte no encontrado")
     
-    # Enriquecer con información de la noticia
-    reporte_dict = {**reporte.__dict__}
-    reporte_dict['titulo_noticia'] = reporte.noticia.titulo
-    reporte_dict['fuente_noticia'] = reporte.noticia.fuente
-    reporte_dict['enlace_noticia'] = reporte.noticia.enlace
-    
-    return reporte_dict
+    return reporte
 
 @app.put("/reportes/{reporte_id}", response_model=Reporte)
 def actualizar_reporte(reporte_id: int, reporte_update: ReporteUpdate, db: Session = Depends(get_db)):
@@ -304,38 +459,57 @@ def eliminar_reporte(reporte_id: int, db: Session = Depends(get_db)):
     
     return {"mensaje": "Reporte eliminado correctamente"}
 
-@app.get("/reportes/estadisticas", response_model=EstadisticasReportes)
-def obtener_estadisticas_reportes(db: Session = Depends(get_db)):
-    """
-    Obtiene estadísticas de los reportes
-    """
-    try:
-        estadisticas = crud_reportes.obtener_estadisticas_reportes(db)
-        return estadisticas
-        
-    except Exception as e:
-        logger.error(f"Error obteniendo estadísticas de reportes: {e}")
-        raise HTTPException(status_code=500, detail="Error interno del servidor")
-    
 # ==================== ENDPOINTS DE ANÁLISIS IA ====================
 
-@app.post("/analizar-noticia-ia", response_model=AnalisisIAResponse)
-def analizar_noticia_ia(
+def _noticia_y_analisis(db: Session, noticia_id: int, refrescar: bool = False):
+    """Noticia y su análisis IA; con refrescar cierra antes la transacción para ver lo que guardó la cola"""
+    if refrescar:
+        db.rollback()
+    noticia = crud.crud_noticias.obtener_noticia_por_id(db, noticia_id)
+    analisis = crud_analisis_ia.obtener_analisis_por_noticia_id(db, noticia_id) if noticia else None
+    return noticia, analisis
+
+@app.post(
+    "/analizar-noticia-ia",
+    response_model=AnalisisIAResponse,
+    responses={202: {"model": EstadoAnalisisIA, "description": "Análisis en cola; consultar url_estado"}}
+)
+async def analizar_noticia_ia(
     request: AnalisisIARequest,
     db: Session = Depends(get_db),
     usuario_actual: UsuarioResponse = Depends(verificar_plan_plus)
 ):
     """
-    Analiza una noticia con IA (solo para usuarios PLUS)
+    Analiza una noticia con IA (solo para usuarios PLUS).
+    Si el análisis no termina en ANALISIS_ESPERA_SEGUNDOS responde 202 y el cliente
+    consulta GET /analizar-noticia-ia/{noticia_id}/estado hasta que esté completado.
+    La espera es asíncrona: no ocupa un hilo del threadpool mientras la cola trabaja.
     """
     try:
-        # Verificar que la noticia existe
-        noticia = crud.crud_noticias.obtener_noticia_por_id(db, request.noticia_id)
+        # Normalmente el pipeline posterior a la ingesta ya creó el análisis
+        noticia, analisis = await run_in_threadpool(_noticia_y_analisis, db, request.noticia_id)
         if not noticia:
             raise HTTPException(status_code=404, detail="Noticia no encontrada")
+        if analisis:
+            return {"analisis": analisis, "noticia": noticia}
+        
+        # Respaldo: analizar bajo demanda; peticiones simultáneas (de cualquier proceso) comparten el trabajo
+        await run_in_threadpool(cola_analisis.encolar, request.noticia_id, PRIORIDAD_INTERACTIVA)
+        estados = await cola_analisis.esperar([request.noticia_id], settings.ANALISIS_ESPERA_SEGUNDOS)
+        trabajo = estados.get(request.noticia_id, {"estado": "en_cola"})
+        if trabajo["estado"] in ESTADOS_ACTIVOS:
+            return RespuestaJSON(
+                status_code=202,
+                content={
+                    "noticia_id": request.noticia_id,
+                    "estado": trabajo["estado"],
+                    "url_estado": f"/analizar-noticia-ia/{request.noticia_id}/estado"
+                }
+            )
+        if trabajo["estado"] != 'completado':
+            raise HTTPException(status_code=500, detail="Error al analizar la noticia")
         
-        # Crear o obtener análisis existente
-        analisis = crud_analisis_ia.crear_analisis(db, request.noticia_id)
+        noticia, analisis = await run_in_threadpool(_noticia_y_analisis, db, request.noticia_id, True)
         if not analisis:
             raise HTTPException(status_code=500, detail="Error al analizar la noticia")
         
@@ -350,6 +524,86 @@ def analizar_noticia_ia(
         logger.error(f"Error en análisis IA: {e}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
+def _ids_pendientes_de_analisis(db: Session, noticia_ids: List[int]):
+    """IDs existentes y, de ellos, los que aún no tienen análisis (solo IDs: nada que el rollback expire)"""
+    existentes = {
+        noticia_id for (noticia_id,) in db.query(models.Noticia.id).filter(
+            models.Noticia.id.in_(noticia_ids)
+        ).all()
+    }
+    analizadas = crud_analisis_ia.obtener_ids_analizados(db, list(existentes))
+    return existentes, [noticia_id for noticia_id in noticia_ids if noticia_id in existentes and noticia_id not in analizadas]
+
+def _analisis_del_lote(db: Session, noticia_ids: List[int], refrescar: bool):
+    if refrescar:
+        # Cerrar la transacción actual para ver las filas que guardaron los hilos de la cola
+        db.rollback()
+    return crud_analisis_ia.obtener_analisis_por_noticia_ids(db, noticia_ids)
+
+@app.post("/analizar-noticias-ia/lote", response_model=AnalisisIALoteResponse)
+async def analizar_noticias_ia_lote(
+    request: AnalisisIALoteRequest,
+    db: Session = Depends(get_db),
+    usuario_actual: UsuarioResponse = Depends(verificar_plan_plus_o_admin)
+):
+    """
+    Analiza con IA varias noticias a la vez (usuarios PLUS y administradores).
+    Devuelve al instante los análisis ya existentes, encola el resto y espera como máximo
+    ANALISIS_ESPERA_SEGUNDOS en total; las pendientes se consultan luego en
+    GET /analizar-noticia-ia/{noticia_id}/estado.
+    """
+    try:
+        noticia_ids = list(dict.fromkeys(request.noticia_ids))
+        existentes, pendientes = await run_in_threadpool(_ids_pendientes_de_analisis, db, noticia_ids)
+        
+        trabajos = {}
+        if pendientes:
+            await run_in_threadpool(cola_analisis.encolar_varios, pendientes, PRIORIDAD_LOTE)
+            trabajos = await cola_analisis.esperar(pendientes, settings.ANALISIS_ESPERA_SEGUNDOS)
+        
+        # Una sola consulta trae todos los análisis del lote, previos y recién creados
+        analisis = await run_in_threadpool(_analisis_del_lote, db, list(existentes), bool(pendientes))
+        
+        resultados = []
+        for noticia_id in noticia_ids:
+            if noticia_id not in existentes:
+                resultados.append({"noticia_id": noticia_id, "estado": "no_encontrada"})
+            elif noticia_id in analisis:
+                resultados.append({"noticia_id": noticia_id, "estado": "completado", "analisis": analisis[noticia_id]})
+            else:
+                trabajo = trabajos.get(noticia_id, {"estado": "en_cola"})
+                resultados.append({"noticia_id": noticia_id, "estado": trabajo["estado"], "error": trabajo.get("error")})
+        
+        return {
+            "resultados": resultados,
+            "completados": sum(1 for r in resultados if r["estado"] == "completado"),
+            "pendientes": sum(1 for r in resultados if r["estado"] in ESTADOS_ACTIVOS),
+            "fallidos": sum(1 for r in resultados if r["estado"] in ("fallido", "no_encontrada"))
+        }
+        
+    except Exception as e:
+        logger.error(f"Error en análisis IA por lote: {e}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
+
+@app.get("/analizar-noticia-ia/{noticia_id}/estado", response_model=EstadoAnalisisIA)
+def obtener_estado_analisis_ia(
+    noticia_id: int,
+    db: Session = Depends(get_db),
+    usuario_actual: UsuarioResponse = Depends(verificar_plan_plus)
+):
+    """
+    Estado del análisis IA de una noticia, para consultar tras un 202 (solo para usuarios PLUS).
+    El estado se lee de trabajos_analisis_ia, así que da igual qué proceso encoló el trabajo;
+    sin_analisis significa que la noticia no tiene análisis ni trabajo en cola.
+    """
+    if crud_analisis_ia.obtener_analisis_por_noticia_id(db, noticia_id):
+        return {"noticia_id": noticia_id, "estado": "completado"}
+    
+    trabajo = cola_analisis.estados([noticia_id], db).get(noticia_id)
+    if trabajo:
+        return trabajo
+    return {"noticia_id": noticia_id, "estado": "sin_analisis"}
+
 @app.get("/noticias/{noticia_id}/analisis-ia", response_model=AnalisisIAResponse)
 def obtener_analisis_ia_noticia(
     noticia_id: int,
@@ -472,88 +726,83 @@ def listar_usuarios(
 
 @app.get("/admin/metricas-avanzadas")
 def obtener_metricas_avanzadas(
+    refrescar: bool = Query(False, description="Recalcular el snapshot antes de responder"),
+    db: Session = Depends(get_db),
+    admin: UsuarioResponse = Depends(verificar_rol_admin)
+):
+    """
+    Obtiene métricas avanzadas del sistema (solo administradores).
+    Devuelve el último snapshot precalculado; con refrescar=true lo recalcula primero.
+    """
+    snapshot = None if refrescar else snapshots_metricas.obtener_ultimo(db)
+    if snapshot is None:
+        snapshot = snapshots_metricas.refrescar()
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="Las métricas aún no están disponibles")
+    return serializar_snapshot(snapshot)
+
+@app.post("/admin/metricas-avanzadas/refrescar")
+def refrescar_metricas_avanzadas(
+    admin: UsuarioResponse = Depends(verificar_rol_admin)
+):
+    """
+    Fuerza el recálculo del snapshot de métricas avanzadas (solo administradores)
+    """
+    snapshot = snapshots_metricas.refrescar()
+    if snapshot is None:
+        raise HTTPException(status_code=500, detail="Error recalculando métricas")
+    return serializar_snapshot(snapshot)
+
+@app.get("/admin/palabras-frecuentes")
+def obtener_palabras_frecuentes(
+    limite: int = Query(100, ge=1, le=1000),
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    categoria: Optional[str] = None,
+    fuente: Optional[str] = None,
     db: Session = Depends(get_db),
     admin: UsuarioResponse = Depends(verificar_rol_admin)
 ):
     """
-    Obtiene métricas avanzadas del sistema (solo administradores)
+    Obtiene las palabras más frecuentes por rango de fechas, categoría o fuente (solo administradores)
+    """
+    return crud.crud_noticias.obtener_palabras_mas_frecuentes(
+        db, limite=limite, desde=desde, hasta=hasta, categoria=categoria, fuente=fuente
+    )
+
+@app.get("/admin/tendencias")
+def obtener_tendencias(
+    granularidad: str = Query("dia", regex="^(hora|dia|semana|mes)$"),
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    fuente: Optional[str] = None,
+    categoria: Optional[str] = None,
+    db: Session = Depends(get_db),
+    admin: UsuarioResponse = Depends(verificar_rol_admin)
+):
+    """
+    Obtiene la cantidad de noticias por hora, día, semana ISO o mes en un rango (solo administradores).
+    El rango máximo depende de la granularidad (31 días por hora, 1 año por día...); más allá responde 422.
     """
     try:
-        # Obtener todas las métricas con manejo individual de errores
-        metricas = {}
-        
-        try:
-            palabras_buscadas = crud.crud_noticias.obtener_palabras_mas_buscadas(db)
-            metricas["palabras_mas_buscadas"] = palabras_buscadas
-            logger.info(f"Palabras más buscadas obtenidas: {len(palabras_buscadas)}")
-        except Exception as e:
-            logger.error(f"Error obteniendo palabras más buscadas: {e}")
-            metricas["palabras_mas_buscadas"] = []
-        
-        try:
-            palabras_frecuentes = crud.crud_noticias.obtener_palabras_mas_frecuentes(db)
-            metricas["palabras_mas_frecuentes"] = palabras_frecuentes
-            logger.info(f"Palabras más frecuentes obtenidas: {len(palabras_frecuentes)}")
-        except Exception as e:
-            logger.error(f"Error obteniendo palabras más frecuentes: {e}")
-            metricas["palabras_mas_frecuentes"] = []
-        
-        try:
-            noticias = crud.crud_noticias.obtener_noticias_mas_populares(db)
-            metricas["noticias_mas_vistas"] = noticias
-            logger.info(f"Noticias populares obtenidas: {len(noticias)}")
-        except Exception as e:
-            logger.error(f"Error obteniendo noticias populares: {e}")
-            metricas["noticias_mas_vistas"] = []
-        
-        try:
-            categorias = crud.crud_noticias.obtener_categorias_mas_populares(db)
-            metricas["categorias_mas_populares"] = categorias
-            logger.info(f"Categorías populares obtenidas: {len(categorias)}")
-        except Exception as e:
-            logger.error(f"Error obteniendo categorías populares: {e}")
-            metricas["categorias_mas_populares"] = []
-        
-        try:
-            tendencias = crud.crud_noticias.obtener_tendencias_temporales(db)
-            metricas["tendencias_temporales"] = tendencias
-            logger.info(f"Tendencias obtenidas: semana={len(tendencias.get('ultima_semana', []))}, mes={len(tendencias.get('ultimo_mes', []))}")
-        except Exception as e:
-            logger.error(f"Error obteniendo tendencias temporales: {e}")
-            metricas["tendencias_temporales"] = {'ultima_semana': [], 'ultimo_mes': []}
-        
-        try:
-            usuarios = obtener_estadisticas_usuarios(db)
-            metricas["actividad_usuarios"] = usuarios
-            logger.info(f"Estadísticas de usuarios: {usuarios}")
-        except Exception as e:
-            logger.error(f"Error obteniendo estadísticas de usuarios: {e}")
-            metricas["actividad_usuarios"] = {
-                'total_usuarios': 0,
-                'usuarios_activos': 0,
-                'nuevos_usuarios': 0,
-                'usuarios_plus': 0
-            }
+        return crud_estadisticas.obtener_tendencias(
+            db, granularidad=granularidad, desde=desde, hasta=hasta, fuente=fuente, categoria=categoria
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@app.get("/admin/metricas-cache")
+def obtener_metricas_cache(admin: UsuarioResponse = Depends(verificar_rol_admin)):
+    """
+    Obtiene aciertos, fallos y ratio de aciertos de las cachés (solo administradores)
+    """
+    return {
+        **cache_respuestas.metricas(),
+        "fragmentos_noticias": fragmentos_noticias.metricas(),
+        "llm": cache_llm.metricas(),
+        "cola_analisis": cola_analisis.metricas()
+    }
 
-        logger.info(f"Métricas completas devueltas: {metricas}")
-        return metricas
-        
-    except Exception as e:
-        logger.error(f"Error general obteniendo métricas avanzadas: {e}")
-        # Devolver estructura vacía pero válida
-        return {
-            "palabras_mas_buscadas": [],
-            "palabras_mas_frecuentes": [],
-            "noticias_mas_vistas": [],
-            "categorias_mas_populares": [],
-            "tendencias_temporales": {'ultima_semana': [], 'ultimo_mes': []},
-            "actividad_usuarios": {
-                'total_usuarios': 0,
-                'usuarios_activos': 0,
-                'nuevos_usuarios': 0,
-                'usuarios_plus': 0
-            }
-        }
 # ==================== ENDPOINTS DE UPGRADE ====================
 
 @app.post("/solicitudes-upgrade", response_model=SolicitudUpgradeResponse)
@@ -653,27 +902,8 @@ def listar_solicitudes_upgrade(
     Listar todas las solicitudes de upgrade (solo administradores)
     """
     try:
-        solicitudes = obtener_solicitudes_upgrade(db, skip=skip, limit=limit, estado=estado)
-        
-        # Crear respuesta manualmente para cada solicitud
-        solicitudes_enriquecidas = []
-        for solicitud in solicitudes:
-            solicitud_dict = {
-                'id': solicitud.id,
-                'usuario_id': solicitud.usuario_id,
-                'plan_solicitado': solicitud.plan_solicitado,
-                'codigo_yape': solicitud.codigo_yape,
-                'monto': solicitud.monto,
-                'estado': solicitud.estado,
-                'fecha_solicitud': solicitud.fecha_solicitud,
-                'fecha_revision': solicitud.fecha_revision,
-                'notas_admin': solicitud.notas_admin,
-                'usuario_nombre': solicitud.usuario.nombre,
-                'usuario_email': solicitud.usuario.email
-            }
-            solicitudes_enriquecidas.append(solicitud_dict)
-        
-        return solicitudes_enriquecidas
+        # Solicitudes con los datos del usuario en una sola consulta
+        return listar_solicitudes_con_usuario(db, skip=skip, limit=limit, estado=estado)
         
     except Exception as e:
         logger.error(f"Error obteniendo solicitudes de upgrade: {e}")
@@ -729,17 +959,8 @@ def listar_solicitudes_upgrade(
     Listar todas las solicitudes de upgrade (solo administradores)
     """
     try:
-        solicitudes = obtener_solicitudes_upgrade(db, skip=skip, limit=limit, estado=estado)
-        
-        # Enriquecer con datos de usuario
-        solicitudes_enriquecidas = []
-        for solicitud in solicitudes:
-            solicitud_dict = {**solicitud.__dict__}
-            solicitud_dict['usuario_nombre'] = solicitud.usuario.nombre
-            solicitud_dict['usuario_email'] = solicitud.usuario.email
-            solicitudes_enriquecidas.append(solicitud_dict)
-        
-        return solicitudes_enriquecidas
+        # Solicitudes con los datos del usuario en una sola consulta
+        return listar_solicitudes_con_usuario(db, skip=skip, limit=limit, estado=estado)
         
     except Exception as e:
         logger.error(f"Error obteniendo solicitudes de upgrade: {e}")
@@ -0,0 +1,176 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+from app.crud import crud_noticias
+from app.crud_auth import obtener_estadisticas_usuarios
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Sección -> (función que la calcula con su propia sesión, valor si falla)
+SECCIONES: Dict[str, Tuple[Callable[[Session], Any], Any]] = {
+    'palabras_mas_buscadas': (crud_noticias.obtener_palabras_mas_buscadas, []),
+    'palabras_mas_frecuentes': (crud_noticias.obtener_palabras_mas_frecuentes, []),
+    'noticias_mas_vistas': (crud_noticias.obtener_noticias_mas_populares, []),
+    'categorias_mas_populares': (crud_noticias.obtener_categorias_mas_populares, []),
+    'tendencias_temporales': (crud_noticias.obtener_tendencias_temporales, {'ultima_semana': [], 'ultimo_mes': []}),
+    'actividad_usuarios': (obtener_estadisticas_usuarios, {
+        'total_usuarios': 0,
+        'usuarios_activos': 0,
+        'nuevos_usuarios': 0,
+        'usuarios_plus': 0
+    }),
+}
+
+class SnapshotsMetricas:
+    """
+    Calcula las métricas avanzadas en paralelo y las guarda como snapshots versionados.
+    El endpoint lee el último snapshot; un hilo en segundo plano lo renueva cada
+    `intervalo` segundos y un administrador puede forzar el recálculo.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable = SessionLocal,
+        intervalo: int = 300,
+        conservados: int = 20
+    ):
+        self.session_factory = session_factory
+        self.intervalo = intervalo
+        self.conservados = conservados
+        self._lock_refresco = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def obtener_ultimo(self, db: Session) -> Optional[models.SnapshotMetricas]:
+        """Devuelve el snapshot más reciente (None si todavía no hay ninguno)"""
+        return db.query(models.SnapshotMetricas).order_by(
+            models.SnapshotMetricas.id.desc()
+        ).first()
+
+    def refrescar(self) -> Optional[models.SnapshotMetricas]:
+        """
+        Calcula y guarda un snapshot nuevo.
+        Si ya hay un recálculo en curso en este proceso, espera a que termine y devuelve ese.
+        """
+        if not self._lock_refresco.acquire(blocking=False):
+            with self._lock_refresco:
+                db = self.session_factory()
+                try:
+                    return self.obtener_ultimo(db)
+                finally:
+                    db.close()
+
+        try:
+            inicio = time.perf_counter()
+            datos, duraciones = self._calcular_secciones()
+            duracion_total = int((time.perf_counter() - inicio) * 1000)
+
+            db = self.session_factory()
+            try:
+                snapshot = models.SnapshotMetricas(
+                    generado_en=datetime.now(),
+                    datos=datos,
+                    duraciones_ms=duraciones,
+                    duracion_total_ms=duracion_total
+                )
+                db.add(snapshot)
+                db.commit()
+                db.refresh(snapshot)
+                self._podar(db, snapshot.id)
+
+                logger.info(f"📈 Snapshot de métricas v{snapshot.id} generado en {duracion_total} ms")
+                return snapshot
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Error guardando snapshot de métricas: {e}")
+                return None
+            finally:
+                db.close()
+        finally:
+            self._lock_refresco.release()
+
+    def _calcular_secciones(self) -> Tuple[Dict[str, Any], Dict[str, int]]:
+        """Calcula todas las secciones en paralelo, cada una con su propia sesión"""
+        with ThreadPoolExecutor(max_workers=len(SECCIONES), thread_name_prefix='metricas') as pool:
+            futuros = {
+                nombre: pool.submit(self._calcular_seccion, nombre, funcion, por_defecto)
+                for nombre, (funcion, por_defecto) in SECCIONES.items()
+            }
+            resultados = {nombre: futuro.result() for nombre, futuro in futuros.items()}
+
+        datos = {nombre: valor for nombre, (valor, _) in resultados.items()}
+        duraciones = {nombre: ms for nombre, (_, ms) in resultados.items()}
+        return datos, duraciones
+
+    def _calcular_seccion(self, nombre: str, funcion: Callable[[Session], Any], por_defecto: Any) -> Tuple[Any, int]:
+        """Calcula una sección y registra su tiempo; si falla usa el valor por defecto"""
+        inicio = time.perf_counter()
+        db = self.session_factory()
+        try:
+            valor = funcion(db)
+        except Exception as e:
+            logger.error(f"Error calculando la sección {nombre} de métricas: {e}")
+            valor = por_defecto
+        finally:
+            db.close()
+
+        ms = int((time.perf_counter() - inicio) * 1000)
+        logger.info(f"⏱️ Sección {nombre} calculada en {ms} ms")
+        return valor, ms
+
+    def _podar(self, db: Session, ultimo_id: int) -> None:
+        """Elimina los snapshots más antiguos que los últimos `conservados`"""
+        try:
+            db.query(models.SnapshotMetricas).filter(
+                models.SnapshotMetricas.id <= ultimo_id - self.conservados
+            ).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"⚠️ No se pudieron eliminar snapshots antiguos: {e}")
+
+    def iniciar(self) -> None:
+        """Arranca el hilo que renueva el snapshot periódicamente"""
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, name='snapshots-metricas', daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        self._detener.set()
+
+    def _bucle(self) -> None:
+        while not self._detener.is_set():
+            try:
+                self.refrescar()
+            except Exception as e:
+                logger.error(f"Error en el refresco periódico de métricas: {e}")
+            self._detener.wait(self.intervalo)
+
+def serializar_snapshot(snapshot: models.SnapshotMetricas) -> Dict[str, Any]:
+    """Secciones del snapshot (mismas claves de siempre) más sus metadatos"""
+    return {
+        **snapshot.datos,
+        'snapshot': {
+            'version': snapshot.id,
+            'generado_en': snapshot.generado_en.isoformat(),
+            'duracion_total_ms': snapshot.duracion_total_ms,
+            'duraciones_ms': snapshot.duraciones_ms
+        }
+    }
+
+# Instancia global
+snapshots_metricas = SnapshotsMetricas(
+    intervalo=settings.METRICAS_INTERVALO_SEGUNDOS,
+    conservados=settings.METRICAS_SNAPSHOTS_CONSERVADOS
+)
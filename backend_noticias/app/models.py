@@ -41,6 +41,50 @@ class Noticia(Base):
         Index('idx_fuente_fecha', 'fuente', 'fecha')
     )
 
+class EstadisticasAgregadas(Base):
+    __tablename__ = "estadisticas_agregadas"
+    
+    # Fila única (id=1) mantenida en la misma transacción que las inserciones
+    id = Column(Integer, primary_key=True)
+    total_noticias = Column(Integer, nullable=False, default=0)
+    categorias = Column(JSON, nullable=False)  # {categoria: cantidad}
+    fuentes = Column(JSON, nullable=False)  # {fuente: cantidad}
+    ultima_actualizacion = Column(DateTime, nullable=True)
+    version = Column(Integer, nullable=False, default=0)  # Se incrementa con cada ingesta
+
+class FrecuenciaTermino(Base):
+    __tablename__ = "frecuencia_terminos"
+    
+    # Conteo de términos por día, categoría y fuente (se llena al ingerir noticias)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    dia = Column(Date, nullable=False)
+    categoria = Column(String(50), nullable=False)
+    fuente = Column(String(50), nullable=False)
+    termino = Column(String(100), nullable=False)
+    cantidad = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        UniqueConstraint('dia', 'categoria', 'fuente', 'termino', name='uq_termino_dia'),
+        Index('idx_termino_dia', 'dia'),
+        Index('idx_termino_categoria_dia', 'categoria', 'dia'),
+        Index('idx_termino_fuente_dia', 'fuente', 'dia'),
+    )
+
+class ActividadHoraria(Base):
+    __tablename__ = "actividad_horaria"
+    
+    # Noticias ingeridas por hora, fuente y categoría (se llena al ingerir noticias)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    hora = Column(DateTime, nullable=False)  # fecha_creacion truncada a la hora
+    fuente = Column(String(50), nullable=False)
+    categoria = Column(String(50), nullable=False)
+    cantidad = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        UniqueConstraint('hora', 'fuente', 'categoria', name='uq_actividad_hora'),
+        Index('idx_actividad_hora', 'hora'),
+    )
+
 class ReporteNoticia(Base):
     __tablename__ = "reportes_noticias"
     
@@ -154,4 +198,72 @@ class Pago(Base):
     __table_args__ = (
         Index('idx_pago_fecha', 'fecha_pago'),
         Index('idx_pago_solicitud', 'solicitud_upgrade_id'),
-    )
\ No newline at end of file
+    )
+
+class SnapshotMetricas(Base):
+    __tablename__ = "snapshots_metricas"
+    
+    # El ID autoincremental es también la versión del snapshot
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    generado_en = Column(DateTime, nullable=False, index=True)
+    datos = Column(JSON, nullable=False)  # Secciones de /admin/metricas-avanzadas
+    duraciones_ms = Column(JSON, nullable=False)  # {seccion: milisegundos}
+    duracion_total_ms = Column(Integer, nullable=False)
+
+class TrabajoScraping(Base):
+    __tablename__ = "trabajos_scraping"
+    
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    estado = Column(String(20), nullable=False, default="pendiente")  # pendiente, en_progreso, completado, fallido
+    fuentes = Column(JSON, nullable=False)  # Claves de settings.NEWS_SOURCES
+    progreso = Column(JSON, nullable=False)  # {fuente: {estado, noticias_obtenidas, noticias_guardadas, duplicados, errores, error}}
+    noticias_obtenidas = Column(Integer, nullable=False, default=0)
+    noticias_guardadas = Column(Integer, nullable=False, default=0)
+    duplicados = Column(Integer, nullable=False, default=0)
+    errores = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    worker = Column(String(100), nullable=True)  # host:pid del worker que lo ejecuta
+    creado_en = Column(DateTime, default=func.now())
+    iniciado_en = Column(DateTime, nullable=True)
+    finalizado_en = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index('idx_trabajo_estado', 'estado'),
+    )
+
+class Lease(Base):
+    __tablename__ = "leases"
+    
+    # Lock distribuido con vencimiento: el titular debe renovarlo antes de expira_en
+    recurso = Column(String(100), primary_key=True)  # p. ej. "fuente:rpp", "trabajo_scraping:12"
+    titular = Column(String(150), nullable=False)
+    adquirido_en = Column(DateTime, nullable=False)
+    expira_en = Column(DateTime, nullable=False, index=True)
+
+class CacheRespuestaLLM(Base):
+    __tablename__ = "cache_llm"
+    
+    # sha256 de (versión del prompt + título + contenido truncado, normalizados)
+    clave = Column(String(64), primary_key=True)
+    version_prompt = Column(String(16), nullable=False)
+    resultado = Column(JSON, nullable=False)
+    creado_en = Column(DateTime, default=func.now())
+    ultimo_uso = Column(DateTime, nullable=False, index=True)  # Para desalojar las menos usadas
+    aciertos = Column(Integer, nullable=False, default=0)
+
+class TrabajoAnalisisIA(Base):
+    __tablename__ = "trabajos_analisis_ia"
+    
+    # Un trabajo por noticia: la clave primaria hace de single-flight entre procesos
+    noticia_id = Column(Integer, ForeignKey("noticias.id", ondelete="CASCADE"), primary_key=True)
+    estado = Column(String(20), nullable=False, default="en_cola")  # en_cola, en_progreso, completado, fallido
+    prioridad = Column(Integer, nullable=False)  # Menor número = se atiende antes
+    error = Column(Text, nullable=True)
+    worker = Column(String(150), nullable=True)  # Titular del reclamo (host:pid:aleatorio:hilo), nuevo en cada reclamo
+    creado_en = Column(DateTime, nullable=False)
+    iniciado_en = Column(DateTime, nullable=True)
+    finalizado_en = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index('idx_trabajo_analisis_cola', 'estado', 'prioridad', 'creado_en'),
+    )
@@ -0,0 +1,163 @@
+import os
+import pickle
+import time
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from sqlalchemy import func
+
+from app import models
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Columnas que se envían a los procesos si no se indican otras
+COLUMNAS_POR_DEFECTO = ('id', 'titulo', 'contenido', 'fecha', 'categoria', 'fuente')
+
+class MotorCorpus:
+    """
+    Recorre la tabla de noticias en bloques por rango de ID y aplica un map-reduce.
+
+    - mapear(filas) se ejecuta en un pool de procesos; recibe una lista de dicts
+      con las columnas pedidas y debe ser una función de nivel de módulo (picklable).
+    - reducir(acumulado, parcial) se ejecuta en el proceso principal, en el orden
+      de los bloques, y devuelve el nuevo acumulado.
+
+    La memoria queda acotada a `bloques_en_vuelo` bloques a la vez. Si se indica un
+    archivo de checkpoint, el progreso se guarda después de cada reducción y una
+    ejecución interrumpida continúa desde el último bloque reducido. Si `reducir`
+    tiene efectos secundarios (escrituras en BD), un fallo entre la reducción y el
+    guardado del checkpoint puede repetir ese único bloque al reanudar.
+    """
+
+    def __init__(
+        self,
+        tamano_bloque: int = 1000,
+        procesos: Optional[int] = None,
+        bloques_en_vuelo: Optional[int] = None,
+        session_factory: Callable = SessionLocal
+    ):
+        self.tamano_bloque = tamano_bloque
+        self.procesos = procesos or os.cpu_count() or 1
+        self.bloques_en_vuelo = bloques_en_vuelo or self.procesos * 2
+        self.session_factory = session_factory
+
+    def ejecutar(
+        self,
+        mapear: Callable[[List[Dict[str, Any]]], Any],
+        reducir: Callable[[Any, Any], Any],
+        inicial: Any,
+        columnas: Sequence[str] = COLUMNAS_POR_DEFECTO,
+        filtros: Sequence[Any] = (),
+        checkpoint: Optional[str] = None,
+        progreso: Optional[Callable[[int, int, int], None]] = None
+    ) -> Any:
+        """Ejecuta el trabajo completo y devuelve el resultado reducido"""
+        estado = self._cargar_checkpoint(checkpoint)
+        if estado:
+            acumulado = estado['acumulado']
+            ultimo_id = estado['ultimo_id']
+            procesadas = estado['procesadas']
+            logger.info(f"♻️ Reanudando trabajo desde id {ultimo_id} ({procesadas} filas ya procesadas)")
+        else:
+            acumulado, ultimo_id, procesadas = inicial, 0, 0
+
+        if 'id' not in columnas:
+            columnas = ('id', *columnas)
+        atributos = [getattr(models.Noticia, columna) for columna in columnas]
+
+        db = self.session_factory()
+        inicio = time.time()
+        try:
+            total = self._contar_filas(db, filtros)
+            pool = ProcessPoolExecutor(max_workers=self.procesos) if self.procesos > 1 else None
+            try:
+                pendientes = deque()
+                ultimo_leido = ultimo_id
+                agotado = False
+
+                while pendientes or not agotado:
+                    # Mantener el pool ocupado sin leer más bloques de los necesarios
+                    while not agotado and len(pendientes) < self.bloques_en_vuelo:
+                        filas = self._leer_bloque(db, atributos, columnas, filtros, ultimo_leido)
+                        if not filas:
+                            agotado = True
+                            break
+                        ultimo_leido = filas[-1]['id']
+                        if pool:
+                            futuro = pool.submit(mapear, filas)
+                        else:
+                            futuro = mapear(filas)
+                        pendientes.append((ultimo_leido, len(filas), futuro))
+
+                    if not pendientes:
+                        break
+
+                    # Reducir en orden de bloque para que el checkpoint sea consistente
+                    bloque_ultimo_id, cantidad, futuro = pendientes.popleft()
+                    parcial = futuro.result() if pool else futuro
+                    acumulado = reducir(acumulado, parcial)
+
+                    ultimo_id = bloque_ultimo_id
+                    procesadas += cantidad
+                    self._guardar_checkpoint(checkpoint, acumulado, ultimo_id, procesadas)
+                    self._reportar_progreso(progreso, procesadas, total, ultimo_id, inicio)
+            finally:
+                if pool:
+                    pool.shutdown(cancel_futures=True)
+        finally:
+            db.close()
+
+        self._borrar_checkpoint(checkpoint)
+        logger.info(f"🎯 Trabajo de corpus completado: {procesadas} filas en {time.time() - inicio:.1f}s")
+        return acumulado
+
+    def leer_checkpoint(self, ruta: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Estado guardado ({'acumulado', 'ultimo_id', 'procesadas'}) o None si no hay checkpoint"""
+        return self._cargar_checkpoint(ruta)
+
+    def _leer_bloque(self, db, atributos, columnas, filtros, desde_id: int) -> List[Dict[str, Any]]:
+        """Lee el siguiente rango de IDs después del último bloque ya enviado"""
+        query = db.query(*atributos).filter(models.Noticia.id > desde_id, *filtros)
+        filas = query.order_by(models.Noticia.id).limit(self.tamano_bloque).all()
+        # Liberar el mapa de identidad: solo se usan tuplas, no objetos ORM
+        db.expunge_all()
+        return [dict(zip(columnas, fila)) for fila in filas]
+
+    def _contar_filas(self, db, filtros) -> int:
+        """Cuenta las filas a procesar para reportar el progreso"""
+        return db.query(func.count(models.Noticia.id)).filter(*filtros).scalar() or 0
+
+    def _reportar_progreso(self, progreso, procesadas: int, total: int, ultimo_id: int, inicio: float) -> None:
+        """Informa el avance por log y al callback opcional"""
+        porcentaje = (procesadas / total * 100) if total else 100.0
+        velocidad = procesadas / max(time.time() - inicio, 1e-6)
+        logger.info(f"📊 Progreso: {procesadas}/{total} ({porcentaje:.1f}%) - id {ultimo_id} - {velocidad:.0f} filas/s")
+        if progreso:
+            progreso(procesadas, total, ultimo_id)
+
+    def _cargar_checkpoint(self, ruta: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Carga el estado guardado si existe"""
+        if not ruta or not os.path.exists(ruta):
+            return None
+        try:
+            with open(ruta, 'rb') as archivo:
+                return pickle.load(archivo)
+        except Exception as e:
+            logger.warning(f"⚠️ Checkpoint ilegible, se empieza desde cero: {e}")
+            return None
+
+    def _guardar_checkpoint(self, ruta: Optional[str], acumulado: Any, ultimo_id: int, procesadas: int) -> None:
+        """Guarda el estado de forma atómica (archivo temporal + reemplazo)"""
+        if not ruta:
+            return
+        temporal = f"{ruta}.tmp"
+        with open(temporal, 'wb') as archivo:
+            pickle.dump({'acumulado': acumulado, 'ultimo_id': ultimo_id, 'procesadas': procesadas}, archivo)
+        os.replace(temporal, ruta)
+
+    def _borrar_checkpoint(self, ruta: Optional[str]) -> None:
+        """Elimina el checkpoint al terminar correctamente"""
+        if ruta and os.path.exists(ruta):
+            os.remove(ruta)
@@ -0,0 +1,132 @@
+import gzip
+import logging
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+# Serializador JSON rápido si orjson está instalado
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as RespuestaJSON
+except ImportError:
+    from fastapi.responses import JSONResponse as RespuestaJSON
+    logger.warning("⚠️ orjson no está instalado, se usa el serializador JSON estándar")
+
+# Brotli es opcional: sin él solo se negocia gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Tipos de contenido que vale la pena comprimir
+TIPOS_COMPRIMIBLES = ('application/json', 'text/', 'application/javascript', 'application/xml')
+
+def etag_con_codificacion(etag: str, codificacion: str) -> str:
+    """'"v3-abc"' -> '"v3-abc-gzip"' (conserva el prefijo W/ de los ETag débiles)"""
+    if etag.endswith('"'):
+        return f'{etag[:-1]}-{codificacion}"'
+    return f'{etag}-{codificacion}'
+
+class CompresionMiddleware:
+    """
+    Middleware ASGI que comprime las respuestas con brotli o gzip según Accept-Encoding.
+    Solo comprime cuerpos de al menos `minimo_bytes` con un tipo de contenido comprimible.
+    Las respuestas en streaming (sin Content-Length o con varios fragmentos) pasan tal cual
+    para no acumularlas en memoria.
+    """
+
+    def __init__(self, app, minimo_bytes: int = 1024, nivel_gzip: int = 5, calidad_brotli: int = 4):
+        self.app = app
+        self.minimo_bytes = minimo_bytes
+        self.nivel_gzip = nivel_gzip
+        self.calidad_brotli = calidad_brotli
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        codificacion = self.elegir_codificacion(Headers(scope=scope).get('accept-encoding', ''))
+        if not codificacion:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = None
+        directo = False
+
+        async def enviar(mensaje):
+            nonlocal inicio, directo
+            if directo or mensaje['type'] not in ('http.response.start', 'http.response.body'):
+                await send(mensaje)
+                return
+
+            if mensaje['type'] == 'http.response.start':
+                if 'content-length' not in Headers(raw=mensaje['headers']):
+                    # Streaming: no se sabe el tamaño, se envía sin comprimir
+                    directo = True
+                    await send(mensaje)
+                    return
+                # Esperar al cuerpo para decidir si se comprime
+                inicio = mensaje
+                return
+
+            if mensaje.get('more_body', False):
+                # Cuerpo en varios fragmentos: pasarlo tal cual en vez de acumularlo
+                directo = True
+                await send(inicio)
+                await send(mensaje)
+                return
+
+            cuerpo = mensaje.get('body', b'')
+            cabeceras = MutableHeaders(raw=inicio['headers'])
+
+            if self._debe_comprimir(inicio['status'], cabeceras, cuerpo):
+                cuerpo = self._comprimir(cuerpo, codificacion)
+                cabeceras['Content-Encoding'] = codificacion
+                cabeceras['Content-Length'] = str(len(cuerpo))
+                cabeceras.add_vary_header('Accept-Encoding')
+                if 'etag' in cabeceras:
+                    # Cada codificación es una representación distinta y necesita su propio ETag
+                    cabeceras['ETag'] = etag_con_codificacion(cabeceras['etag'], codificacion)
+
+            await send(inicio)
+            await send({'type': 'http.response.body', 'body': cuerpo, 'more_body': False})
+
+        await self.app(scope, receive, enviar)
+
+    @staticmethod
+    def elegir_codificacion(accept_encoding: str) -> Optional[str]:
+        """Elige 'br' o 'gzip' según las preferencias (q) del cliente"""
+        aceptadas = {}
+        for parte in accept_encoding.lower().split(','):
+            nombre, _, parametros = parte.strip().partition(';')
+            calidad = 1.0
+            if parametros.strip().startswith('q='):
+                try:
+                    calidad = float(parametros.strip()[2:])
+                except ValueError:
+                    calidad = 0.0
+            if nombre:
+                aceptadas[nombre] = calidad
+
+        candidatas = ['br', 'gzip'] if brotli else ['gzip']
+        candidatas = [c for c in candidatas if aceptadas.get(c, aceptadas.get('*', 0.0)) > 0]
+        if not candidatas:
+            return None
+        # A igual calidad se prefiere el orden de la lista (br antes que gzip)
+        return max(candidatas, key=lambda c: aceptadas.get(c, aceptadas.get('*', 0.0)))
+
+    def _debe_comprimir(self, estado: int, cabeceras: MutableHeaders, cuerpo: bytes) -> bool:
+        if estado < 200 or estado in (204, 304) or len(cuerpo) < self.minimo_bytes:
+            return False
+        if 'content-encoding' in cabeceras:
+            return False
+        tipo = cabeceras.get('content-type', '')
+        return any(tipo.startswith(t) for t in TIPOS_COMPRIMIBLES)
+
+    def _comprimir(self, cuerpo: bytes, codificacion: str) -> bytes:
+        if codificacion == 'br':
+            return brotli.compress(cuerpo, quality=self.calidad_brotli)
+        return gzip.compress(cuerpo, compresslevel=self.nivel_gzip)
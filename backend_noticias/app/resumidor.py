@@ -0,0 +1,194 @@
+import sys
+import time
+import logging
+import argparse
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# Agregar el directorio padre al path para imports
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from app.texto import DocumentoTexto, STOP_WORDS
+
+# NumPy/SciPy son opcionales: sin ellos el analizador usa su resumen de primeras oraciones
+try:
+    import numpy as np
+    from scipy import sparse
+    VECTORIZADO_DISPONIBLE = True
+except ImportError:
+    np = None
+    sparse = None
+    VECTORIZADO_DISPONIBLE = False
+
+logger = logging.getLogger(__name__)
+
+# Las oraciones muy cortas (siglas, cifras) se descartan
+MIN_CARACTERES_ORACION = 20
+MAX_ORACIONES_POR_NOTICIA = 60
+
+# Peso del título dentro del centroide y bono para las primeras oraciones (estilo pirámide invertida)
+PESO_TITULO = 1.0
+PESO_POSICION = 0.1
+
+def oraciones_resumibles(documento: DocumentoTexto) -> List[int]:
+    """Índices de las oraciones con longitud suficiente para formar parte de un resumen"""
+    return [
+        i for i in range(len(documento.oraciones))
+        if len(documento.texto_oracion(i)) > MIN_CARACTERES_ORACION
+    ][:MAX_ORACIONES_POR_NOTICIA]
+
+def terminos_significativos(tokens: List[str]) -> List[str]:
+    return [t for t in tokens if len(t) >= 4 and t.isalpha() and t not in STOP_WORDS]
+
+class ResumidorExtractivo:
+    """
+    Resumen extractivo por centroide sobre vectores TF-IDF de oraciones.
+
+    Todas las oraciones del lote forman una sola matriz dispersa (oraciones x términos).
+    El centroide de cada noticia es la suma de sus oraciones más el título; cada oración
+    puntúa por su similitud coseno con el centroide de su noticia (más un bono por posición)
+    y se eligen las mejores respetando el orden original. Todo el lote se procesa con
+    operaciones matriciales, sin llamadas de red.
+    """
+
+    def __init__(self, max_oraciones: int = 2, max_caracteres: int = 250):
+        self.max_oraciones = max_oraciones
+        self.max_caracteres = max_caracteres
+
+    def resumir(self, titulo: str, contenido: str) -> Optional[str]:
+        return self.resumir_lote([(titulo, contenido)])[0]
+
+    def resumir_lote(self, noticias: List[Tuple[str, str]]) -> List[Optional[str]]:
+        """
+        Resume una lista de (titulo, contenido). Devuelve None para las noticias sin
+        oraciones utilizables o si NumPy/SciPy no están instalados.
+        """
+        if not VECTORIZADO_DISPONIBLE:
+            return [None] * len(noticias)
+        return self.resumir_documentos([DocumentoTexto(titulo, contenido) for titulo, contenido in noticias])
+
+    def resumir_documentos(self, documentos: List[DocumentoTexto]) -> List[Optional[str]]:
+        """Igual que resumir_lote, con los textos ya tokenizados"""
+        if not VECTORIZADO_DISPONIBLE or not documentos:
+            return [None] * len(documentos)
+
+        oraciones: List[str] = []
+        tokens_oraciones: List[List[str]] = []
+        noticia_de_oracion: List[int] = []
+        posiciones: List[int] = []
+        for i, documento in enumerate(documentos):
+            for posicion, indice in enumerate(oraciones_resumibles(documento)):
+                oraciones.append(documento.texto_oracion(indice))
+                tokens_oraciones.append(terminos_significativos(documento.tokens_oracion(indice)))
+                noticia_de_oracion.append(i)
+                posiciones.append(posicion)
+        if not oraciones:
+            return [None] * len(documentos)
+
+        vocabulario: dict = {}
+        X = self._matriz_terminos(tokens_oraciones, vocabulario)
+        T = self._matriz_terminos([terminos_significativos(d.tokens_titulo) for d in documentos], vocabulario)
+        n_terminos = len(vocabulario)
+        X.resize((X.shape[0], n_terminos))
+        T.resize((T.shape[0], n_terminos))
+
+        # IDF calculado sobre las oraciones del lote; TF sublineal y filas normalizadas (L2)
+        df = np.bincount(X.indices, minlength=n_terminos)
+        idf = np.log((1 + X.shape[0]) / (1 + df)) + 1
+        X = self._normalizar(self._ponderar(X, idf))
+        T = self._normalizar(self._ponderar(T, idf))
+
+        noticia_de_oracion = np.asarray(noticia_de_oracion)
+        asignacion = sparse.csr_matrix(
+            (np.ones(len(oraciones)), (noticia_de_oracion, np.arange(len(oraciones)))),
+            shape=(len(documentos), len(oraciones))
+        )
+        centroides = self._normalizar((asignacion @ X + PESO_TITULO * T).tocsr())
+
+        # Similitud de cada oración con el centroide de su noticia
+        puntajes = np.asarray(X.multiply(centroides[noticia_de_oracion]).sum(axis=1)).ravel()
+        puntajes += PESO_POSICION / (1 + np.asarray(posiciones))
+
+        # Mejores oraciones por noticia: ordenar por (noticia, -puntaje) y quedarse con las primeras
+        orden = np.lexsort((-puntajes, noticia_de_oracion))
+        inicio_noticia = np.searchsorted(noticia_de_oracion, np.arange(len(documentos)))
+        rango = np.arange(len(orden)) - inicio_noticia[noticia_de_oracion[orden]]
+        elegidas = np.sort(orden[rango < self.max_oraciones])
+
+        resumenes: List[Optional[str]] = [None] * len(documentos)
+        for indice in elegidas:
+            i = noticia_de_oracion[indice]
+            oracion = oraciones[indice].rstrip('.!? ') + '.'
+            resumenes[i] = oracion if resumenes[i] is None else f"{resumenes[i]} {oracion}"
+
+        return [self._recortar(resumen) if resumen else None for resumen in resumenes]
+
+    def _matriz_terminos(self, filas: List[List[str]], vocabulario: dict):
+        """Matriz CSR de conteos (filas x términos), ampliando el vocabulario compartido"""
+        indptr = [0]
+        indices: List[int] = []
+        datos: List[int] = []
+        for terminos in filas:
+            conteos: dict = {}
+            for termino in terminos:
+                columna = vocabulario.setdefault(termino, len(vocabulario))
+                conteos[columna] = conteos.get(columna, 0) + 1
+            indices.extend(conteos.keys())
+            datos.extend(conteos.values())
+            indptr.append(len(indices))
+        return sparse.csr_matrix(
+            (np.asarray(datos, dtype=np.float64), np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+            shape=(len(filas), max(len(vocabulario), 1))
+        )
+
+    def _ponderar(self, matriz, idf):
+        matriz = matriz.copy()
+        matriz.data = (1 + np.log(matriz.data)) * idf[matriz.indices]
+        return matriz
+
+    def _normalizar(self, matriz):
+        normas = np.sqrt(np.asarray(matriz.multiply(matriz).sum(axis=1)).ravel())
+        normas[normas == 0] = 1
+        return sparse.diags(1 / normas) @ matriz
+
+    def _recortar(self, resumen: str) -> str:
+        if len(resumen) > self.max_caracteres:
+            return resumen[:self.max_caracteres - 3] + '...'
+        return resumen
+
+# Instancia global
+resumidor = ResumidorExtractivo()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Mide la velocidad del resumidor extractivo sobre noticias de la BD")
+    parser.add_argument("--limite", type=int, default=500, help="Noticias más recientes a resumir")
+    parser.add_argument("--lote", type=int, default=200, help="Noticias por pasada vectorizada")
+    args = parser.parse_args()
+
+    if not VECTORIZADO_DISPONIBLE:
+        sys.exit("NumPy y SciPy son necesarios para el resumidor (pip install numpy scipy)")
+
+    from app import models
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        filas = db.query(models.Noticia.titulo, models.Noticia.contenido).order_by(
+            models.Noticia.id.desc()
+        ).limit(args.limite).all()
+    finally:
+        db.close()
+
+    inicio = time.perf_counter()
+    resumenes = []
+    for i in range(0, len(filas), args.lote):
+        resumenes.extend(resumidor.resumir_lote([(f.titulo, f.contenido) for f in filas[i:i + args.lote]]))
+    duracion = time.perf_counter() - inicio
+
+    print(f"{len(filas)} noticias resumidas en {duracion * 1000:.0f} ms "
+          f"({len(filas) / duracion if duracion else 0:.0f} noticias/s)")
+    for (titulo, _), resumen in list(zip(filas, resumenes))[:3]:
+        print(f"\n• {titulo}\n  {resumen}")
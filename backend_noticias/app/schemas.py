@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import date, datetime
 from typing import Optional, List, Dict, Any
 
@@ -22,6 +22,29 @@ class Noticia(NoticiaBase):
     class Config:
         from_attributes = True
 
+class NoticiaResumen(BaseModel):
+    """Proyección para listados: sin contenido"""
+    id: int
+    titulo: str
+    enlace: str
+    fecha: date
+    categoria: str
+    imagen_url: Optional[str] = None
+    fuente: str
+    fecha_creacion: datetime
+    
+    class Config:
+        from_attributes = True
+        # Rechazar campos extra para que una noticia completa nunca se valide como resumen
+        extra = 'forbid'
+
+class NoticiasLoteRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=300)
+
+class NoticiasLoteResponse(BaseModel):
+    noticias: List[Noticia]
+    no_encontradas: List[int]
+
 # Schemas para Respuestas API
 class EstadisticasResponse(BaseModel):
     total_noticias: int
@@ -35,6 +58,34 @@ class ScrapingResponse(BaseModel):
     noticias_guardadas: int
     duplicados: int
     errores: int
+    trabajo_id: Optional[int] = None
+    estado: Optional[str] = None
+
+class ProgresoFuenteScraping(BaseModel):
+    estado: str
+    noticias_obtenidas: int = 0
+    noticias_guardadas: int = 0
+    duplicados: int = 0
+    errores: int = 0
+    error: Optional[str] = None
+
+class TrabajoScraping(BaseModel):
+    id: int
+    estado: str
+    fuentes: List[str]
+    progreso: Dict[str, ProgresoFuenteScraping]
+    noticias_obtenidas: int
+    noticias_guardadas: int
+    duplicados: int
+    errores: int
+    error: Optional[str] = None
+    worker: Optional[str] = None
+    creado_en: Optional[datetime] = None
+    iniciado_en: Optional[datetime] = None
+    finalizado_en: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
 
 class MensajeResponse(BaseModel):
     mensaje: str
@@ -67,4 +118,28 @@ class AnalisisIARequest(BaseModel):
 
 class AnalisisIAResponse(BaseModel):
     analisis: AnalisisIA
-    noticia: Noticia
\ No newline at end of file
+    noticia: Noticia
+
+class EstadoAnalisisIA(BaseModel):
+    noticia_id: int
+    estado: str  # en_cola, en_progreso, completado, fallido, sin_analisis
+    prioridad: Optional[str] = None
+    error: Optional[str] = None
+    creado_en: Optional[datetime] = None
+    iniciado_en: Optional[datetime] = None
+    finalizado_en: Optional[datetime] = None
+
+class AnalisisIALoteRequest(BaseModel):
+    noticia_ids: List[int] = Field(..., min_length=1, max_length=100)
+
+class ResultadoAnalisisIALote(BaseModel):
+    noticia_id: int
+    estado: str  # completado, en_cola, en_progreso, fallido, no_encontrada
+    analisis: Optional[AnalisisIA] = None
+    error: Optional[str] = None
+
+class AnalisisIALoteResponse(BaseModel):
+    resultados: List[ResultadoAnalisisIALote]
+    completados: int
+    pendientes: int
+    fallidos: int
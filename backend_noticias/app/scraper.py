@@ -9,12 +9,27 @@ import re
 import random
 
 from app.config import settings
-from app.classification import clasificador
+from app.classification import clasificador, SUBREDDIT_CATEGORIAS
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def clasificar_pendientes(noticias: List[Dict], url: Optional[str] = None) -> List[Dict]:
+    """
+    Completa la categoría de las noticias que aún no la tienen con una sola llamada a
+    clasificar_lote (el modelo predice todo el lote en un producto de matrices).
+    `url` reemplaza al enlace como pista de clasificación (p. ej. el subreddit).
+    """
+    pendientes = [noticia for noticia in noticias if not noticia.get('categoria')]
+    if pendientes:
+        categorias = clasificador.clasificar_lote([
+            (noticia['titulo'], noticia['contenido'], url or noticia['enlace']) for noticia in pendientes
+        ])
+        for noticia, categoria in zip(pendientes, categorias):
+            noticia['categoria'] = categoria
+    return noticias
+
 class RedditScraper:
     def __init__(self):
         self.session = requests.Session()
@@ -112,7 +127,7 @@ class RedditScraper:
             logger.error(f"❌ Error scrapeando r/{subreddit}: {e}")
         
         logger.info(f"📊 r/{subreddit}: {len(posts)} posts extraídos")
-        return posts
+        return clasificar_pendientes(posts, f"reddit.com/r/{subreddit}")
     
     def _extraer_datos_post(self, post_element, subreddit: str) -> Optional[Dict]:
         """Extrae datos de un post individual de Reddit"""
@@ -247,28 +262,10 @@ class RedditScraper:
         valid_extensions = ['.jpg', '.jpeg', '.png', '.webp', '.gif']
         return any(ext in url.lower() for ext in valid_extensions)
     
-    def _clasificar_post_reddit(self, titulo: str, contenido: str, subreddit: str) -> str:
+    def _clasificar_post_reddit(self, titulo: str, contenido: str, subreddit: str) -> Optional[str]:
         """Clasifica posts de Reddit en categorías"""
-        # Mapeo directo de subreddits a categorías
-        subreddit_mapping = {
-            'worldnews': 'Internacional',
-            'news': 'General', 
-            'technology': 'Tecnología',
-            'science': 'Tecnología',
-            'politics': 'Política',
-            'economics': 'Economía',
-            'sports': 'Deportes',
-            'health': 'Salud',
-            'programming': 'Tecnología',
-            'MachineLearning': 'Tecnología'
-        }
-        
-        # Primero intentar por subreddit
-        if subreddit in subreddit_mapping:
-            return subreddit_mapping[subreddit]
-        
-        # Si no, usar el clasificador existente
-        return clasificador.clasificar_noticia(titulo, contenido, f"reddit.com/r/{subreddit}")
+        # Mapeo directo de subreddit a categoría; el resto se clasifica en lote al final del subreddit
+        return SUBREDDIT_CATEGORIAS.get(subreddit)
     
     def _truncar_url(self, url: str, max_length: int = 500) -> str:
         """Trunca la URL si es demasiado larga"""
@@ -279,6 +276,15 @@ class RedditScraper:
         return url
 
 
+# Fuente (clave de settings.NEWS_SOURCES) -> método de ScraperNoticias
+FUENTES_SCRAPING = {
+    'rpp': 'scrape_rpp',
+    'trome': 'scrape_trome',
+    'el_comercio': 'scrape_el_comercio',
+    'diario_sin_fronteras': 'scrape_diario_sin_fronteras',
+    'reddit': 'scrape_reddit',
+}
+
 class ScraperNoticias:
     def __init__(self):
         self.session = requests.Session()
@@ -296,6 +302,13 @@ class ScraperNoticias:
             logger.error(f"💥 Error crítico en scrape_reddit: {e}")
             return []
         
+    def scrape_fuente(self, fuente: str) -> List[Dict]:
+        """Ejecuta el scraper de una sola fuente (clave de settings.NEWS_SOURCES)"""
+        metodo = FUENTES_SCRAPING.get(fuente)
+        if metodo is None:
+            raise ValueError(f"Fuente no soportada: {fuente}")
+        return getattr(self, metodo)()
+
     def ejecutar_scraping_completo(self) -> List[Dict]:
         """Ejecuta scraping de todas las fuentes incluyendo Reddit"""
         todas_noticias = []
@@ -601,7 +614,7 @@ class ScraperNoticias:
         except Exception as e:
             logger.error(f"Error en scrape_rpp: {e}")
         
-        return noticias
+        return clasificar_pendientes(noticias)
 
     def _extraer_datos_rpp(self, articulo) -> Optional[Dict]:
         """Extrae datos específicos de un artículo de RPP"""
@@ -636,8 +649,6 @@ class ScraperNoticias:
         if not imagen_url and imagen_pagina:
             imagen_url = self._truncar_url(imagen_pagina, settings.MAX_URL_LENGTH)
         
-        categoria = clasificador.clasificar_noticia(titulo, contenido, enlace)
-        
         return {
             'titulo': titulo,
             'enlace': enlace,
@@ -645,7 +656,7 @@ class ScraperNoticias:
             'contenido': contenido[:settings.MAX_CONTENT_LENGTH],
             'imagen_url': imagen_url,
             'fuente': 'RPP',
-            'categoria': categoria
+            'categoria': None  # Se asigna en lote con clasificar_pendientes
         }
 
     # ==================== TROME ====================
@@ -708,7 +719,7 @@ class ScraperNoticias:
         except Exception as e:
             logger.error(f"Error en scrape_trome: {e}")
         
-        return noticias
+        return clasificar_pendientes(noticias)
 
     def _extraer_datos_trome(self, articulo) -> Optional[Dict]:
         """Extrae datos específicos de un artículo de Trome"""
@@ -760,8 +771,6 @@ class ScraperNoticias:
         if not imagen_url and imagen_pagina:
             imagen_url = self._truncar_url(imagen_pagina, settings.MAX_URL_LENGTH)
         
-        categoria = clasificador.clasificar_noticia(titulo, contenido, enlace)
-        
         return {
             'titulo': titulo,
             'enlace': enlace,
@@ -769,7 +778,7 @@ class ScraperNoticias:
             'contenido': contenido[:settings.MAX_CONTENT_LENGTH],
             'imagen_url': imagen_url,
             'fuente': 'Trome',
-            'categoria': categoria
+            'categoria': None  # Se asigna en lote con clasificar_pendientes
         }
 
     # ==================== EL COMERCIO ====================
@@ -843,7 +852,7 @@ class ScraperNoticias:
         except Exception as e:
             logger.error(f"Error en scrape_el_comercio: {e}")
         
-        return noticias
+        return clasificar_pendientes(noticias)
 
     def _extraer_datos_el_comercio(self, articulo) -> Optional[Dict]:
         """Extrae datos específicos de un artículo de El Comercio"""
@@ -919,8 +928,6 @@ class ScraperNoticias:
         if not imagen_url and imagen_pagina:
             imagen_url = self._truncar_url(imagen_pagina, settings.MAX_URL_LENGTH)
         
-        categoria = clasificador.clasificar_noticia(titulo, contenido, enlace)
-        
         return {
             'titulo': titulo,
             'enlace': enlace,
@@ -928,7 +935,7 @@ class ScraperNoticias:
             'contenido': contenido[:settings.MAX_CONTENT_LENGTH],
             'imagen_url': imagen_url,
             'fuente': 'El Comercio',
-            'categoria': categoria
+            'categoria': None  # Se asigna en lote con clasificar_pendientes
         }
 
     # ==================== DIARIO SIN FRONTERAS ====================
@@ -970,7 +977,7 @@ class ScraperNoticias:
         except Exception as e:
             logger.error(f"Error en scrape_diario_sin_fronteras: {e}")
         
-        return noticias
+        return clasificar_pendientes(noticias)
 
     def _extraer_datos_dsf(self, articulo) -> Optional[Dict]:
         """Extrae datos específicos de un artículo de Diario Sin Fronteras"""
@@ -999,8 +1006,6 @@ class ScraperNoticias:
         if not imagen_url and imagen_pagina:
             imagen_url = self._truncar_url(imagen_pagina, settings.MAX_URL_LENGTH)
         
-        categoria = clasificador.clasificar_noticia(titulo, contenido, enlace)
-        
         return {
             'titulo': titulo,
             'enlace': enlace,
@@ -1008,7 +1013,7 @@ class ScraperNoticias:
             'contenido': contenido[:settings.MAX_CONTENT_LENGTH],
             'imagen_url': imagen_url,
             'fuente': 'Diario Sin Fronteras',
-            'categoria': categoria
+            'categoria': None  # Se asigna en lote con clasificar_pendientes
         }
 
 
@@ -0,0 +1,68 @@
+import json
+import time
+import random
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Respuesta fija con la forma que devuelve generateContent de Gemini
+ANALISIS_STUB = {
+    "resumen": "Resumen generado por el servidor stub.",
+    "categoria": "General",
+    "sentimiento": "neutral",
+    "temas_principales": ["stub"],
+    "puntuacion_importancia": 5,
+    "palabras_clave": ["stub", "prueba"]
+}
+
+def crear_manejador(latencia: float, tasa_429: float, tasa_503: float, retry_after: int):
+    class ManejadorStub(BaseHTTPRequestHandler):
+        """Simula generateContent: latencia fija y errores 429/503 con la probabilidad indicada"""
+
+        def do_POST(self):
+            longitud = int(self.headers.get('Content-Length', 0))
+            cuerpo = json.loads(self.rfile.read(longitud) or b'{}')
+            time.sleep(latencia)
+
+            azar = random.random()
+            if azar < tasa_429:
+                self._responder(429, {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED"}}, retry_after)
+                return
+            if azar < tasa_429 + tasa_503:
+                self._responder(503, {"error": {"code": 503, "status": "UNAVAILABLE"}})
+                return
+
+            prompt = cuerpo.get('contents', [{}])[0].get('parts', [{}])[0].get('text', '')
+            self._responder(200, {
+                "candidates": [{"content": {"parts": [{"text": json.dumps(ANALISIS_STUB, ensure_ascii=False)}]}}],
+                "usageMetadata": {"totalTokenCount": len(prompt) // 4 + 60}
+            })
+
+        def _responder(self, estado: int, datos: dict, retry_after: int = 0):
+            cuerpo = json.dumps(datos).encode('utf-8')
+            self.send_response(estado)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(cuerpo)))
+            if retry_after:
+                self.send_header('Retry-After', str(retry_after))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+    return ManejadorStub
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Servidor stub de Gemini para probar el cliente LLM (usar LLM_URL_BASE=http://localhost:PUERTO)"
+    )
+    parser.add_argument("--puerto", type=int, default=8100)
+    parser.add_argument("--latencia", type=float, default=0.5, help="Segundos por respuesta")
+    parser.add_argument("--tasa-429", type=float, default=0.0, help="Proporción de respuestas 429")
+    parser.add_argument("--tasa-503", type=float, default=0.0, help="Proporción de respuestas 503")
+    parser.add_argument("--retry-after", type=int, default=1, help="Segundos enviados en Retry-After con los 429")
+    args = parser.parse_args()
+
+    servidor = ThreadingHTTPServer(
+        ('127.0.0.1', args.puerto),
+        crear_manejador(args.latencia, args.tasa_429, args.tasa_503, args.retry_after)
+    )
+    print(f"🧪 Stub de Gemini escuchando en http://127.0.0.1:{args.puerto}")
+    servidor.serve_forever()
@@ -0,0 +1,225 @@
+import re
+from collections import Counter, deque
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Palabras comunes a excluir (stop words en español)
+STOP_WORDS = {
+    'de', 'la', 'que', 'el', 'en', 'y', 'a', 'los', 'del', 'se', 'las', 'por', 'un', 'para', 'tras', 'https',
+    'con', 'no', 'una', 'su', 'al', 'lo', 'como', 'más', 'pero', 'sus', 'le', 'ya', 'o', 'este', 'segun','mientras',
+    'sí', 'porque', 'esta', 'entre', 'cuando', 'muy', 'sin', 'sobre', 'también', 'me', 'hasta', 
+    'hay', 'donde', 'quien', 'desde', 'todo', 'nos', 'durante', 'todos', 'uno', 'les', 'ni', 
+    'contra', 'otros', 'ese', 'eso', 'ante', 'ellos', 'e', 'esto', 'mí', 'antes', 'algunos', 
+    'qué', 'unos', 'yo', 'otro', 'otras', 'otra', 'él', 'tanto', 'esa', 'estos', 'mucho', 
+    'quienes', 'nada', 'muchos', 'cual', 'poco', 'ella', 'estar', 'estas', 'algunas', 'algo', 
+    'nosotros', 'mi', 'mis', 'tú', 'te', 'ti', 'tu', 'tus', 'ellas', 'nosotras', 'vosotros', 
+    'vosotras', 'os', 'mío', 'mía', 'míos', 'mías', 'tuyo', 'tuya', 'tuyos', 'tuyas', 'suyo', 
+    'suya', 'suyos', 'suyas', 'nuestro', 'nuestra', 'nuestros', 'nuestras', 'vuestro', 'vuestra', 
+    'vuestros', 'vuestras', 'esos', 'esas', 'estoy', 'estás', 'está', 'estamos', 'estáis', 
+    'están', 'esté', 'estés', 'estemos', 'estéis', 'estén', 'estaré', 'estarás', 'estará', 
+    'estaremos', 'estaréis', 'estarán', 'estaría', 'estarías', 'estaríamos', 'estaríais', 
+    'estarían', 'estaba', 'estabas', 'estábamos', 'estabais', 'estaban', 'estuve', 'estuviste', 
+    'estuvo', 'estuvimos', 'estuvisteis', 'estuvieron', 'estuviera', 'estuvieras', 'estuviéramos', 
+    'estuvierais', 'estuvieran', 'estuviese', 'estuvieses', 'estuviésemos', 'estuvieseis', 
+    'estuviesen', 'estando', 'estado', 'estada', 'estados', 'estadas', 'estad', 'he', 'has', 
+    'ha', 'hemos', 'habéis', 'han', 'haya', 'hayas', 'hayamos', 'hayáis', 'hayan', 'habré', 
+    'habrás', 'habrá', 'habremos', 'habréis', 'habrán', 'habría', 'habrías', 'habríamos', 
+    'habríais', 'habrían', 'había', 'habías', 'habíamos', 'habíais', 'habían', 'hube', 'hubiste', 
+    'hubo', 'hubimos', 'hubisteis', 'hubieron', 'hubiera', 'hubieras', 'hubiéramos', 'hubierais', 
+    'hubieran', 'hubiese', 'hubieses', 'hubiésemos', 'hubieseis', 'hubiesen', 'habiendo', 
+    'habido', 'habida', 'habidos', 'habidas', 'soy', 'eres', 'es', 'somos', 'sois', 'son', 
+    'sea', 'seas', 'seamos', 'seáis', 'sean', 'seré', 'serás', 'será', 'seremos', 'seréis', 
+    'serán', 'sería', 'serías', 'seríamos', 'seríais', 'serían', 'era', 'eras', 'éramos', 
+    'erais', 'eran', 'fui', 'fuiste', 'fue', 'fuimos', 'fuisteis', 'fueron', 'fuera', 'fueras', 
+    'fuéramos', 'fuerais', 'fueran', 'fuese', 'fueses', 'fuésemos', 'fueseis', 'fuesen', 
+    'sintiendo', 'sentido', 'sentida', 'sentidos', 'sentidas', 'siente', 'sentid', 'tengo', 
+    'tienes', 'tiene', 'tenemos', 'tenéis', 'tienen', 'tenga', 'tengas', 'tengamos', 'tengáis', 
+    'tengan', 'tendré', 'tendrás', 'tendrá', 'tendremos', 'tendréis', 'tendrán', 'tendría', 
+    'tendrías', 'tendríamos', 'tendríais', 'tendrían', 'tenía', 'tenías', 'teníamos', 'teníais', 
+    'tenían', 'tuve', 'tuviste', 'tuvo', 'tuvimos', 'tuvisteis', 'tuvieron', 'tuviera', 
+    'tuvieras', 'tuviéramos', 'tuvierais', 'tuvieran', 'tuviese', 'tuvieses', 'tuviésemos', 
+    'tuvieseis', 'tuviesen', 'teniendo', 'tenido', 'tenida', 'tenidos', 'tenidas', 'tened'
+}
+
+# Solo palabras con letras de 4 o más caracteres
+PATRON_TERMINO = re.compile(r'\b[a-záéíóúñ]{4,}\b')
+
+# Longitud máxima de un término al guardarlo en la base de datos
+MAX_LONGITUD_TERMINO = 100
+
+def contar_terminos(titulo: Optional[str], contenido: Optional[str]) -> Counter:
+    """Tokeniza título y contenido y cuenta los términos que no son stop words"""
+    contador = Counter()
+    for texto in (titulo, contenido):
+        if not texto:
+            continue
+        for termino in PATRON_TERMINO.findall(texto.lower()):
+            if termino not in STOP_WORDS:
+                contador[termino[:MAX_LONGITUD_TERMINO]] += 1
+    return contador
+
+def contar_terminos_bloque(filas: List[Dict[str, Any]]) -> Counter:
+    """Cuenta términos de un bloque de noticias agrupados por (dia, categoria, fuente, termino)"""
+    conteos = Counter()
+    for fila in filas:
+        for termino, cantidad in contar_terminos(fila['titulo'], fila['contenido']).items():
+            conteos[(fila['fecha'], fila['categoria'], fila['fuente'], termino)] += cantidad
+    return conteos
+
+# Cualquier palabra (incluidas siglas y términos cortos como 'ley', 'gol' u 'onu')
+PATRON_PALABRA = re.compile(r'[0-9a-záéíóúñü]+')
+
+# Separación entre oraciones: espacio tras un signo de fin de oración
+PATRON_FIN_ORACION = re.compile(r'(?<=[.!?])\s+')
+
+# Terminaciones de plural que se aceptan al buscar una expresión ('jugador' -> 'jugadores')
+SUFIJOS_PLURAL = ('', 's', 'es')
+
+class DocumentoTexto:
+    """
+    Título y contenido de una noticia tokenizados una sola vez.
+
+    Guarda los tokens en minúsculas, sus conteos (palabras y bigramas) y los límites de
+    cada oración del contenido. Clasificador, analizador y resumidor consultan este objeto
+    en lugar de volver a recorrer el texto para cada característica.
+    """
+
+    __slots__ = (
+        'titulo', 'contenido', 'tokens_titulo', 'tokens', 'oraciones', 'rangos_oraciones',
+        'conteos', 'conteos_titulo'
+    )
+
+    def __init__(self, titulo: Optional[str], contenido: Optional[str]):
+        self.titulo = titulo or ""
+        self.contenido = contenido or ""
+        self.tokens_titulo: List[str] = PATRON_PALABRA.findall(self.titulo.lower())
+
+        # Contenido: una pasada por oración; cada oración guarda su tramo de texto y de tokens
+        self.tokens: List[str] = []
+        self.oraciones: List[Tuple[int, int]] = []
+        self.rangos_oraciones: List[Tuple[int, int]] = []
+        inicio = 0
+        for fin_oracion in PATRON_FIN_ORACION.finditer(self.contenido):
+            self._agregar_oracion(inicio, fin_oracion.start())
+            inicio = fin_oracion.end()
+        self._agregar_oracion(inicio, len(self.contenido))
+
+        self.conteos_titulo = self._contar(self.tokens_titulo)
+        self.conteos = self._contar(self.tokens, self.conteos_titulo.copy())
+
+    def _agregar_oracion(self, inicio: int, fin: int) -> None:
+        if fin <= inicio:
+            return
+        primer_token = len(self.tokens)
+        self.tokens.extend(PATRON_PALABRA.findall(self.contenido[inicio:fin].lower()))
+        self.oraciones.append((inicio, fin))
+        self.rangos_oraciones.append((primer_token, len(self.tokens)))
+
+    @staticmethod
+    def _contar(tokens: List[str], conteos: Optional[Counter] = None) -> Counter:
+        """Cuenta palabras y bigramas ('palabra1 palabra2') de una secuencia de tokens"""
+        conteos = conteos if conteos is not None else Counter()
+        conteos.update(tokens)
+        conteos.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+        return conteos
+
+    def frecuencia(self, expresion: str, solo_titulo: bool = False) -> int:
+        """
+        Apariciones de una palabra o expresión de dos palabras, como palabra completa
+        y admitiendo su plural
+        """
+        conteos = self.conteos_titulo if solo_titulo else self.conteos
+        expresion = expresion.lower()
+        return sum(conteos.get(expresion + sufijo, 0) for sufijo in SUFIJOS_PLURAL)
+
+    def contiene(self, expresion: str) -> bool:
+        return self.frecuencia(expresion) > 0
+
+    def en_titulo(self, expresion: str) -> bool:
+        return self.frecuencia(expresion, solo_titulo=True) > 0
+
+    def terminos(self) -> Counter:
+        """Conteo de términos significativos (4+ letras, sin stop words) de título y contenido"""
+        return Counter({
+            token: cantidad for token, cantidad in self.conteos.items()
+            if ' ' not in token and len(token) >= 4 and token.isalpha() and token not in STOP_WORDS
+        })
+
+    def texto_oracion(self, indice: int) -> str:
+        inicio, fin = self.oraciones[indice]
+        return self.contenido[inicio:fin].strip()
+
+    def tokens_oracion(self, indice: int) -> List[str]:
+        inicio, fin = self.rangos_oraciones[indice]
+        return self.tokens[inicio:fin]
+
+class AutomataPalabras:
+    """
+    Aho-Corasick sobre tokens: encuentra en una sola pasada todas las expresiones de un
+    diccionario (de una o varias palabras). Como avanza palabra por palabra, nunca hay
+    coincidencias dentro de otra palabra ('ia' no se activa con 'noticia'); la última
+    palabra de cada expresión admite también su plural.
+    """
+
+    def __init__(self, pares: Iterable[Tuple[str, Any]]):
+        # pares: (expresión, valor); una expresión puede repetirse con valores distintos
+        self.valores: List[Any] = []
+        self._transiciones: List[Dict[str, int]] = [{}]
+        self._fallos: List[int] = [0]
+        self._salidas: List[List[int]] = [[]]
+
+        for expresion, valor in pares:
+            palabras = PATRON_PALABRA.findall(expresion.lower())
+            if not palabras:
+                continue
+            indice = len(self.valores)
+            self.valores.append(valor)
+            for sufijo in SUFIJOS_PLURAL:
+                self._agregar(palabras[:-1] + [palabras[-1] + sufijo], indice)
+        self._enlazar_fallos()
+
+    def _agregar(self, palabras: List[str], indice: int) -> None:
+        estado = 0
+        for palabra in palabras:
+            siguiente = self._transiciones[estado].get(palabra)
+            if siguiente is None:
+                siguiente = len(self._transiciones)
+                self._transiciones[estado][palabra] = siguiente
+                self._transiciones.append({})
+                self._fallos.append(0)
+                self._salidas.append([])
+            estado = siguiente
+        if indice not in self._salidas[estado]:
+            self._salidas[estado].append(indice)
+
+    def _enlazar_fallos(self) -> None:
+        """Enlaces de fallo por anchura; cada estado hereda las salidas de su enlace"""
+        cola = deque(self._transiciones[0].values())
+        while cola:
+            estado = cola.popleft()
+            for palabra, siguiente in self._transiciones[estado].items():
+                fallo = self._fallos[estado]
+                while fallo and palabra not in self._transiciones[fallo]:
+                    fallo = self._fallos[fallo]
+                destino = self._transiciones[fallo].get(palabra, 0)
+                self._fallos[siguiente] = destino if destino != siguiente else 0
+                self._salidas[siguiente].extend(
+                    i for i in self._salidas[self._fallos[siguiente]] if i not in self._salidas[siguiente]
+                )
+                cola.append(siguiente)
+
+    def buscar(self, tokens: Iterable[str]) -> Set[int]:
+        """Índices (en self.valores) de las expresiones que aparecen en los tokens"""
+        encontrados: Set[int] = set()
+        transiciones, fallos, salidas = self._transiciones, self._fallos, self._salidas
+        estado = 0
+        for token in tokens:
+            while estado and token not in transiciones[estado]:
+                estado = fallos[estado]
+            estado = transiciones[estado].get(token, 0)
+            if salidas[estado]:
+                encontrados.update(salidas[estado])
+        return encontrados
+
+def pares_por_categoria(palabras: Dict[str, List[str]]) -> Tuple[Tuple[str, str], ...]:
+    """Pares (palabra, categoría) de un diccionario categoría -> palabras clave"""
+    return tuple((palabra, categoria) for categoria, lista in palabras.items() for palabra in lista)
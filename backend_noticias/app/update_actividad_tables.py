@@ -0,0 +1,48 @@
+import sys
+import os
+from pathlib import Path
+from datetime import datetime
+
+# Agregar el directorio padre al path para imports
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from sqlalchemy import func
+from app.database import engine, SessionLocal
+from app.models import ActividadHoraria, Noticia
+from app.crud_estadisticas import crud_estadisticas
+
+def rellenar_actividad_horaria():
+    """Crear la tabla de actividad horaria y llenarla con las noticias existentes"""
+    try:
+        ActividadHoraria.__table__.create(bind=engine, checkfirst=True)
+        print("✅ Tabla de actividad horaria creada/verificada exitosamente")
+        
+        db = SessionLocal()
+        try:
+            # Empezar de cero para que el backfill se pueda repetir sin duplicar conteos
+            db.query(ActividadHoraria).delete(synchronize_session=False)
+            
+            hora = func.date_format(Noticia.fecha_creacion, '%Y-%m-%d %H:00:00')
+            filas = db.query(
+                hora, Noticia.fuente, Noticia.categoria, func.count(Noticia.id)
+            ).filter(
+                Noticia.fecha_creacion.isnot(None)
+            ).group_by(hora, Noticia.fuente, Noticia.categoria).all()
+            
+            crud_estadisticas.sumar_actividad(db, {
+                (datetime.strptime(hora_texto, '%Y-%m-%d %H:%M:%S'), fuente, categoria): cantidad
+                for hora_texto, fuente, categoria, cantidad in filas
+            })
+            db.commit()
+            
+            print(f"🎉 Actividad horaria calculada: {len(filas)} filas")
+        finally:
+            db.close()
+        
+    except Exception as e:
+        print(f"❌ Error llenando actividad horaria: {e}")
+
+if __name__ == "__main__":
+    rellenar_actividad_horaria()
@@ -0,0 +1,33 @@
+import sys
+import os
+from pathlib import Path
+
+# Agregar el directorio padre al path para imports
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from app.database import engine, SessionLocal
+from app.models import EstadisticasAgregadas
+from app.crud_estadisticas import crud_estadisticas
+
+def crear_tabla_estadisticas():
+    """Crear la tabla de estadísticas agregadas y poblarla con los datos actuales"""
+    try:
+        EstadisticasAgregadas.__table__.create(bind=engine, checkfirst=True)
+        print("✅ Tabla de estadísticas agregadas creada/verificada exitosamente")
+        
+        # Recalcular contadores a partir de las noticias existentes
+        db = SessionLocal()
+        try:
+            fila = crud_estadisticas.recalcular(db)
+            print(f"📊 Estadísticas recalculadas: {fila.total_noticias} noticias, "
+                  f"{len(fila.categorias)} categorías, {len(fila.fuentes)} fuentes")
+        finally:
+            db.close()
+        
+    except Exception as e:
+        print(f"❌ Error creando tabla de estadísticas: {e}")
+
+if __name__ == "__main__":
+    crear_tabla_estadisticas()
@@ -0,0 +1,33 @@
+import sys
+import os
+from pathlib import Path
+
+# Agregar el directorio padre al path para imports
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from app.database import engine
+from app.models import SnapshotMetricas
+from app.metricas import snapshots_metricas
+
+def crear_tabla_metricas():
+    """Crear la tabla de snapshots de métricas y generar el primero"""
+    try:
+        SnapshotMetricas.__table__.create(bind=engine, checkfirst=True)
+        print("✅ Tabla de snapshots de métricas creada/verificada exitosamente")
+        
+        snapshot = snapshots_metricas.refrescar()
+        if snapshot is None:
+            print("❌ No se pudo generar el snapshot inicial")
+            return
+        
+        print(f"📈 Snapshot v{snapshot.id} generado en {snapshot.duracion_total_ms} ms")
+        for seccion, ms in snapshot.duraciones_ms.items():
+            print(f"   - {seccion}: {ms} ms")
+        
+    except Exception as e:
+        print(f"❌ Error creando tabla de snapshots de métricas: {e}")
+
+if __name__ == "__main__":
+    crear_tabla_metricas()
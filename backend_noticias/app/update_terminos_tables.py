@@ -0,0 +1,74 @@
+import sys
+import os
+import argparse
+from pathlib import Path
+
+# Agregar el directorio padre al path para imports
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from sqlalchemy import func
+
+from app.database import engine, SessionLocal
+from app.models import FrecuenciaTermino, Noticia
+from app.crud_estadisticas import crud_estadisticas
+from app.motor_corpus import MotorCorpus
+from app.texto import contar_terminos_bloque
+
+CHECKPOINT = str(current_dir / "frecuencia_terminos.checkpoint")
+
+def rellenar_frecuencias_terminos(procesos: int = None, tamano_bloque: int = 500):
+    """Crear la tabla de frecuencias de términos y llenarla con las noticias existentes"""
+    try:
+        FrecuenciaTermino.__table__.create(bind=engine, checkfirst=True)
+        print("✅ Tabla de frecuencias de términos creada/verificada exitosamente")
+        
+        db = SessionLocal()
+        motor = MotorCorpus(tamano_bloque=tamano_bloque, procesos=procesos)
+        try:
+            estado = motor.leer_checkpoint(CHECKPOINT)
+            if estado and isinstance(estado['acumulado'], dict):
+                # Mismo tope que la ejecución interrumpida
+                inicial = estado['acumulado']
+                print(f"♻️ Checkpoint encontrado, se continúa el backfill anterior (hasta id {inicial['tope']})")
+            else:
+                # Empezar de cero para que el backfill se pueda repetir sin duplicar conteos.
+                # Las noticias con id mayor que el tope las suma la ingesta (registrar_terminos)
+                # después del borrado, así que el backfill no debe volver a contarlas.
+                db.query(FrecuenciaTermino).delete(synchronize_session=False)
+                tope = db.query(func.max(Noticia.id)).scalar() or 0
+                db.commit()
+                inicial = {'tope': tope, 'bloques': 0}
+                if os.path.exists(CHECKPOINT):
+                    os.remove(CHECKPOINT)
+            
+            def guardar_bloque(acumulado, conteos):
+                crud_estadisticas.sumar_terminos(db, conteos)
+                db.commit()
+                # El tope viaja en el acumulado, que se guarda en el checkpoint
+                return {**acumulado, 'bloques': acumulado['bloques'] + 1}
+            
+            resultado = motor.ejecutar(
+                contar_terminos_bloque,
+                guardar_bloque,
+                inicial=inicial,
+                columnas=('id', 'titulo', 'contenido', 'fecha', 'categoria', 'fuente'),
+                filtros=(Noticia.id <= inicial['tope'],),
+                checkpoint=CHECKPOINT,
+                progreso=lambda procesadas, total, ultimo_id: print(f"📰 {procesadas}/{total} noticias procesadas (hasta id {ultimo_id})")
+            )
+            
+            print(f"🎉 Frecuencias de términos calculadas ({resultado['bloques']} bloques)")
+        finally:
+            db.close()
+        
+    except Exception as e:
+        print(f"❌ Error llenando frecuencias de términos: {e}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill de la tabla frecuencia_terminos")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos para el map (por defecto, todos los núcleos)")
+    parser.add_argument("--bloque", type=int, default=500, help="Noticias por bloque")
+    args = parser.parse_args()
+    rellenar_frecuencias_terminos(procesos=args.procesos, tamano_bloque=args.bloque)
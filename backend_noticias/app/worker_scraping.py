@@ -0,0 +1,195 @@
+import sys
+import time
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List
+
+# Agregar el directorio padre al path para imports
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from app import models
+from app.config import settings
+from app.crud import crud_noticias
+from app.analisis_pipeline import pipeline_analisis
+from app.crud_scraping import crud_trabajos_scraping, recurso_trabajo, recurso_fuente
+from app.database import SessionLocal
+from app.leases import LeaseConLatido, generar_titular
+from app.scraper import ScraperNoticias
+
+logger = logging.getLogger(__name__)
+
+# Cada cuántas noticias ingeridas se publica el progreso de una fuente
+PROGRESO_CADA = 25
+
+class WorkerScraping:
+    """
+    Ejecuta trabajos de scraping en un proceso separado de la API.
+    Reclama trabajos pendientes de trabajos_scraping y scrapea sus fuentes en
+    paralelo; cada fuente usa su propio scraper y su propia sesión de BD.
+
+    Con varios workers (réplicas de la API o pods) cada fuente se protege con un
+    lease en la BD, así que solo un runner la scrapea a la vez en todo el clúster.
+    El trabajo también mantiene un lease: si el worker muere, el lease vence y
+    otro worker vuelve a encolar el trabajo y completa las fuentes que faltaban.
+    """
+
+    def __init__(
+        self,
+        hilos: int = 5,
+        intervalo: float = 5.0,
+        segundos_lease: int = 60,
+        session_factory: Callable = SessionLocal
+    ):
+        self.hilos = hilos
+        self.intervalo = intervalo
+        self.segundos_lease = segundos_lease
+        self.session_factory = session_factory
+        self.nombre = generar_titular()
+
+    def ejecutar(self, una_vez: bool = False) -> None:
+        """Procesa trabajos hasta que se interrumpa (o hasta vaciar la cola si una_vez)"""
+        logger.info(f"👷 Worker de scraping {self.nombre} iniciado ({self.hilos} hilos)")
+        while True:
+            procesado = self.procesar_siguiente()
+            if not procesado:
+                if una_vez:
+                    return
+                time.sleep(self.intervalo)
+
+    def procesar_siguiente(self) -> bool:
+        """Reclama y ejecuta un trabajo pendiente; devuelve False si no había ninguno"""
+        db = self.session_factory()
+        try:
+            crud_trabajos_scraping.recuperar_abandonados(db, self.segundos_lease)
+            trabajo = crud_trabajos_scraping.reclamar_siguiente(db, self.nombre)
+            if trabajo is None:
+                return False
+            trabajo_id = trabajo.id
+            # Al retomar un trabajo abandonado solo quedan las fuentes sin completar
+            fuentes = [
+                fuente for fuente in trabajo.fuentes
+                if (trabajo.progreso or {}).get(fuente, {}).get('estado') != 'completado'
+            ]
+        finally:
+            db.close()
+
+        error = None
+        nuevas: List[int] = []
+        with LeaseConLatido(recurso_trabajo(trabajo_id), self.nombre, self.segundos_lease, self.session_factory) as lease:
+            if not lease.adquirido:
+                logger.warning(f"⚠️ Trabajo {trabajo_id} ya tiene otro titular, se omite")
+                return True
+
+            logger.info(f"🚀 Trabajo {trabajo_id}: scrapeando {', '.join(fuentes)}")
+            try:
+                if fuentes:
+                    with ThreadPoolExecutor(max_workers=min(self.hilos, len(fuentes)), thread_name_prefix='scraping') as pool:
+                        for ids in pool.map(lambda fuente: self._procesar_fuente(trabajo_id, fuente), fuentes):
+                            nuevas.extend(ids)
+            except Exception as e:
+                error = str(e)
+                logger.error(f"💥 Error en el trabajo de scraping {trabajo_id}: {e}")
+
+        db = self.session_factory()
+        try:
+            crud_trabajos_scraping.finalizar_trabajo(db, trabajo_id, error)
+        finally:
+            db.close()
+
+        # Etapa siguiente: análisis IA anticipado de lo recién ingerido
+        try:
+            pipeline_analisis.procesar(ids=nuevas)
+        except Exception as e:
+            logger.error(f"❌ Error en el análisis IA posterior al trabajo {trabajo_id}: {e}")
+        return True
+
+    def _procesar_fuente(self, trabajo_id: int, fuente: str) -> List[int]:
+        """Scrapea una fuente e ingiere sus noticias; devuelve los IDs de las noticias nuevas"""
+        db = self.session_factory()
+        try:
+            with LeaseConLatido(recurso_fuente(fuente), self.nombre, self.segundos_lease, self.session_factory) as lease:
+                if not lease.adquirido:
+                    logger.warning(f"⏭️ {fuente}: otro runner la está scrapeando, se omite")
+                    crud_trabajos_scraping.actualizar_fuente(
+                        db, trabajo_id, fuente, estado='omitido', error="Otro runner tiene el lease de esta fuente"
+                    )
+                    return []
+
+                crud_trabajos_scraping.actualizar_fuente(db, trabajo_id, fuente, estado='en_progreso')
+                try:
+                    # Un scraper por hilo: requests.Session no es seguro entre hilos
+                    noticias = ScraperNoticias().scrape_fuente(fuente)
+                except Exception as e:
+                    logger.error(f"❌ Error scrapeando {fuente}: {e}")
+                    crud_trabajos_scraping.actualizar_fuente(db, trabajo_id, fuente, estado='fallido', error=str(e))
+                    return []
+
+                nuevas: List[int] = []
+                conteos = self._ingerir(db, trabajo_id, fuente, noticias, lease, nuevas)
+                if lease.perdido.is_set():
+                    crud_trabajos_scraping.actualizar_fuente(
+                        db, trabajo_id, fuente, estado='fallido', error="Lease de la fuente perdido durante la ingesta", **conteos
+                    )
+                    return nuevas
+
+                crud_trabajos_scraping.actualizar_fuente(db, trabajo_id, fuente, estado='completado', **conteos)
+                logger.info(f"✅ {fuente}: {conteos['noticias_guardadas']} nuevas de {conteos['noticias_obtenidas']}")
+                return nuevas
+        finally:
+            db.close()
+
+    def _ingerir(
+        self, db, trabajo_id: int, fuente: str, noticias: List[Dict], lease: LeaseConLatido, nuevas: List[int]
+    ) -> Dict[str, int]:
+        """Guarda las noticias de una fuente, agrega a `nuevas` sus IDs y devuelve los conteos"""
+        conteos = {
+            'noticias_obtenidas': len(noticias),
+            'noticias_guardadas': 0,
+            'duplicados': 0,
+            'errores': 0
+        }
+
+        # Descartar de una vez los enlaces que ya existen
+        enlaces = [noticia['enlace'] for noticia in noticias if noticia.get('enlace')]
+        existentes = {
+            enlace for (enlace,) in db.query(models.Noticia.enlace).filter(
+                models.Noticia.enlace.in_(enlaces)
+            ).all()
+        } if enlaces else set()
+
+        for i, noticia_data in enumerate(noticias, start=1):
+            if lease.perdido.is_set():
+                # Otro nodo tomó la fuente: dejar de insertar para no competir con él
+                logger.warning(f"⚠️ {fuente}: lease perdido, se detiene la ingesta")
+                break
+
+            if noticia_data.get('enlace') in existentes:
+                conteos['duplicados'] += 1
+            elif (noticia := crud_noticias.crear_noticia(db, noticia_data)):
+                conteos['noticias_guardadas'] += 1
+                existentes.add(noticia_data['enlace'])
+                nuevas.append(noticia.id)
+            elif db.query(models.Noticia.id).filter(models.Noticia.enlace == noticia_data.get('enlace')).first():
+                # Insertada por otro proceso entre la consulta inicial y ahora
+                conteos['duplicados'] += 1
+            else:
+                conteos['errores'] += 1
+
+            if i % PROGRESO_CADA == 0:
+                crud_trabajos_scraping.actualizar_fuente(db, trabajo_id, fuente, **conteos)
+
+        return conteos
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Worker que ejecuta los trabajos de scraping encolados por la API")
+    parser.add_argument("--hilos", type=int, default=settings.SCRAPING_HILOS)
+    parser.add_argument("--intervalo", type=float, default=settings.SCRAPING_INTERVALO_SONDEO)
+    parser.add_argument("--lease", type=int, default=settings.SCRAPING_LEASE_SEGUNDOS, help="Segundos de vencimiento de los leases")
+    parser.add_argument("--una-vez", action="store_true", help="Terminar cuando no queden trabajos pendientes")
+    args = parser.parse_args()
+    WorkerScraping(hilos=args.hilos, intervalo=args.intervalo, segundos_lease=args.lease).ejecutar(una_vez=args.una_vez)
@@ -0,0 +1,80 @@
+"""
+Los listados de reportes y de solicitudes de upgrade deben hacer un número fijo de
+consultas sin importar cuántas filas devuelvan (sin N+1 por la noticia o el usuario).
+"""
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+# Agregar el directorio padre al path para imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app import models
+from app.crud import crud_reportes
+from app.crud_upgrade import listar_solicitudes_con_usuario
+from app.database import Base
+from app.schemas_reporte import ReporteConNoticia
+from app.schemas_upgrade import SolicitudUpgradeResponse
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[
+        models.Noticia.__table__, models.ReporteNoticia.__table__,
+        models.Usuario.__table__, models.SolicitudUpgrade.__table__
+    ])
+    sesion = sessionmaker(bind=engine)()
+    sesion.consultas = []
+    event.listen(engine, "before_cursor_execute", lambda *args: sesion.consultas.append(args[2]))
+    try:
+        yield sesion
+    finally:
+        sesion.close()
+        engine.dispose()
+
+def crear_reportes(db, cantidad: int) -> None:
+    for i in range(cantidad):
+        noticia = models.Noticia(
+            titulo=f"Noticia {i}", enlace=f"https://ejemplo.pe/{i}", fecha=date(2025, 1, 1),
+            categoria="General", fuente="RPP"
+        )
+        db.add(noticia)
+        db.flush()
+        db.add(models.ReporteNoticia(noticia_id=noticia.id, motivo="Contenido falso"))
+    db.commit()
+    db.expunge_all()
+
+def crear_solicitudes(db, cantidad: int) -> None:
+    for i in range(cantidad):
+        usuario = models.Usuario(email=f"usuario{i}@ejemplo.pe", password_hash="x", nombre=f"Usuario {i}")
+        db.add(usuario)
+        db.flush()
+        db.add(models.SolicitudUpgrade(usuario_id=usuario.id, plan_solicitado="plus", codigo_yape="123456", monto=1990))
+    db.commit()
+    db.expunge_all()
+
+@pytest.mark.parametrize("cantidad", [1, 5, 25])
+def test_listado_reportes_consultas_constantes(db, cantidad):
+    crear_reportes(db, cantidad)
+    db.consultas.clear()
+
+    reportes = [ReporteConNoticia(**r) for r in crud_reportes.listar_reportes_con_noticia(db)]
+
+    assert len(reportes) == cantidad
+    assert all(r.titulo_noticia for r in reportes)
+    assert len(db.consultas) == 1
+
+@pytest.mark.parametrize("cantidad", [1, 5, 25])
+def test_listado_solicitudes_upgrade_consultas_constantes(db, cantidad):
+    crear_solicitudes(db, cantidad)
+    db.consultas.clear()
+
+    solicitudes = [SolicitudUpgradeResponse(**s) for s in listar_solicitudes_con_usuario(db)]
+
+    assert len(solicitudes) == cantidad
+    assert all(s.usuario_email for s in solicitudes)
+    assert len(db.consultas) == 1
@@ -14,7 +14,8 @@ import type {
   SolicitudUpgradeCreate, // ← Agregar este import
   SolicitudUpgradeUpdate, // ← Agregar este import
   MetricasAvanzadas,
-  AnalisisIAResponse
+  AnalisisIAResponse,
+  AnalisisIALoteResponse
 } from '../types';
 
 const API_BASE_URL = 'http://localhost:8000';
@@ -392,7 +393,7 @@ export const newsApi = {
     return response.json();
   },
   // ==================== ANÁLISIS IA ====================
-  analizarNoticiaIA: async (noticiaId: number): Promise<AnalisisIAResponse> => {
+  analizarNoticiaIA: async (noticiaId: number, reencolar = true): Promise<AnalisisIAResponse> => {
     const response = await fetch(`${API_BASE_URL}/analizar-noticia-ia`, {
       method: 'POST',
       headers: getAuthHeaders(),
@@ -406,6 +407,54 @@ export const newsApi = {
       throw new Error('Error analizando noticia con IA');
     }
 
+    // 202: el análisis sigue en la cola del servidor, consultar su estado hasta que termine
+    if (response.status === 202) {
+      for (let intento = 0; intento < 60; intento++) {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        const estado = await newsApi.obtenerEstadoAnalisisIA(noticiaId);
+        if (estado.estado === 'completado') {
+          return newsApi.obtenerAnalisisIANoticia(noticiaId);
+        }
+        if (estado.estado === 'fallido') {
+          throw new Error('Error analizando noticia con IA');
+        }
+        // Sin análisis ni trabajo en cola: volver a pedirlo una vez; si no, seguir consultando
+        if (estado.estado === 'sin_analisis' && reencolar) {
+          return newsApi.analizarNoticiaIA(noticiaId, false);
+        }
+      }
+      throw new Error('El análisis IA está tardando demasiado, inténtalo de nuevo');
+    }
+
+    return response.json();
+  },
+
+  analizarNoticiasIALote: async (noticiaIds: number[]): Promise<AnalisisIALoteResponse> => {
+    const response = await fetch(`${API_BASE_URL}/analizar-noticias-ia/lote`, {
+      method: 'POST',
+      headers: getAuthHeaders(),
+      body: JSON.stringify({ noticia_ids: noticiaIds }),
+    });
+
+    if (!response.ok) {
+      if (response.status === 402) {
+        throw new Error('PLUS_REQUIRED');
+      }
+      throw new Error('Error analizando noticias con IA');
+    }
+
+    return response.json();
+  },
+
+  obtenerEstadoAnalisisIA: async (noticiaId: number): Promise<{ noticia_id: number; estado: string; error?: string | null }> => {
+    const response = await fetch(`${API_BASE_URL}/analizar-noticia-ia/${noticiaId}/estado`, {
+      headers: getAuthHeaders(),
+    });
+
+    if (!response.ok) {
+      throw new Error('Error consultando estado del análisis IA');
+    }
+
     return response.json();
   },
 
@@ -24,6 +24,8 @@ export interface ScrapingResponse {
   noticias_guardadas: number;
   duplicados: number;
   errores: number;
+  trabajo_id?: number;
+  estado?: string;
 }
 
 export interface FuentesResponse {
@@ -242,4 +244,18 @@ export interface AnalisisIAResponse {
 
 export interface AnalisisIARequest {
   noticia_id: number;
+}
+
+export interface ResultadoAnalisisIALote {
+  noticia_id: number;
+  estado: 'completado' | 'en_cola' | 'en_progreso' | 'fallido' | 'no_encontrada';
+  analisis?: AnalisisIA | null;
+  error?: string | null;
+}
+
+export interface AnalisisIALoteResponse {
+  resultados: ResultadoAnalisisIALote[];
+  completados: number;
+  pendientes: number;
+  fallidos: number;
 }
\ No newline at end of file